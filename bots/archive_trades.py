@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Archive closed days of crypto_trades / crypto_trades_v2 to Parquet
+Each (symbol, UTC day) older than --keep-days is written to
+<archive>/<dataset>/<SYMBOL>/<YYYY-MM-DD>.parquet, verified, and then
+deleted from SQLite in one short transaction. Safe to re-run.
+Readers: utils.trade_archive.load_trade_history / load_bar_history
+
+Usage:
+    python archive_trades.py                      # archive everything older than 7 days
+    python archive_trades.py --keep-days 3 --dataset bars --symbol btcusdc
+    python archive_trades.py --no-delete          # write files, keep rows in SQLite
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from utils.compact_trades import is_compact
+from utils.trade_archive import (ARCHIVE_ROOT, DATASETS, DAY_MS, day_path, days_between,
+                                 delete_day, export_day)
+from utils.trade_queries import get_time_range
+
+DB_PATH = os.path.join(os.path.dirname(__file__), "..", "server", "data", "bot_manager.db")
+
+
+def log(level, message):
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    print(f"[{timestamp}] [{level}] {message}", flush=True)
+
+
+def get_symbols(conn, dataset):
+    table = DATASETS[dataset][0]
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (table,)).fetchone()
+    if not exists:
+        return []
+    if dataset == 'trades' and is_compact(conn):
+        return [row[0] for row in conn.execute("SELECT symbol FROM trade_symbols ORDER BY symbol")]
+    return [row[0] for row in conn.execute(f"SELECT DISTINCT symbol FROM {table} ORDER BY symbol")]
+
+
+def archive_symbol(conn, dataset, symbol, cutoff_ms, root, delete):
+    table = DATASETS[dataset][0]
+    first_ms, last_ms = get_time_range(conn, symbol, table)
+    if first_ms is None or first_ms >= cutoff_ms:
+        return 0, 0
+
+    exported_total = deleted_total = 0
+    for day in days_between(first_ms, min(last_ms + 1, cutoff_ms)):
+        start = time.time()
+        exported, max_id = export_day(conn, dataset, symbol, day, root)
+        if not exported:
+            continue
+
+        deleted = 0
+        if delete:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                deleted = delete_day(conn, dataset, symbol, day, max_id)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        size_mb = os.path.getsize(day_path(dataset, symbol, day, root)) / 1024 / 1024
+        log("INFO", f"{dataset}/{symbol}/{day}: {exported:,} rows -> {size_mb:.1f} MB"
+            f"{f', deleted {deleted:,} from {table}' if delete else ''} ({time.time() - start:.1f}s)")
+        exported_total += exported
+        deleted_total += deleted
+
+    return exported_total, deleted_total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Archive closed days of trades/bars to Parquet')
+    parser.add_argument('--db', type=str, default=DB_PATH, help='SQLite database path')
+    parser.add_argument('--archive', type=str, default=ARCHIVE_ROOT, help='Archive root directory')
+    parser.add_argument('--dataset', type=str, choices=['trades', 'bars', 'all'], default='all',
+                        help='trades = crypto_trades, bars = crypto_trades_v2 (default: all)')
+    parser.add_argument('--symbol', type=str, help='Only this symbol')
+    parser.add_argument('--keep-days', type=int, default=7, help='Most recent UTC days kept in SQLite')
+    parser.add_argument('--no-delete', action='store_true', help='Write archive files but keep SQLite rows')
+    parser.add_argument('--vacuum', action='store_true', help='VACUUM afterwards to shrink the DB file')
+    args = parser.parse_args()
+
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    cutoff_ms = int(datetime.strptime(today, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp() * 1000)
+    cutoff_ms -= args.keep_days * DAY_MS
+
+    # isolation_level=None: transactions are managed explicitly with BEGIN/COMMIT
+    conn = sqlite3.connect(args.db, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA busy_timeout=10000")
+
+    cutoff_day = datetime.fromtimestamp(cutoff_ms / 1000, tz=timezone.utc).strftime('%Y-%m-%d')
+    log("INFO", f"Database: {args.db}")
+    log("INFO", f"Archive: {os.path.abspath(args.archive)} | archiving days before {cutoff_day}")
+
+    datasets = list(DATASETS) if args.dataset == 'all' else [args.dataset]
+    for dataset in datasets:
+        symbols = [args.symbol.upper()] if args.symbol else get_symbols(conn, dataset)
+        for symbol in symbols:
+            exported, deleted = archive_symbol(conn, dataset, symbol, cutoff_ms, args.archive,
+                                               not args.no_delete)
+            if exported:
+                log("INFO", f"{dataset}/{symbol}: archived {exported:,} rows, deleted {deleted:,}")
+
+    if args.vacuum:
+        log("INFO", "Running VACUUM...")
+        conn.execute("VACUUM")
+
+    conn.close()
+    log("INFO", "Done")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Feature Engine Benchmark
+Replays synthetic 1-second bars through core.feature_engineering's
+IncrementalFeatureEngine and FeatureEngineer.calculate_features (over the
+last 60 bars, as the live path did before) and fails if any feature
+differs. price_std_* is checked against an exact standard deviation
+(statistics.stdev) instead, because pandas' rolling std is itself off by
+up to ~1e-5 at 1e5 prices (e.g. on a flat stretch). The bars include a
+flat-price stretch (std 0, RSI 0/0 -> NaN) and a strictly rising one
+(RSI 100), and are long enough to cross several re-anchoring points of
+the rolling windows. Also reports us per bar.
+
+Usage:
+    python3 bots/benchmarks/bench_feature_engine.py
+    python3 bots/benchmarks/bench_feature_engine.py --bars 20000 --price 97000
+"""
+
+import argparse
+import math
+import os
+import random
+import statistics
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from core.feature_engineering import FeatureEngineer, IncrementalFeatureEngine
+
+WINDOW = 60
+
+REL_TOL = 1e-9
+# Price units (ticks are 0.1)
+STD_ABS_TOL = 1e-6
+
+
+def synthetic_bars(count, price):
+    """Random-walk bars with a flat stretch and a strictly rising stretch"""
+    bars = []
+    flat = range(count // 3, count // 3 + 80)
+    rising = range(2 * count // 3, 2 * count // 3 + 40)
+    for i in range(count):
+        if i in rising:
+            price += random.uniform(0.1, 1.0)
+        elif i not in flat:
+            price += random.gauss(0, 2)
+        volume = random.uniform(0, 5)
+        bars.append({
+            'timestamp': 1700000000 + i,
+            'close': round(price, 1),
+            'high': round(price + random.uniform(0, 1), 1),
+            'low': round(price - random.uniform(0, 1), 1),
+            'total_volume': volume,
+            'net_flow': random.uniform(-volume, volume),
+            'trade_count': random.randint(0, 50),
+        })
+    return bars
+
+
+def same(expected, actual):
+    if isinstance(expected, float) and math.isnan(expected):
+        return isinstance(actual, float) and math.isnan(actual)
+    return math.isclose(expected, actual, rel_tol=REL_TOL, abs_tol=1e-12)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Incremental feature engine parity and speed')
+    parser.add_argument('--bars', type=int, default=5000, help='Synthetic 1-second bars')
+    parser.add_argument('--price', type=float, default=97000.0, help='Start price')
+    args = parser.parse_args()
+
+    random.seed(42)
+    bars = synthetic_bars(args.bars, args.price)
+    engineer = FeatureEngineer()
+    engine = IncrementalFeatureEngine(window_size=WINDOW)
+
+    pandas_seconds = incremental_seconds = 0.0
+    compared = 0
+    mismatches = []
+    for i, bar in enumerate(bars):
+        start = time.perf_counter()
+        engine.update(bar)
+        actual = engine.get_features()
+        incremental_seconds += time.perf_counter() - start
+
+        if i + 1 < WINDOW:
+            if actual is not None:
+                raise SystemExit(f"Features before the window is full (bar {i})")
+            continue
+
+        start = time.perf_counter()
+        expected = engineer.calculate_features(pd.DataFrame(bars[i + 1 - WINDOW:i + 1]))
+        pandas_seconds += time.perf_counter() - start
+
+        compared += 1
+        if set(expected) != set(actual):
+            raise SystemExit(f"Feature names differ: {sorted(set(expected) ^ set(actual))}")
+        for name, value in expected.items():
+            if name.startswith('price_std_'):
+                closes = [b['close'] for b in bars[i + 1 - int(name[10:]):i + 1]]
+                if abs(statistics.stdev(closes) - actual[name]) > STD_ABS_TOL:
+                    mismatches.append((i, name, statistics.stdev(closes), actual[name]))
+            elif not same(float(value), float(actual[name])):
+                mismatches.append((i, name, value, actual[name]))
+
+    print(f"Bars: {len(bars):,} | compared {compared:,} feature dicts")
+    print(f"pandas       {pandas_seconds / compared * 1e6:>10.1f} us/bar")
+    print(f"incremental  {incremental_seconds / len(bars) * 1e6:>10.1f} us/bar")
+
+    if mismatches:
+        for i, name, expected, actual in mismatches[:10]:
+            print(f"  bar {i}: {name} expected {expected!r} incremental {actual!r}")
+        raise SystemExit(f"{len(mismatches)} feature mismatches")
+    print("Parity: all features match")
+
+
+if __name__ == "__main__":
+    main()
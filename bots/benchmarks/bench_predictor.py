@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Predictor Benchmark
+Per-call latency (p50/p99) of single-row inference: the old
+pd.DataFrame([features]) path vs core.predictor.Predictor's preallocated
+row in bound feature order, with lightgbm and with the compiled NumPy
+evaluator (core.tree_model), plus a parity check of the compiled model
+against lightgbm on random rows with missing values, for the benchmarked
+model and a random-forest (boosting=rf, averaged trees) model
+
+Usage:
+    # Benchmark a trained model (feature values are random)
+    python3 bots/benchmarks/bench_predictor.py --model models/BTCUSDC_model_1.txt
+
+    # Synthetic model shaped like train_model_v2's (500 trees, depth 7)
+    python3 bots/benchmarks/bench_predictor.py --calls 20000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from core.predictor import Predictor
+from training.features import FEATURE_COLUMNS
+
+# train_model_v2.FEATURE_COLS
+MODEL_FEATURES = ['total_volume', 'net_flow', 'trade_count'] + FEATURE_COLUMNS
+
+
+def synthetic_model(path, n_estimators, rows=20000, boosting_type='gbdt'):
+    """Binary model on random data with the training feature columns"""
+    rng = np.random.default_rng(42)
+    X = pd.DataFrame(rng.normal(size=(rows, len(MODEL_FEATURES))), columns=MODEL_FEATURES)
+    y = (X.iloc[:, 0] + rng.normal(scale=2, size=rows) > 0).astype(int)
+    # rf needs bagging
+    bagging = {'subsample': 0.7, 'subsample_freq': 1, 'colsample_bytree': 0.8} if boosting_type == 'rf' else {}
+    model = lgb.LGBMClassifier(boosting_type=boosting_type, n_estimators=n_estimators, learning_rate=0.05,
+                               num_leaves=31, max_depth=7, random_state=42, verbose=-1, **bagging)
+    model.fit(X, y)
+    model.booster_.save_model(path)
+
+
+def feature_dicts(names, count):
+    """Like the live feature dicts: model features plus unrelated keys, in another order"""
+    dicts = []
+    for _ in range(count):
+        features = {name: random.gauss(0, 1) for name in reversed(names)}
+        features['close'] = 97000 + random.uniform(-50, 50)
+        dicts.append(features)
+    return dicts
+
+
+def legacy_predict(booster, names):
+    """The pre-fast-path Predictor.predict (DataFrame per call, model columns only)"""
+    def predict(features):
+        return booster.predict(pd.DataFrame([{name: features[name] for name in names}]))[0]
+    return predict
+
+
+def parity(compiled, booster, n_features, rows=10000):
+    """Max abs difference of compiled vs lightgbm probabilities"""
+    rng = np.random.default_rng(7)
+    X = rng.normal(size=(rows, n_features))
+    X[rng.random(X.shape) < 0.05] = np.nan
+    X[rng.random(X.shape) < 0.02] = 0.0
+    return float(np.abs(compiled.predict(X) - booster.predict(X)).max())
+
+
+def run(label, fn, inputs, warmup=200):
+    for features in inputs[:warmup]:
+        fn(features)
+    times = np.empty(len(inputs))
+    for i, features in enumerate(inputs):
+        start = time.perf_counter()
+        fn(features)
+        times[i] = time.perf_counter() - start
+    p50, p99 = np.percentile(times, [50, 99]) * 1e6
+    print(f"{label:<32} p50 {p50:>8.1f} us  p99 {p99:>8.1f} us  mean {times.mean() * 1e6:>8.1f} us")
+    return p50
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Single-row predictor latency benchmark')
+    parser.add_argument('--model', type=str, help='LightGBM model file (default: a synthetic model)')
+    parser.add_argument('--n-estimators', type=int, default=500, help='Trees of the synthetic model')
+    parser.add_argument('--calls', type=int, default=10000, help='Timed predictions per path')
+    args = parser.parse_args()
+
+    random.seed(42)
+    tmp_dir = tempfile.TemporaryDirectory()
+    model_path = args.model
+    if not model_path:
+        model_path = os.path.join(tmp_dir.name, "model.txt")
+        synthetic_model(model_path, args.n_estimators)
+
+    # Random forest: trees are averaged (average_output), not summed
+    rf_path = os.path.join(tmp_dir.name, "rf_model.txt")
+    synthetic_model(rf_path, 50, rows=5000, boosting_type='rf')
+    rf_diff = parity(Predictor(rf_path).model, Predictor(rf_path, compiled=False).model, len(MODEL_FEATURES))
+    print(f"Parity (compiled vs lightgbm, random forest): max abs diff {rf_diff:.2e}")
+    if rf_diff > 1e-9:
+        raise SystemExit("Compiled random-forest model does not match lightgbm")
+
+    predictor = Predictor(model_path)
+    names = predictor.feature_names
+    inputs = feature_dicts(names, args.calls)
+    print(f"Model: {model_path} | {predictor.model.num_trees()} trees, {len(names)} features | {args.calls:,} calls")
+
+    booster_predictor = Predictor(model_path, compiled=False)
+    diff = parity(predictor.model, booster_predictor.model, len(names))
+    print(f"Parity (compiled vs lightgbm, 10,000 rows, 5% NaN): max abs diff {diff:.2e}")
+    if diff > 1e-9:
+        raise SystemExit("Compiled model does not match lightgbm")
+
+    # Same probabilities on all paths
+    legacy = legacy_predict(booster_predictor.model, names)
+    for features in inputs[:100]:
+        assert abs(legacy(features) - booster_predictor.predict(features)[1]) < 1e-12
+        assert abs(legacy(features) - predictor.predict(features)[1]) < 1e-9
+
+    before = run("before (DataFrame per call)", legacy, inputs)
+    bound = run("bound row, lightgbm 1 thread", booster_predictor.predict, inputs)
+    compiled = run("bound row, compiled", predictor.predict, inputs)
+    print(f"Speedup (p50): lightgbm row {before / bound:.2f}x, compiled {before / compiled:.2f}x")
+
+    tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Stream Decoder Benchmark
+Compares messages/sec of the old collect_price_v2 on_message path
+(json.loads + '@x' in stream + float()) with core.stream_decoder
+
+Usage:
+    # Record a capture (one raw message per line) from the live combined stream
+    python3 bots/benchmarks/bench_stream_decoder.py --record capture.jsonl --symbol btcusdt --count 20000
+
+    # Benchmark a capture (a synthetic one is generated if --capture is omitted)
+    python3 bots/benchmarks/bench_stream_decoder.py --capture capture.jsonl
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from core.stream_decoder import StreamDecoder, JSON_BACKEND
+
+STREAM_URL = "wss://fstream.binance.com/stream?streams={symbol}@aggTrade/{symbol}@depth@500ms/{symbol}@markPrice"
+
+
+def record_capture(path, symbol, count):
+    """Save raw combined-stream messages to a file"""
+    from websocket import create_connection
+
+    ws = create_connection(STREAM_URL.format(symbol=symbol))
+    with open(path, "w") as f:
+        for i in range(count):
+            f.write(ws.recv().strip() + "\n")
+            if (i + 1) % 1000 == 0:
+                print(f"Recorded {i + 1:,} messages", flush=True)
+    ws.close()
+
+
+def synthetic_capture(symbol, count):
+    """Roughly the live mix: mostly trades, some depth diffs, a few mark prices"""
+    messages = []
+    price = 97000.0
+    update_id = 1000
+    for i in range(count):
+        ts = 1700000000000 + i * 37
+        r = random.random()
+        if r < 0.85:
+            price += random.uniform(-2, 2)
+            data = {"e": "aggTrade", "E": ts, "a": i, "s": symbol.upper(), "p": f"{price:.1f}",
+                    "q": f"{random.uniform(0.001, 2):.3f}", "f": i, "l": i, "T": ts, "m": random.random() < 0.5}
+            stream = f"{symbol}@aggTrade"
+        elif r < 0.98:
+            levels = lambda side: [[f"{price + side * k * 0.1:.1f}", f"{random.uniform(0, 5):.3f}"] for k in range(1, 11)]
+            data = {"e": "depthUpdate", "E": ts, "T": ts, "s": symbol.upper(), "U": update_id + 1,
+                    "u": update_id + 20, "pu": update_id, "b": levels(-1), "a": levels(1)}
+            update_id += 20
+            stream = f"{symbol}@depth@500ms"
+        else:
+            data = {"e": "markPriceUpdate", "E": ts, "s": symbol.upper(), "p": f"{price:.2f}",
+                    "i": f"{price:.2f}", "r": "0.00010000", "T": ts + 3600000}
+            stream = f"{symbol}@markPrice"
+        messages.append(json.dumps({"stream": stream, "data": data}, separators=(",", ":")))
+    return messages
+
+
+def legacy_on_message(message, sink):
+    """The pre-decoder collect_price_v2 path"""
+    msg = json.loads(message)
+    stream = msg.get('stream', '')
+    data = msg.get('data', {})
+
+    if '@aggTrade' in stream:
+        sink((float(data['p']), float(data['q']), data['m'], data['T']))
+    elif '@depth' in stream:
+        sink((data.get('b', []), data.get('a', [])))
+    elif '@markPrice' in stream:
+        sink(float(data.get('r', 0)))
+
+
+def run(label, fn, messages, rounds):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for message in messages:
+            fn(message)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    rate = len(messages) / best
+    print(f"{label:<28} {rate:>12,.0f} msg/s  ({best * 1e6 / len(messages):.2f} us/msg)")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream decoder benchmark')
+    parser.add_argument('--capture', type=str, help='File with one raw message per line')
+    parser.add_argument('--record', type=str, help='Record a capture to this file and exit')
+    parser.add_argument('--symbol', type=str, default='btcusdt', help='Symbol (lowercase)')
+    parser.add_argument('--count', type=int, default=100000, help='Messages to record/generate')
+    parser.add_argument('--rounds', type=int, default=5, help='Timing rounds (best is reported)')
+    args = parser.parse_args()
+
+    symbol = args.symbol.lower()
+
+    if args.record:
+        record_capture(args.record, symbol, args.count)
+        return
+
+    if args.capture:
+        with open(args.capture) as f:
+            messages = [line.strip() for line in f if line.strip()]
+    else:
+        random.seed(42)
+        messages = synthetic_capture(symbol, args.count)
+
+    print(f"Messages: {len(messages):,} | JSON backend: {JSON_BACKEND}")
+
+    sink = lambda record: None
+    decoder = StreamDecoder()
+    decoder.register(f"{symbol}@aggTrade", sink)
+    decoder.register(f"{symbol}@depth@500ms", sink)
+    decoder.register(f"{symbol}@markPrice", sink)
+
+    before = run("before (json + 'in' checks)", lambda m: legacy_on_message(m, sink), messages, args.rounds)
+    after = run(f"after (StreamDecoder/{JSON_BACKEND})", decoder.dispatch, messages, args.rounds)
+    print(f"Speedup: {after / before:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
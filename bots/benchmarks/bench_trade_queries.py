@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Trade Query Benchmark
+Compares query plans and load times for per-symbol trade loads with the
+old single-column indexes vs the (symbol, timestamp_ms) composite index
+used by utils.trade_queries
+
+Usage:
+    # Build a synthetic crypto_trades DB (50M rows, 5 interleaved symbols) and benchmark it
+    python3 bots/benchmarks/bench_trade_queries.py --db /data/bench_trades.db --rows 50000000
+
+    # Quick run
+    python3 bots/benchmarks/bench_trade_queries.py --db /tmp/bench_trades.db --rows 2000000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from utils.trade_queries import load_trades
+
+SYMBOLS = ['BTCUSDC', 'ETHUSDC', 'SOLUSDC', 'BNBUSDC', 'XRPUSDC']
+START_MS = 1700000000000
+COMPOSITE_INDEX = "CREATE INDEX IF NOT EXISTS idx_crypto_trades_symbol_ts ON crypto_trades(symbol, timestamp_ms)"
+
+LEGACY_QUERY = """
+    SELECT timestamp_ms, price, quantity, side, is_maker
+    FROM crypto_trades
+    WHERE symbol = ?
+    ORDER BY timestamp_ms
+"""
+
+
+def build_db(path, rows, symbols):
+    """Same schema and single-column indexes as server/config/database.js"""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("""
+        CREATE TABLE crypto_trades (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            bot_id INTEGER NOT NULL,
+            symbol TEXT NOT NULL,
+            timestamp_ms INTEGER NOT NULL,
+            readable_time TEXT NOT NULL,
+            price REAL NOT NULL,
+            quantity REAL NOT NULL,
+            side TEXT NOT NULL,
+            is_maker INTEGER NOT NULL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Collectors for all symbols write concurrently, so rows are interleaved by time
+    random.seed(42)
+    prices = {symbol: 100.0 * (i + 1) for i, symbol in enumerate(symbols)}
+
+    def generate(start, count):
+        for i in range(start, start + count):
+            symbol = symbols[i % len(symbols)]
+            prices[symbol] += random.uniform(-0.05, 0.05)
+            is_maker = i & 1
+            ts = START_MS + i * 10
+            yield (i % len(symbols) + 1, symbol, ts, "2023-11-14 22:13:20.000000",
+                   round(prices[symbol], 2), 0.01 + (i % 97) * 0.001, "SELL" if is_maker else "BUY", is_maker)
+
+    chunk = 1000000
+    started = time.time()
+    for start in range(0, rows, chunk):
+        conn.executemany("""
+            INSERT INTO crypto_trades
+            (bot_id, symbol, timestamp_ms, readable_time, price, quantity, side, is_maker)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, generate(start, min(chunk, rows - start)))
+        conn.commit()
+        print(f"Inserted {min(start + chunk, rows):,}/{rows:,} rows ({time.time() - started:.0f}s)", flush=True)
+
+    print("Creating single-column indexes...", flush=True)
+    conn.execute("CREATE INDEX idx_crypto_trades_bot_id ON crypto_trades(bot_id)")
+    conn.execute("CREATE INDEX idx_crypto_trades_symbol ON crypto_trades(symbol)")
+    conn.execute("CREATE INDEX idx_crypto_trades_timestamp ON crypto_trades(timestamp_ms)")
+    conn.commit()
+    conn.close()
+
+
+def query_plan(conn, sql, params):
+    return " | ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+
+
+def timed(label, fn, rounds):
+    best, result = None, None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"  {label:<34} {best:8.2f}s  ({result:,} rows, {result / best:,.0f} rows/s)")
+    return best
+
+
+def run_suite(conn, symbol, range_ms, rounds):
+    first, last = conn.execute(
+        "SELECT MIN(timestamp_ms), MAX(timestamp_ms) FROM crypto_trades WHERE symbol = ?", (symbol,)).fetchone()
+    if first is None:
+        raise SystemExit(f"No {symbol} rows in the database")
+    # Window in the middle of the data: at most range_ms, at most half the span
+    span = last - first
+    length = max(min(range_ms, span // 2), 1)
+    start_ms = first + (span - length) // 2
+    end_ms = start_ms + length
+    range_sql = LEGACY_QUERY.replace("ORDER BY", "AND timestamp_ms >= ? AND timestamp_ms < ? ORDER BY")
+
+    in_range = conn.execute("SELECT COUNT(*) FROM crypto_trades WHERE symbol = ? AND timestamp_ms >= ? "
+                            "AND timestamp_ms < ?", (symbol, start_ms, end_ms)).fetchone()[0]
+    if not in_range:
+        raise SystemExit(f"Range query window [{start_ms}, {end_ms}) has no {symbol} rows")
+    print(f"  range window: {length / 3600000:.2f}h in the middle of {span / 3600000:.2f}h ({in_range:,} rows)")
+
+    print(f"  plan (full symbol): {query_plan(conn, LEGACY_QUERY, (symbol,))}")
+    print(f"  plan (range):       {query_plan(conn, range_sql, (symbol, start_ms, end_ms))}")
+
+    timed("full symbol, legacy fetchall", lambda: len(conn.execute(LEGACY_QUERY, (symbol,)).fetchall()), rounds)
+    timed("full symbol, load_trades", lambda: len(load_trades(conn, symbol)), rounds)
+    timed("range, legacy fetchall",
+          lambda: len(conn.execute(range_sql, (symbol, start_ms, end_ms)).fetchall()), rounds)
+    timed("range, load_trades", lambda: len(load_trades(conn, symbol, start_ms, end_ms)), rounds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Trade query / index benchmark')
+    parser.add_argument('--db', type=str, required=True, help='Benchmark database (created if missing)')
+    parser.add_argument('--rows', type=int, default=50000000, help='Rows to generate')
+    parser.add_argument('--symbols', type=int, default=len(SYMBOLS), help='Interleaved symbols (max 5)')
+    parser.add_argument('--rebuild', action='store_true', help='Regenerate the database')
+    parser.add_argument('--range-hours', type=float, default=6, help='Length of the [start, end) range query')
+    parser.add_argument('--rounds', type=int, default=2, help='Timing rounds (best is reported)')
+    args = parser.parse_args()
+
+    symbols = SYMBOLS[:max(1, min(args.symbols, len(SYMBOLS)))]
+    if args.rebuild or not os.path.exists(args.db):
+        build_db(args.db, args.rows, symbols)
+
+    conn = sqlite3.connect(args.db)
+    total = conn.execute("SELECT MAX(id) FROM crypto_trades").fetchone()[0] or 0
+    symbol = symbols[0]
+    range_ms = int(args.range_hours * 3600 * 1000)
+    print(f"Database: {args.db} | {total:,} rows | symbol {symbol} | range {args.range_hours}h")
+
+    conn.execute("DROP INDEX IF EXISTS idx_crypto_trades_symbol_ts")
+    print("\nBefore: single-column indexes (bot_id, symbol, timestamp_ms)")
+    run_suite(conn, symbol, range_ms, args.rounds)
+
+    print("\nCreating (symbol, timestamp_ms) index...", flush=True)
+    start = time.perf_counter()
+    conn.execute(COMPOSITE_INDEX)
+    conn.commit()
+    print(f"  built in {time.perf_counter() - start:.1f}s")
+
+    print("\nAfter: + (symbol, timestamp_ms)")
+    run_suite(conn, symbol, range_ms, args.rounds)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,10 @@ import argparse
 import ssl
 from datetime import datetime
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from utils.sqlite_writer import SQLiteWriter
+from utils.compact_trades import INSERT_COMPACT_SQL, ensure_compact_schema, is_compact, get_symbol
+
 # Import WebSocketApp explicitly
 try:
     from websocket import WebSocketApp
@@ -44,6 +48,19 @@ def get_db_connection():
     conn.execute("PRAGMA synchronous=NORMAL")
     return conn
 
+def ensure_indexes(conn):
+    """Composite (symbol, timestamp_ms) index for the training loaders' range scans"""
+    if is_compact(conn):
+        ensure_compact_schema(conn)
+    else:
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_crypto_trades_symbol_ts ON crypto_trades(symbol, timestamp_ms)")
+
+INSERT_TRADE_SQL = """
+    INSERT INTO crypto_trades
+    (bot_id, symbol, timestamp_ms, readable_time, price, quantity, side, is_maker)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
 # =========================
 # Logging
 # =========================
@@ -64,45 +81,22 @@ class BinanceCollector:
         self.ws = None
         self.trade_count = 0
 
-        # Batch insert optimization
-        self.batch_size = batch_size
-        self.trade_buffer = []
-        self.db_conn = None
-        self.last_flush_time = time.time()
-
-    def flush_trades(self):
-        """Flush accumulated trades to database in batch"""
-        if not self.trade_buffer:
-            return
-
+        # Once crypto_trades is migrated to the compact layout, write it directly
+        self.compact = False
+        conn = get_db_connection()
         try:
-            if not self.db_conn:
-                self.db_conn = get_db_connection()
-
-            cursor = self.db_conn.cursor()
-            cursor.executemany("""
-                INSERT INTO crypto_trades
-                (bot_id, symbol, timestamp_ms, readable_time, price, quantity, side, is_maker)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, self.trade_buffer)
-
-            self.db_conn.commit()
-            batch_count = len(self.trade_buffer)
-            self.trade_buffer.clear()
-            self.last_flush_time = time.time()
-
-            return batch_count
-        except Exception as e:
-            log("ERROR", f"Batch insert error: {e}")
-            self.trade_buffer.clear()
-            # Reconnect on error
-            if self.db_conn:
-                try:
-                    self.db_conn.close()
-                except:
-                    pass
-                self.db_conn = None
-            return 0
+            if is_compact(conn):
+                self.symbol_id, self.price_scale, self.qty_scale = get_symbol(conn, self.symbol)
+                conn.commit()
+                self.compact = True
+        finally:
+            conn.close()
+
+        # Rows are written by a background thread in group commits
+        self.batch_size = batch_size
+        insert_sql = INSERT_COMPACT_SQL if self.compact else INSERT_TRADE_SQL
+        self.writer = SQLiteWriter(DB_PATH, insert_sql, setup=ensure_indexes,
+                                   batch_size=batch_size, max_delay=5, log=log)
 
     def on_message(self, ws, message):
         try:
@@ -114,32 +108,36 @@ class BinanceCollector:
             quantity = float(data["q"])
             is_maker = 1 if data["m"] else 0
             side = "SELL" if data["m"] else "BUY"
-            readable_time = datetime.fromtimestamp(timestamp_ms / 1000).strftime("%Y-%m-%d %H:%M:%S.%f")
-
-            # Add to batch buffer
-            self.trade_buffer.append((
-                self.bot_id,
-                self.symbol.upper(),
-                timestamp_ms,
-                readable_time,
-                price,
-                quantity,
-                side,
-                is_maker
-            ))
 
-            self.trade_count += 1
+            # Queue for the writer thread
+            if self.compact:
+                self.writer.submit((
+                    self.bot_id,
+                    self.symbol_id,
+                    timestamp_ms,
+                    round(price * self.price_scale),
+                    round(quantity * self.qty_scale),
+                    is_maker
+                ))
+            else:
+                readable_time = datetime.fromtimestamp(timestamp_ms / 1000).strftime("%Y-%m-%d %H:%M:%S.%f")
+                self.writer.submit((
+                    self.bot_id,
+                    self.symbol.upper(),
+                    timestamp_ms,
+                    readable_time,
+                    price,
+                    quantity,
+                    side,
+                    is_maker
+                ))
 
-            # Flush when buffer is full or every 5 seconds
-            should_flush = (
-                len(self.trade_buffer) >= self.batch_size or
-                time.time() - self.last_flush_time >= 5
-            )
+            self.trade_count += 1
 
-            if should_flush:
-                batch_count = self.flush_trades()
-                if batch_count > 0:
-                    log("INFO", f"[{side}] {self.symbol.upper()} Price={price} | Saved {batch_count} trades (Total: {self.trade_count})")
+            if self.trade_count % self.batch_size == 0:
+                log("INFO", f"[{side}] {self.symbol.upper()} Price={price} | "
+                    f"Saved {self.writer.stats['written']:,} trades (Total: {self.trade_count}, "
+                    f"Backlog: {self.writer.get_backlog()})")
 
         except Exception as e:
             log("ERROR", f"Message processing error: {e}")
@@ -148,25 +146,14 @@ class BinanceCollector:
         log("ERROR", f"WebSocket error: {error}")
 
     def on_close(self, ws, close_status_code, close_msg):
-        # Flush remaining trades before closing
-        if self.trade_buffer:
-            batch_count = self.flush_trades()
-            log("INFO", f"Flushed {batch_count} remaining trades")
-
-        # Close database connection
-        if self.db_conn:
-            try:
-                self.db_conn.close()
-            except:
-                pass
-            self.db_conn = None
-
-        log("WARNING", "WebSocket closed. Will reconnect...")
+        # Queued trades stay with the writer thread across reconnects
+        log("WARNING", f"WebSocket closed. Will reconnect... (Backlog: {self.writer.get_backlog()})")
 
     def on_open(self, ws):
         log("INFO", f"Connected to {self.socket_type.upper()} - {self.symbol.upper()}")
         log("INFO", f"Collecting data (Bot ID: {self.bot_id})...")
-        log("INFO", f"Batch mode: inserting every {self.batch_size} trades or 5 seconds")
+        log("INFO", f"Batch mode: background writer commits every {self.batch_size} trades or 5 seconds")
+        log("INFO", f"Storage: {'crypto_trades_compact' if self.compact else 'crypto_trades'}")
 
     def start(self):
         """Start collecting data with auto-reconnect"""
@@ -178,6 +165,8 @@ class BinanceCollector:
         # SSL options - disable certificate verification for development
         sslopt = {"cert_reqs": ssl.CERT_NONE}
 
+        self.writer.start()
+
         while True:
             try:
                 self.ws = WebSocketApp(
@@ -195,12 +184,8 @@ class BinanceCollector:
 
             except KeyboardInterrupt:
                 log("INFO", "Bot stopped by user")
-                # Flush remaining trades
-                if self.trade_buffer:
-                    batch_count = self.flush_trades()
-                    log("INFO", f"Flushed {batch_count} remaining trades before exit")
-                if self.db_conn:
-                    self.db_conn.close()
+                # Write remaining trades
+                self.writer.stop()
                 sys.exit(0)
             except Exception as e:
                 log("ERROR", f"Fatal error: {e}")
@@ -3,7 +3,8 @@
 """
 Crypto Price Collector V2 - Multi-Stream Edition
 Collects: aggTrade + Order Book (depth) + Funding Rate (markPrice)
-Uses REST API snapshot for Order Book initialization
+Uses REST API snapshot for Order Book initialization, with U/u/pu
+sequence checks and book-only resync on gaps
 Storage: SQLite (crypto_trades_v2 table)
 
 Usage:
@@ -22,6 +23,11 @@ import threading
 from datetime import datetime
 from collections import defaultdict
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from core.stream_decoder import StreamDecoder, JSON_BACKEND
+from core.order_book import OrderBook, UPDATE_APPLIED, UPDATE_GAP
+from utils.sqlite_writer import SQLiteWriter
+
 try:
     from websocket import WebSocketApp
 except ImportError:
@@ -33,6 +39,7 @@ except ImportError:
 # =========================
 DB_PATH = os.path.join(os.path.dirname(__file__), "..", "server", "data", "bot_manager.db")
 RECONNECT_DELAY = 5
+DEPTH_BUFFER_LIMIT = 5000  # diffs kept while a snapshot is being fetched
 
 # =========================
 # Database Helpers
@@ -77,21 +84,34 @@ def ensure_table_exists(conn):
     conn.execute("CREATE INDEX IF NOT EXISTS idx_crypto_trades_v2_bot_id ON crypto_trades_v2(bot_id)")
     conn.execute("CREATE INDEX IF NOT EXISTS idx_crypto_trades_v2_symbol ON crypto_trades_v2(symbol)")
     conn.execute("CREATE INDEX IF NOT EXISTS idx_crypto_trades_v2_timestamp ON crypto_trades_v2(timestamp_ms)")
+    # Range scans per symbol (training loaders)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_crypto_trades_v2_symbol_ts ON crypto_trades_v2(symbol, timestamp_ms)")
     conn.commit()
 
+INSERT_SECOND_SQL = """
+    INSERT INTO crypto_trades_v2
+    (bot_id, symbol, timestamp_ms, readable_time,
+     open, high, low, close,
+     buy_volume, sell_volume, total_volume, net_flow,
+     buy_count, sell_count, trade_count,
+     best_bid, best_ask, bid_qty, ask_qty,
+     spread, book_imbalance, funding_rate)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
 # WebSocket endpoints (combined streams)
 SOCKET_TYPES = {
     "spot": {
-        "ws": "wss://stream.binance.com:9443/stream?streams={symbol}@aggTrade/{symbol}@depth@500ms/{symbol}@markPrice",
-        "rest": "https://api.binance.com/api/v3/depth?symbol={symbol_upper}&limit=20"
+        "ws": "wss://stream.binance.com:9443/stream?streams={symbol}@aggTrade/{depth_stream}/{symbol}@markPrice",
+        "rest": "https://api.binance.com/api/v3/depth?symbol={symbol_upper}&limit={depth_limit}"
     },
     "future": {
-        "ws": "wss://fstream.binance.com/stream?streams={symbol}@aggTrade/{symbol}@depth@500ms/{symbol}@markPrice",
-        "rest": "https://fapi.binance.com/fapi/v1/depth?symbol={symbol_upper}&limit=20"
+        "ws": "wss://fstream.binance.com/stream?streams={symbol}@aggTrade/{depth_stream}/{symbol}@markPrice",
+        "rest": "https://fapi.binance.com/fapi/v1/depth?symbol={symbol_upper}&limit={depth_limit}"
     },
     "demo": {
-        "ws": "wss://demo-fstream.binance.com/stream?streams={symbol}@aggTrade/{symbol}@depth@500ms/{symbol}@markPrice",
-        "rest": "https://demo-fapi.binance.com/fapi/v1/depth?symbol={symbol_upper}&limit=20"
+        "ws": "wss://demo-fstream.binance.com/stream?streams={symbol}@aggTrade/{depth_stream}/{symbol}@markPrice",
+        "rest": "https://demo-fapi.binance.com/fapi/v1/depth?symbol={symbol_upper}&limit={depth_limit}"
     }
 }
 
@@ -106,33 +126,42 @@ def log(level, message):
 # Multi-Stream Collector
 # =========================
 class MultiStreamCollector:
-    def __init__(self, bot_id, symbol, socket_type, batch_size=50):
+    def __init__(self, bot_id, symbol, socket_type, batch_size=50, depth_interval='500ms', depth_limit=20):
         self.bot_id = bot_id
         self.symbol = symbol.lower()
         self.symbol_upper = symbol.upper()
         self.socket_type = socket_type
+        self.depth_stream = f"{self.symbol}@depth@{depth_interval}"
         
         # URLs
         config = SOCKET_TYPES[socket_type]
-        self.ws_url = config["ws"].format(symbol=self.symbol, symbol_upper=self.symbol_upper)
-        self.rest_url = config["rest"].format(symbol=self.symbol, symbol_upper=self.symbol_upper)
+        url_params = {
+            'symbol': self.symbol,
+            'symbol_upper': self.symbol_upper,
+            'depth_stream': self.depth_stream,
+            'depth_limit': depth_limit
+        }
+        self.ws_url = config["ws"].format(**url_params)
+        self.rest_url = config["rest"].format(**url_params)
         
         self.ws = None
         self.trade_count = 0
         self.batch_size = batch_size
-        self.trade_buffer = []
-        self.last_flush_time = time.time()
         
-        # Database connection
-        self.db_conn = None
+        # Database writes happen on a background thread in group commits
+        self.writer = SQLiteWriter(DB_PATH, INSERT_SECOND_SQL, setup=ensure_table_exists,
+                                   batch_size=batch_size, max_delay=5, log=log)
         
         # Order Book (will be initialized from REST API)
-        self.order_book = {
-            'bids': {},  # price -> quantity
-            'asks': {}   # price -> quantity
-        }
+        # Diffs are buffered while the snapshot is fetched on a background
+        # thread; a sequence gap resyncs only the book, not the socket.
+        self.order_book = OrderBook()
         self.order_book_initialized = False
         self.depth_last_update_id = 0
+        self.book_lock = threading.Lock()
+        self.depth_buffer = []
+        self.resync_pending = False
+        self.depth_stats = {'applied': 0, 'stale': 0, 'gaps': 0, 'resyncs': 0}
         
         # Funding Rate
         self.funding_rate = 0.0
@@ -140,6 +169,12 @@ class MultiStreamCollector:
         # Aggregation per second
         self.current_second = None
         self.second_data = self._empty_second_data()
+
+        # Stream name -> handler table (built once)
+        self.decoder = StreamDecoder()
+        self.decoder.register(f"{self.symbol}@aggTrade", self.process_trade)
+        self.decoder.register(self.depth_stream, self.process_depth_update)
+        self.decoder.register(f"{self.symbol}@markPrice", self.process_mark_price)
         
     def _empty_second_data(self):
         """Empty template for per-second aggregation"""
@@ -155,7 +190,7 @@ class MultiStreamCollector:
             'close_price': None,
         }
     
-    def initialize_order_book(self):
+    def fetch_order_book_snapshot(self):
         """Fetch Order Book snapshot from REST API"""
         log("INFO", f"Fetching Order Book snapshot from REST API...")
         log("INFO", f"URL: {self.rest_url}")
@@ -166,102 +201,120 @@ class MultiStreamCollector:
             
             if 'bids' not in data or 'asks' not in data:
                 log("ERROR", f"Invalid depth response: {data}")
-                return False
+                return None
             
+            return data
+            
+        except Exception as e:
+            log("ERROR", f"Failed to get Order Book snapshot: {e}")
+            return None
+    
+    def initialize_order_book(self):
+        """Load a snapshot and replay the diffs buffered since the stream opened"""
+        data = self.fetch_order_book_snapshot()
+        if data is None:
+            return False
+        
+        with self.book_lock:
             # Clear and initialize order book
-            self.order_book['bids'].clear()
-            self.order_book['asks'].clear()
+            self.depth_last_update_id = data.get('lastUpdateId', 0)
+            self.order_book.load_snapshot(data['bids'], data['asks'], self.depth_last_update_id)
             
-            for bid in data['bids']:
-                price = float(bid[0])
-                qty = float(bid[1])
-                if qty > 0:
-                    self.order_book['bids'][price] = qty
-                    
-            for ask in data['asks']:
-                price = float(ask[0])
-                qty = float(ask[1])
-                if qty > 0:
-                    self.order_book['asks'][price] = qty
+            # Replay buffered diffs (stale ones are dropped by the book)
+            for i, update in enumerate(self.depth_buffer):
+                if not self._apply_depth_update(update):
+                    # Snapshot is older than the buffer (or the buffer itself has a
+                    # hole): keep diffs from the break onwards and fetch again
+                    self.depth_buffer = self.depth_buffer[i:]
+                    log("WARNING", f"Snapshot {self.depth_last_update_id} does not line up with "
+                        f"buffered diffs (U={update.first_update_id}), refetching...")
+                    return False
             
-            # Save lastUpdateId for sync
-            self.depth_last_update_id = data.get('lastUpdateId', 0)
+            replayed = len(self.depth_buffer)
+            self.depth_buffer = []
             self.order_book_initialized = True
+            self.resync_pending = False
             
             # Log snapshot info
-            best_bid = max(self.order_book['bids'].keys()) if self.order_book['bids'] else 0
-            best_ask = min(self.order_book['asks'].keys()) if self.order_book['asks'] else 0
-            
-            log("INFO", f"Order Book initialized:")
-            log("INFO", f"  - Bids: {len(self.order_book['bids'])} levels, Best Bid: {best_bid}")
-            log("INFO", f"  - Asks: {len(self.order_book['asks'])} levels, Best Ask: {best_ask}")
-            log("INFO", f"  - Spread: ${best_ask - best_bid:.2f}")
-            log("INFO", f"  - lastUpdateId: {self.depth_last_update_id}")
-            
-            return True
-            
-        except Exception as e:
-            log("ERROR", f"Failed to get Order Book snapshot: {e}")
+            best_bid, _ = self.order_book.best_bid()
+            best_ask, _ = self.order_book.best_ask()
+        
+        log("INFO", f"Order Book initialized:")
+        log("INFO", f"  - Bids: {len(self.order_book.bids)} levels, Best Bid: {best_bid}")
+        log("INFO", f"  - Asks: {len(self.order_book.asks)} levels, Best Ask: {best_ask}")
+        log("INFO", f"  - Spread: ${best_ask - best_bid:.2f}")
+        log("INFO", f"  - lastUpdateId: {self.depth_last_update_id} | Replayed {replayed} buffered diffs")
+        
+        return True
+    
+    def _apply_depth_update(self, update):
+        """Apply one diff to the synced book (caller holds book_lock). Returns False on a gap"""
+        result = self.order_book.apply_update(update)
+        if result == UPDATE_APPLIED:
+            self.depth_stats['applied'] += 1
+        elif result == UPDATE_GAP:
+            self.depth_stats['gaps'] += 1
             return False
+        else:
+            self.depth_stats['stale'] += 1
+        return True
+    
+    def request_book_resync(self, reason):
+        """Rebuild only the order book in the background (socket stays connected)"""
+        with self.book_lock:
+            self.order_book_initialized = False
+            if self.resync_pending:
+                return
+            self.resync_pending = True
+            self.depth_stats['resyncs'] += 1
+        
+        log("WARNING", f"Order Book resync: {reason} | Stats: {self.depth_stats}")
+        threading.Thread(target=self._resync_worker, daemon=True).start()
+    
+    def _resync_worker(self):
+        """Retry snapshot + replay until the book is in sync"""
+        while not self.initialize_order_book():
+            time.sleep(1)
     
     def get_best_bid_ask(self):
-        """Get current best bid/ask from order book"""
-        best_bid = max(self.order_book['bids'].keys()) if self.order_book['bids'] else 0
-        best_ask = min(self.order_book['asks'].keys()) if self.order_book['asks'] else 0
+        """Get current best bid/ask from order book (zeros while it is resyncing)"""
+        if not self.order_book_initialized:
+            return 0, 0, 0, 0
         
-        bid_qty = self.order_book['bids'].get(best_bid, 0) if best_bid else 0
-        ask_qty = self.order_book['asks'].get(best_ask, 0) if best_ask else 0
+        best_bid, bid_qty = self.order_book.best_bid()
+        best_ask, ask_qty = self.order_book.best_ask()
         
         return best_bid, bid_qty, best_ask, ask_qty
     
     def calculate_book_imbalance(self, levels=5):
-        """Calculate order book imbalance"""
-        if not self.order_book['bids'] or not self.order_book['asks']:
-            return 0.0
-        
-        # Get top N levels
-        sorted_bids = sorted(self.order_book['bids'].keys(), reverse=True)[:levels]
-        sorted_asks = sorted(self.order_book['asks'].keys())[:levels]
-        
-        bid_volume = sum(self.order_book['bids'][p] for p in sorted_bids)
-        ask_volume = sum(self.order_book['asks'][p] for p in sorted_asks)
-        
-        total = bid_volume + ask_volume
-        if total == 0:
+        """Calculate order book imbalance (+1 = all bids, -1 = all asks)"""
+        if not self.order_book_initialized:
             return 0.0
-        
-        # Imbalance: +1 = all bids, -1 = all asks
-        return (bid_volume - ask_volume) / total
+        return self.order_book.imbalance(levels)
     
-    def process_depth_update(self, data):
-        """Process incremental depth update from WebSocket"""
-        if not self.order_book_initialized:
-            return
-        
-        # Update bids
-        for bid in data.get('b', []):
-            price = float(bid[0])
-            qty = float(bid[1])
-            if qty == 0:
-                self.order_book['bids'].pop(price, None)  # Remove
-            else:
-                self.order_book['bids'][price] = qty  # Add/Update
+    def process_depth_update(self, update):
+        """Process incremental depth update (DepthUpdate record) from WebSocket"""
+        with self.book_lock:
+            if not self.order_book_initialized:
+                # Keep it for replay once the snapshot arrives
+                self.depth_buffer.append(update)
+                if len(self.depth_buffer) > DEPTH_BUFFER_LIMIT:
+                    self.depth_buffer.pop(0)
+                return
+            
+            # Add/update/remove levels (qty 0 = remove), checking U/u/pu
+            if self._apply_depth_update(update):
+                return
         
-        # Update asks
-        for ask in data.get('a', []):
-            price = float(ask[0])
-            qty = float(ask[1])
-            if qty == 0:
-                self.order_book['asks'].pop(price, None)  # Remove
-            else:
-                self.order_book['asks'][price] = qty  # Add/Update
+        self.request_book_resync(f"sequence gap (last u={self.order_book.last_update_id}, "
+                                 f"U={update.first_update_id}, pu={update.prev_final_update_id})")
     
-    def process_trade(self, data):
-        """Process aggTrade data"""
-        price = float(data['p'])
-        quantity = float(data['q'])
-        is_sell = data['m']  # True = seller is maker = SELL
-        timestamp_ms = data['T']
+    def process_trade(self, trade):
+        """Process aggTrade data (AggTrade record)"""
+        price = trade.price
+        quantity = trade.quantity
+        is_sell = trade.is_buyer_maker  # True = buyer is maker = SELL
+        timestamp_ms = trade.timestamp_ms
         
         # Aggregate by second
         trade_second = timestamp_ms // 1000
@@ -299,9 +352,9 @@ class MultiStreamCollector:
             self.second_data['low_price'] = price
         self.second_data['close_price'] = price
     
-    def process_mark_price(self, data):
-        """Process markPrice data for funding rate"""
-        self.funding_rate = float(data.get('r', 0))
+    def process_mark_price(self, mark):
+        """Process markPrice data (MarkPrice record) for funding rate"""
+        self.funding_rate = mark.funding_rate
     
     def save_second_data(self):
         """Save aggregated second data to SQLite"""
@@ -310,9 +363,10 @@ class MultiStreamCollector:
         
         try:
             # Calculate features
-            best_bid, bid_qty, best_ask, ask_qty = self.get_best_bid_ask()
+            with self.book_lock:
+                best_bid, bid_qty, best_ask, ask_qty = self.get_best_bid_ask()
+                book_imbalance = self.calculate_book_imbalance()
             spread = best_ask - best_bid if best_bid and best_ask else 0
-            book_imbalance = self.calculate_book_imbalance()
             
             total_volume = self.second_data['buy_volume'] + self.second_data['sell_volume']
             net_flow = self.second_data['buy_volume'] - self.second_data['sell_volume']
@@ -346,7 +400,7 @@ class MultiStreamCollector:
                 self.funding_rate
             )
             
-            self.trade_buffer.append(row)
+            self.writer.submit(row)
             self.trade_count += 1
             
             # Log periodically
@@ -355,70 +409,15 @@ class MultiStreamCollector:
                     f"Vol={total_volume:.4f} | NetFlow={net_flow:+.4f} | "
                     f"Bid={best_bid:.1f} Ask={best_ask:.1f} | "
                     f"Imbalance={book_imbalance:+.3f} | "
-                    f"Records={self.trade_count}")
-            
-            # Flush to DB
-            if len(self.trade_buffer) >= self.batch_size or time.time() - self.last_flush_time >= 5:
-                self.flush_trades()
+                    f"Records={self.trade_count} | Backlog={self.writer.get_backlog()}")
                 
         except Exception as e:
             log("ERROR", f"Error saving second data: {e}")
     
-    def flush_trades(self):
-        """Flush trades to SQLite database"""
-        if not self.trade_buffer:
-            return 0
-        
-        try:
-            if not self.db_conn:
-                self.db_conn = get_db_connection()
-                ensure_table_exists(self.db_conn)
-            
-            cursor = self.db_conn.cursor()
-            cursor.executemany("""
-                INSERT INTO crypto_trades_v2
-                (bot_id, symbol, timestamp_ms, readable_time,
-                 open, high, low, close,
-                 buy_volume, sell_volume, total_volume, net_flow,
-                 buy_count, sell_count, trade_count,
-                 best_bid, best_ask, bid_qty, ask_qty,
-                 spread, book_imbalance, funding_rate)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, self.trade_buffer)
-            
-            self.db_conn.commit()
-            batch_count = len(self.trade_buffer)
-            self.trade_buffer.clear()
-            self.last_flush_time = time.time()
-            
-            return batch_count
-            
-        except Exception as e:
-            log("ERROR", f"Database write error: {e}")
-            self.trade_buffer.clear()
-            # Reconnect on error
-            if self.db_conn:
-                try:
-                    self.db_conn.close()
-                except:
-                    pass
-                self.db_conn = None
-            return 0
-    
     def on_message(self, ws, message):
         """Handle incoming WebSocket messages"""
         try:
-            msg = json.loads(message)
-            stream = msg.get('stream', '')
-            data = msg.get('data', {})
-            
-            if '@aggTrade' in stream:
-                self.process_trade(data)
-            elif '@depth' in stream:
-                self.process_depth_update(data)
-            elif '@markPrice' in stream:
-                self.process_mark_price(data)
-                
+            self.decoder.dispatch(message)
         except Exception as e:
             log("ERROR", f"Message processing error: {e}")
     
@@ -429,23 +428,18 @@ class MultiStreamCollector:
         # Save remaining data
         if self.second_data['trades']:
             self.save_second_data()
-        if self.trade_buffer:
-            batch_count = self.flush_trades()
-            log("INFO", f"Flushed {batch_count} remaining records")
-        
-        # Close database connection
-        if self.db_conn:
-            try:
-                self.db_conn.close()
-            except:
-                pass
-            self.db_conn = None
         
-        log("WARNING", "WebSocket closed. Will reconnect...")
+        # Queued rows stay with the writer thread across reconnects
+        log("WARNING", f"WebSocket closed. Will reconnect... (Backlog: {self.writer.get_backlog()})")
     
     def on_open(self, ws):
+        # Start buffering diffs now, then sync the book from a snapshot
+        with self.book_lock:
+            self.depth_buffer = []
+        self.request_book_resync("stream connected")
+        
         log("INFO", f"Connected to {self.socket_type.upper()} WebSocket")
-        log("INFO", f"Streams: aggTrade + depth@500ms + markPrice")
+        log("INFO", f"Streams: aggTrade + {self.depth_stream.split('@', 1)[1]} + markPrice (JSON: {JSON_BACKEND})")
         log("INFO", f"Storage: SQLite (crypto_trades_v2 table)")
         log("INFO", f"Collecting data (Bot ID: {self.bot_id})...")
     
@@ -463,15 +457,11 @@ class MultiStreamCollector:
         
         sslopt = {"cert_reqs": ssl.CERT_NONE}
         
+        self.writer.start()
+        
         while True:
             try:
-                # Step 1: Initialize Order Book from REST API
-                if not self.initialize_order_book():
-                    log("WARNING", f"Order Book init failed. Retrying in {RECONNECT_DELAY}s...")
-                    time.sleep(RECONNECT_DELAY)
-                    continue
-                
-                # Step 2: Connect to WebSocket
+                # Connect to WebSocket (on_open syncs the Order Book from REST)
                 self.ws = WebSocketApp(
                     self.ws_url,
                     on_open=self.on_open,
@@ -489,11 +479,8 @@ class MultiStreamCollector:
                 log("INFO", "Bot stopped by user")
                 if self.second_data['trades']:
                     self.save_second_data()
-                if self.trade_buffer:
-                    batch_count = self.flush_trades()
-                    log("INFO", f"Flushed {batch_count} remaining records")
-                if self.db_conn:
-                    self.db_conn.close()
+                # Write remaining records
+                self.writer.stop()
                 sys.exit(0)
                 
             except Exception as e:
@@ -514,6 +501,10 @@ if __name__ == "__main__":
     parser.add_argument('--socket-type', type=str, choices=['spot', 'future', 'demo'],
                         default='demo', help='Socket type (default: demo)')
     parser.add_argument('--batch-size', type=int, default=50, help='Batch size for DB writes')
+    parser.add_argument('--depth-interval', type=str, choices=['100ms', '250ms', '500ms'],
+                        default='500ms', help='Depth diff stream speed (default: 500ms)')
+    parser.add_argument('--depth-limit', type=int, choices=[5, 10, 20, 50, 100, 500, 1000],
+                        default=20, help='Order book snapshot levels (default: 20)')
     
     args = parser.parse_args()
     
@@ -521,5 +512,6 @@ if __name__ == "__main__":
         log("ERROR", f"Invalid socket type: {args.socket_type}")
         sys.exit(1)
     
-    collector = MultiStreamCollector(args.bot_id, args.symbol, args.socket_type, args.batch_size)
+    collector = MultiStreamCollector(args.bot_id, args.symbol, args.socket_type, args.batch_size,
+                                     args.depth_interval, args.depth_limit)
     collector.start()
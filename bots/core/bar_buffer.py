@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Bar Ring Buffer
+Fixed-capacity, column-oriented store for per-second bars backed by NumPy
+"""
+
+import numpy as np
+
+BAR_COLUMNS = (
+    ('timestamp', np.int64),
+    ('close', np.float64),
+    ('high', np.float64),
+    ('low', np.float64),
+    ('total_volume', np.float64),
+    ('net_flow', np.float64),
+    ('trade_count', np.int64),
+)
+
+
+class BarRingBuffer:
+    """
+    Ring buffer of 1-second bars, one NumPy array per column
+
+    Every value is written twice (slot i and slot i + capacity), so the
+    most recent N bars are always one contiguous slice. window() therefore
+    returns a view into the arrays without copying or allocating data.
+    """
+
+    def __init__(self, capacity=60):
+        self.capacity = capacity
+        self.columns = {
+            name: np.zeros(capacity * 2, dtype=dtype)
+            for name, dtype in BAR_COLUMNS
+        }
+        self.count = 0
+        self.pos = 0  # slot of the next write
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def clear(self):
+        """Drop all bars (arrays are reused)"""
+        self.count = 0
+        self.pos = 0
+
+    def append(self, bar):
+        """
+        Append a closed bar
+        Args:
+            bar: dict with keys: timestamp, close, high, low, total_volume, net_flow, trade_count
+        """
+        pos = self.pos
+        mirror = pos + self.capacity
+
+        for name, array in self.columns.items():
+            value = bar.get(name, 0)
+            array[pos] = value
+            array[mirror] = value
+
+        self.pos = (pos + 1) % self.capacity
+        self.count += 1
+
+    def window(self, column, n=None):
+        """
+        Get the last n values of a column, oldest first (read-only view)
+        Args:
+            column: column name (see BAR_COLUMNS)
+            n: number of bars (default: everything in the buffer)
+        """
+        size = len(self)
+        n = size if n is None else min(n, size)
+
+        end = self.pos + self.capacity
+        view = self.columns[column][end - n:end]
+        view.flags.writeable = False
+        return view
+
+    def last(self, column, offset=0):
+        """Get a single value, offset bars back from the latest one"""
+        if offset >= len(self):
+            raise IndexError("Bar buffer does not hold that many bars")
+        return self.columns[column][self.pos + self.capacity - 1 - offset]
+
+    def latest(self):
+        """Get the latest bar as a dict (None if empty)"""
+        if self.count == 0:
+            return None
+        return {name: self.last(name).item() for name in self.columns}
+
+    def to_dataframe(self, n=None):
+        """Copy the last n bars into a DataFrame (for pandas-based code)"""
+        import pandas as pd
+
+        return pd.DataFrame({name: self.window(name, n) for name in self.columns})
@@ -5,6 +5,9 @@ Feature Engineering
 Calculate trading features from market data
 """
 
+import math
+from collections import deque
+
 import pandas as pd
 
 class FeatureEngineer:
@@ -90,3 +93,224 @@ class FeatureEngineer:
             return rsi.iloc[-1]
         except:
             return 50  # Neutral RSI
+
+
+class _RollingWindow:
+    """
+    Fixed-size rolling window with a running sum and sliding Welford variance
+    Values are kept relative to an anchor (a recent value) so that sums of
+    ~1e5 prices do not lose the small differences the std depends on.
+    """
+
+    RESYNC_INTERVAL = 200
+
+    def __init__(self, size):
+        self.size = size
+        self.values = deque(maxlen=size)
+        self.anchor = None
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.updates = 0
+
+    def push(self, value):
+        """Add a value, dropping the oldest once the window is full"""
+        value = float(value)
+        if self.anchor is None:
+            self.anchor = value
+
+        x = value - self.anchor
+        if len(self.values) == self.size:
+            old = self.values[0] - self.anchor
+            self.values.append(value)
+            self.total += x - old
+            old_mean = self.mean
+            self.mean += (x - old) / self.size
+            self.m2 += (x - old) * (x - self.mean + old - old_mean)
+        else:
+            self.values.append(value)
+            self.total += x
+            delta = x - self.mean
+            self.mean += delta / len(self.values)
+            self.m2 += delta * (x - self.mean)
+
+        # Re-anchor and recompute now and then so float drift cannot build up
+        self.updates += 1
+        if self.updates % self.RESYNC_INTERVAL == 0:
+            self._resync()
+
+    def _resync(self):
+        self.anchor = self.values[-1]
+        shifted = [v - self.anchor for v in self.values]
+        self.total = math.fsum(shifted)
+        self.mean = self.total / len(shifted)
+        self.m2 = math.fsum((v - self.mean) ** 2 for v in shifted)
+
+    def is_full(self):
+        return len(self.values) == self.size
+
+    def get_mean(self):
+        return self.anchor + self.total / self.size
+
+    def get_std(self):
+        """Sample standard deviation (ddof=1, same as pandas)"""
+        return math.sqrt(max(self.m2, 0.0) / (self.size - 1))
+
+
+class IncrementalFeatureEngine:
+    """
+    Streaming version of FeatureEngineer.calculate_features
+    Call update() once per closed 1-second bar; get_features() is O(1)
+    and returns the same dict as the pandas implementation.
+    """
+
+    def __init__(self, window_size=60, rsi_period=14, rsi_method='sma', logger=None):
+        self.window_size = window_size
+        self.rsi_period = rsi_period
+        self.rsi_method = rsi_method
+        self.logger = logger
+        self.reset()
+
+    def reset(self):
+        """Clear all streaming state"""
+        self.bar_count = 0
+        self.latest = None
+
+        # Last 11 closes are enough for price_change_10 / momentum_10
+        self.closes = deque(maxlen=11)
+
+        self.close_windows = {n: _RollingWindow(n) for n in (5, 10, 20, 30)}
+        self.net_flow_windows = {n: _RollingWindow(n) for n in (5, 10, 20)}
+        self.volume_windows = {n: _RollingWindow(n) for n in (5, 10)}
+
+        # RSI state
+        self.gain_window = _RollingWindow(self.rsi_period)
+        self.loss_window = _RollingWindow(self.rsi_period)
+        self.avg_gain = None
+        self.avg_loss = None
+        self.rsi_deltas = 0
+
+    def update(self, bar):
+        """
+        Add a closed 1-second bar
+        Args:
+            bar: dict with keys: timestamp, close, high, low, total_volume, net_flow, trade_count
+        """
+        close = float(bar['close'])
+
+        if self.closes:
+            self._update_rsi(close - self.closes[-1])
+
+        self.closes.append(close)
+        for window in self.close_windows.values():
+            window.push(close)
+
+        net_flow = bar.get('net_flow', 0)
+        for window in self.net_flow_windows.values():
+            window.push(net_flow)
+
+        total_volume = bar.get('total_volume', 0)
+        for window in self.volume_windows.values():
+            window.push(total_volume)
+
+        self.latest = bar
+        self.bar_count += 1
+
+    def _update_rsi(self, delta):
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        self.rsi_deltas += 1
+
+        if self.rsi_method == 'wilder':
+            period = self.rsi_period
+            if self.rsi_deltas <= period:
+                # Seed with a simple average of the first `period` deltas
+                self.gain_window.push(gain)
+                self.loss_window.push(loss)
+                if self.rsi_deltas == period:
+                    self.avg_gain = self.gain_window.get_mean()
+                    self.avg_loss = self.loss_window.get_mean()
+            else:
+                self.avg_gain = (self.avg_gain * (period - 1) + gain) / period
+                self.avg_loss = (self.avg_loss * (period - 1) + loss) / period
+        else:
+            self.gain_window.push(gain)
+            self.loss_window.push(loss)
+            if self.gain_window.is_full():
+                self.avg_gain = self.gain_window.get_mean()
+                self.avg_loss = self.loss_window.get_mean()
+
+    def _get_rsi(self):
+        if self.avg_gain is None:
+            return 50
+        if self.avg_loss == 0:
+            # Matches pandas: x/0 -> inf -> RSI 100, 0/0 -> NaN
+            return 100.0 if self.avg_gain > 0 else float('nan')
+        rs = self.avg_gain / self.avg_loss
+        return 100 - (100 / (1 + rs))
+
+    def is_ready(self):
+        """True once a full window of bars has been seen"""
+        return self.bar_count >= self.window_size
+
+    def get_features(self):
+        """
+        Get features for the latest bar
+        Returns:
+            dict: Feature dictionary for prediction (None until the window is full)
+        """
+        try:
+            if not self.is_ready():
+                return None
+
+            latest = self.latest
+            closes = self.closes
+            close = closes[-1]
+
+            return {
+                # Basic price features
+                'close': latest['close'],
+                'high': latest['high'],
+                'low': latest['low'],
+
+                # Volume features
+                'total_volume': latest.get('total_volume', 0),
+                'trade_count': latest.get('trade_count', 0),
+
+                # Net flow features
+                'net_flow': latest.get('net_flow', 0),
+                'net_flow_ma5': self.net_flow_windows[5].get_mean(),
+                'net_flow_ma10': self.net_flow_windows[10].get_mean(),
+                'net_flow_ma20': self.net_flow_windows[20].get_mean(),
+
+                # Price change features
+                'price_change_1': (close - closes[-2]) / closes[-2],
+                'price_change_5': (close - closes[-6]) / closes[-6],
+                'price_change_10': (close - closes[-11]) / closes[-11],
+
+                # Volatility features
+                'price_std_5': self.close_windows[5].get_std(),
+                'price_std_10': self.close_windows[10].get_std(),
+
+                # Moving averages
+                'ma5': self.close_windows[5].get_mean(),
+                'ma10': self.close_windows[10].get_mean(),
+                'ma20': self.close_windows[20].get_mean(),
+                'ma30': self.close_windows[30].get_mean(),
+
+                # Volume moving averages
+                'volume_ma5': self.volume_windows[5].get_mean(),
+                'volume_ma10': self.volume_windows[10].get_mean(),
+
+                # RSI-like features
+                'rsi_14': self._get_rsi(),
+
+                # Momentum features
+                'momentum_5': close - closes[-6],
+                'momentum_10': close - closes[-11],
+            }
+
+        except Exception as e:
+            if self.logger:
+                self.logger.error(f"Feature calculation error: {e}")
+            return None
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Inference Client
+Predictor interface backed by the shared inference service
+(inference_server.py): the model is loaded once in the service and rows
+from all bots are micro-batched there.
+
+Protocol: one JSON object per line over a Unix socket, one request in
+flight per connection (each thread gets its own connection).
+    {"op": "load", "model": path}
+        -> {"ok": true, "model": path, "feature_names": [...], "schema": "...", "num_trees": n}
+    {"op": "predict", "model": path, "schema": "...", "row": [...]}
+        -> {"ok": true, "p": probability} | {"ok": false, "error": "...", "stale": true}
+    {"op": "metrics"} -> {"ok": true, "models": {path: {...}}}
+A reply with "stale" means the model's features changed (hot-swap): load again.
+"""
+
+import hashlib
+import json
+import os
+import socket
+import threading
+
+DEFAULT_SOCKET_PATH = "/tmp/bot_inference.sock"
+
+
+def feature_schema(feature_names):
+    """Short id of a feature order; rows are only accepted for the schema they were built with"""
+    return hashlib.sha1(" ".join(feature_names).encode()).hexdigest()[:12]
+
+
+class _Connection:
+    def __init__(self, socket_path, timeout):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(socket_path)
+        self.reader = self.sock.makefile('rb')
+
+    def request(self, message):
+        self.sock.sendall(json.dumps(message, separators=(',', ':')).encode() + b"\n")
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("Inference service closed the connection")
+        return json.loads(line)
+
+    def close(self):
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+def request(message, socket_path=DEFAULT_SOCKET_PATH, timeout=5.0):
+    """One-off request (e.g. metrics)"""
+    connection = _Connection(socket_path, timeout)
+    try:
+        return connection.request(message)
+    finally:
+        connection.close()
+
+
+class RemotePredictor:
+    """Same predict/should_trade/reload interface as core.predictor.Predictor"""
+
+    def __init__(self, model_path, socket_path=DEFAULT_SOCKET_PATH, logger=None, timeout=1.0):
+        self.socket_path = socket_path
+        self.logger = logger
+        self.timeout = timeout
+        self._local = threading.local()
+        # (path, feature_names, schema), replaced as one reference
+        self._active = self._load(model_path)
+        if self.logger:
+            self.logger.info(f"AI Model served by {socket_path}: {model_path} ({len(self.feature_names)} features)")
+
+    @property
+    def model_path(self):
+        return self._active[0]
+
+    @property
+    def feature_names(self):
+        return self._active[1]
+
+    def _request(self, message):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = _Connection(self.socket_path, self.timeout)
+        try:
+            return connection.request(message)
+        except (OSError, ValueError):
+            # Reconnect on the next request
+            connection.close()
+            self._local.connection = None
+            raise
+
+    def _load(self, model_path):
+        # Absolute: the service resolves paths from its own working directory
+        reply = self._request({'op': 'load', 'model': os.path.abspath(model_path)})
+        if not reply.get('ok'):
+            raise RuntimeError(f"Inference service could not load {model_path}: {reply.get('error')}")
+        return reply['model'], reply['feature_names'], reply['schema']
+
+    def predict(self, features):
+        """
+        Make prediction from features
+        Returns: (prediction, confidence)
+        """
+        try:
+            for attempt in range(2):
+                path, feature_names, schema = self._active
+                row = [float(features[name]) for name in feature_names]
+                reply = self._request({'op': 'predict', 'model': path, 'schema': schema, 'row': row})
+                if reply.get('ok'):
+                    confidence = reply['p']
+                    return (1 if confidence >= 0.5 else 0), confidence
+                if reply.get('stale') and attempt == 0:
+                    # Model swapped with other features: fetch the new order and retry
+                    self._active = self._load(path)
+                    continue
+                raise RuntimeError(reply.get('error'))
+
+        except KeyError as e:
+            if self.logger:
+                self.logger.error(f"Prediction error: missing feature {e}")
+            return 0, 0.0
+
+        except Exception as e:
+            if self.logger:
+                self.logger.error(f"Prediction error: {e}")
+            return 0, 0.0
+
+    def should_trade(self, features, threshold=0.40):
+        """
+        Determine if we should trade based on confidence threshold
+        Returns: (should_trade, confidence)
+        """
+        prediction, confidence = self.predict(features)
+        return prediction == 1 and confidence >= threshold, confidence
+
+    def reload(self, model_path=None):
+        """Switch to model_path (the service loads it once for all clients); True if switched"""
+        old_path = self.model_path
+        try:
+            self._active = self._load(model_path or old_path)
+        except Exception as e:
+            if self.logger:
+                self.logger.error(f"Model reload failed, keeping {old_path}: {e}")
+            return False
+        if self.logger:
+            self.logger.info(f"Model swapped: {old_path} -> {self.model_path} (inference service)")
+        return True
+
+    def close(self):
+        """Close this thread's connection (others close with their threads)"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Market Data Engine
+One asyncio event loop, one Binance combined-stream connection per socket type,
+routing aggTrade ticks for many symbols to their per-symbol handlers
+(several bots on one symbol share its stream and each get every tick)
+"""
+
+import asyncio
+import ssl
+import time
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+from .stream_decoder import StreamDecoder
+
+# Combined stream endpoints (streams are appended as ?streams=a/b/c)
+STREAM_BASE_URLS = {
+    "spot": "wss://stream.binance.com:9443/stream",
+    "future": "wss://fstream.binance.com/stream",
+    "demo": "wss://demo-dstream.binance.com/stream"
+}
+
+# Binance allows up to 1024 streams per connection; stay well below it
+MAX_STREAMS_PER_CONNECTION = 200
+
+
+class MarketDataEngine:
+    def __init__(self, logger, reconnect_delay=5):
+        self.logger = logger
+        self.reconnect_delay = reconnect_delay
+
+        # socket_type -> {symbol (lower): [handlers]}
+        self.routes = {}
+        self.running = False
+
+        # One decoder (stream name -> handler table) per connection
+        self.decoders = []
+        self.last_message_time = None
+
+    def register(self, symbol, handler, socket_type='demo'):
+        """
+        Route aggTrade ticks for a symbol to a handler (in addition to any already registered)
+        Args:
+            handler: object with process_trade(timestamp, price, quantity, is_buyer_maker)
+        """
+        if socket_type not in STREAM_BASE_URLS:
+            socket_type = 'demo'
+        handlers = self.routes.setdefault(socket_type, {}).setdefault(symbol.lower(), [])
+        handlers.append(handler)
+        self.logger.info(f"Market data: {symbol.upper()} registered on {socket_type.upper()} stream"
+                         f"{f' ({len(handlers)} handlers)' if len(handlers) > 1 else ''}")
+
+    def _connections(self, socket_type):
+        """Split a socket type's symbols (one stream each) into (combined-stream URL, {symbol: [handlers]}) pairs"""
+        handlers = self.routes[socket_type]
+        symbols = sorted(handlers)
+        base_url = STREAM_BASE_URLS[socket_type]
+
+        connections = []
+        for i in range(0, len(symbols), MAX_STREAMS_PER_CONNECTION):
+            chunk = symbols[i:i + MAX_STREAMS_PER_CONNECTION]
+            streams = "/".join(f"{symbol}@aggTrade" for symbol in chunk)
+            connections.append((f"{base_url}?streams={streams}", {symbol: handlers[symbol] for symbol in chunk}))
+        return connections
+
+    def _build_decoder(self, handlers):
+        """Route each symbol's aggTrade stream to all of its handlers"""
+        decoder = StreamDecoder()
+        for symbol, symbol_handlers in handlers.items():
+            decoder.register(f"{symbol}@aggTrade", self._fan_out(symbol, symbol_handlers))
+        self.decoders.append(decoder)
+        return decoder
+
+    def _fan_out(self, symbol, handlers):
+        """One decoder callback passing each aggTrade to every handler of a symbol"""
+        def dispatch(trade):
+            for handler in handlers:
+                # AggTrade fields line up with process_trade(timestamp, price, quantity, is_buyer_maker)
+                try:
+                    handler.process_trade(*trade)
+                except Exception as e:
+                    # One failing bot must not starve the others on this symbol
+                    self.logger.error(f"Market data handler error ({symbol.upper()}): {e}")
+        return dispatch
+
+    async def _run_connection(self, url, handlers):
+        """Keep one combined-stream connection alive"""
+        # Match the existing collectors: no certificate verification
+        ssl_context = ssl.create_default_context()
+        ssl_context.check_hostname = False
+        ssl_context.verify_mode = ssl.CERT_NONE
+
+        symbols = ", ".join(symbol.upper() for symbol in sorted(handlers))
+        decoder = self._build_decoder(handlers)
+
+        while self.running:
+            try:
+                async with websockets.connect(
+                    url,
+                    ssl=ssl_context,
+                    ping_interval=20,
+                    ping_timeout=10,
+                    max_size=2 ** 20
+                ) as ws:
+                    self.logger.info(f"Market data connected: {symbols}")
+
+                    async for message in ws:
+                        self.last_message_time = time.time()
+                        try:
+                            decoder.dispatch(message)
+                        except Exception as e:
+                            self.logger.error(f"Market data dispatch error: {e}")
+
+                self.logger.warning("Market data stream closed, will reconnect...")
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Market data stream error: {e}")
+
+            if self.running:
+                self.logger.info(f"Reconnecting in {self.reconnect_delay}s...")
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def run(self):
+        """Run all connections until stop() is called or the task is cancelled"""
+        if websockets is None:
+            raise ImportError("The 'websockets' package is required for multi-symbol mode (pip install websockets)")
+
+        self.running = True
+        tasks = []
+        for socket_type in self.routes:
+            for url, handlers in self._connections(socket_type):
+                tasks.append(asyncio.create_task(self._run_connection(url, handlers)))
+
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def start(self):
+        """Blocking entry point"""
+        symbols = sum(len(handlers) for handlers in self.routes.values())
+        handlers = sum(len(h) for routes in self.routes.values() for h in routes.values())
+        self.logger.info(f"Starting market data engine for {symbols} symbols ({handlers} handlers)")
+        asyncio.run(self.run())
+
+    def stop(self):
+        """Ask all connections to finish"""
+        self.running = False
+
+    def get_stats(self):
+        """Get routing counters"""
+        return {
+            'messages': sum(decoder.decoded for decoder in self.decoders),
+            'unrouted': sum(decoder.unrouted for decoder in self.decoders),
+            'symbols': sum(len(handlers) for handlers in self.routes.values()),
+            'handlers': sum(len(h) for handlers in self.routes.values() for h in handlers.values()),
+            'last_message_time': self.last_message_time
+        }
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Order Book
+Price levels kept sorted incrementally, so best bid/ask, top-N depth,
+imbalance and microprice never need a full sort.
+Also validates Binance diff-depth sequencing (U/u/pu) against the snapshot.
+"""
+
+from bisect import bisect_left, insort
+
+
+class _BookSide:
+    """One side of the book: ascending price list + price -> qty map"""
+
+    def __init__(self):
+        self.prices = []
+        self.qty = {}
+
+    def clear(self):
+        self.prices.clear()
+        self.qty.clear()
+
+    def set(self, price, qty):
+        """Add/update a level, or remove it when qty is 0"""
+        if qty == 0:
+            if self.qty.pop(price, None) is not None:
+                i = bisect_left(self.prices, price)
+                del self.prices[i]
+        else:
+            if price not in self.qty:
+                insort(self.prices, price)
+            self.qty[price] = qty
+
+    def __len__(self):
+        return len(self.prices)
+
+
+# apply_update() results
+UPDATE_APPLIED = 'applied'
+UPDATE_STALE = 'stale'  # already contained in the snapshot, dropped
+UPDATE_GAP = 'gap'      # sequence broken, the book needs a new snapshot
+
+
+class OrderBook:
+    def __init__(self):
+        self.bids = _BookSide()
+        self.asks = _BookSide()
+
+        # Sequencing
+        self.last_update_id = 0
+        self.first_update_pending = True
+
+    def clear(self):
+        self.bids.clear()
+        self.asks.clear()
+        self.last_update_id = 0
+        self.first_update_pending = True
+
+    def load_snapshot(self, bids, asks, last_update_id=0):
+        """Replace the book with a REST snapshot ([price, qty] pairs, str or float)"""
+        self.clear()
+        self.apply(bids, asks)
+        self.last_update_id = last_update_id
+
+    def apply_update(self, update):
+        """
+        Apply a DepthUpdate only if it continues the sequence
+        Rules (Binance "manage a local order book"):
+            - drop events with u <= lastUpdateId
+            - the first applied event must have U <= lastUpdateId + 1
+              (or, on futures, pu == lastUpdateId)
+            - futures: every later event's pu must equal the previous u
+            - spot (no pu): every later event's U must be previous u + 1
+        Returns: UPDATE_APPLIED, UPDATE_STALE or UPDATE_GAP
+        """
+        if update.final_update_id <= self.last_update_id:
+            return UPDATE_STALE
+
+        if self.first_update_pending:
+            if (update.first_update_id > self.last_update_id + 1
+                    and update.prev_final_update_id != self.last_update_id):
+                return UPDATE_GAP
+        elif update.prev_final_update_id is not None:
+            if update.prev_final_update_id != self.last_update_id:
+                return UPDATE_GAP
+        elif update.first_update_id != self.last_update_id + 1:
+            return UPDATE_GAP
+
+        self.apply(update.bids, update.asks)
+        self.last_update_id = update.final_update_id
+        self.first_update_pending = False
+        return UPDATE_APPLIED
+
+    def apply(self, bids, asks):
+        """Apply a depth diff ([price, qty] pairs, qty 0 removes the level)"""
+        for price, qty in bids:
+            self.bids.set(float(price), float(qty))
+        for price, qty in asks:
+            self.asks.set(float(price), float(qty))
+
+    def is_empty(self):
+        return not self.bids.prices or not self.asks.prices
+
+    def best_bid(self):
+        """Returns: (price, qty), (0, 0) if empty"""
+        if not self.bids.prices:
+            return 0, 0
+        price = self.bids.prices[-1]
+        return price, self.bids.qty[price]
+
+    def best_ask(self):
+        """Returns: (price, qty), (0, 0) if empty"""
+        if not self.asks.prices:
+            return 0, 0
+        price = self.asks.prices[0]
+        return price, self.asks.qty[price]
+
+    def top_bids(self, levels=5):
+        """Best `levels` bids, highest first: [(price, qty), ...]"""
+        prices = self.bids.prices[:-levels - 1:-1] if levels else []
+        return [(price, self.bids.qty[price]) for price in prices]
+
+    def top_asks(self, levels=5):
+        """Best `levels` asks, lowest first: [(price, qty), ...]"""
+        return [(price, self.asks.qty[price]) for price in self.asks.prices[:levels]]
+
+    def depth(self, levels=5):
+        """Total (bid_volume, ask_volume) over the top `levels`"""
+        bid_volume = sum(qty for _, qty in self.top_bids(levels))
+        ask_volume = sum(qty for _, qty in self.top_asks(levels))
+        return bid_volume, ask_volume
+
+    def spread(self):
+        best_bid, _ = self.best_bid()
+        best_ask, _ = self.best_ask()
+        return best_ask - best_bid if best_bid and best_ask else 0
+
+    def imbalance(self, levels=5):
+        """Imbalance over the top `levels`: +1 = all bids, -1 = all asks"""
+        if self.is_empty():
+            return 0.0
+
+        bid_volume, ask_volume = self.depth(levels)
+        total = bid_volume + ask_volume
+        if total == 0:
+            return 0.0
+        return (bid_volume - ask_volume) / total
+
+    def microprice(self):
+        """Size-weighted mid: leans towards the side with less resting size"""
+        best_bid, bid_qty = self.best_bid()
+        best_ask, ask_qty = self.best_ask()
+        if not best_bid or not best_ask:
+            return 0.0
+
+        total = bid_qty + ask_qty
+        if total == 0:
+            return (best_bid + best_ask) / 2
+        return (best_bid * ask_qty + best_ask * bid_qty) / total
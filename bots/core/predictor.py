@@ -3,25 +3,136 @@
 """
 AI Predictor
 Loads LightGBM model and makes predictions
+
+Feature dicts are written in the model's feature_name() order (bound once at
+load) into a preallocated float64 row, and the model is called with that
+NumPy row directly: no per-call DataFrame. Extra keys in the dict are ignored.
+
+By default the model file is compiled into a NumPy evaluator
+(core.tree_model), so lightgbm is not imported at all; models the compiler
+does not support are loaded with lightgbm instead.
+
+Hot-swap: reload() loads and validates a model on the calling thread while
+the current one keeps serving, then replaces it with a single reference
+assignment, so every prediction runs entirely on the old or the new model.
+watch_file() does this in the background when the model file changes.
 """
 
-import lightgbm as lgb
-import pandas as pd
+import os
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from core.tree_model import CompiledModel, UnsupportedModelError
+
+# Everything a prediction needs, swapped as one reference
+LoadedModel = namedtuple('LoadedModel', ['path', 'model', 'feature_names', 'predict_params', 'signature'])
+
+
+def _file_signature(path):
+    """(mtime_ns, size) of the model file, None if it cannot be read"""
+    try:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    except OSError:
+        return None
+
 
 class Predictor:
-    def __init__(self, model_path, logger=None):
+    def __init__(self, model_path, logger=None, num_threads=1, compiled=True):
         self.logger = logger
-        self.model = None
+        self.num_threads = num_threads
+        self.compiled = compiled
+        self.predictions = 0
+        self._last_features = None
+        # Row buffer per thread (bots sharing this Predictor predict from their own workers)
+        self._local = threading.local()
+        self._reload_lock = threading.Lock()
+        self._watcher_thread = None
+        self._watcher_running = False
 
         try:
-            self.model = lgb.Booster(model_file=model_path)
+            start = time.time()
+            self._active = self._load(model_path)
             if self.logger:
-                self.logger.info(f"AI Model loaded from: {model_path}")
+                self.logger.info(f"AI Model loaded from: {model_path} ({self._engine(self.model)}, "
+                                 f"{(time.time() - start) * 1000:.0f} ms)")
         except Exception as e:
             if self.logger:
                 self.logger.error(f"Failed to load model: {e}")
             raise
 
+    @property
+    def model(self):
+        return self._active.model
+
+    @property
+    def feature_names(self):
+        return self._active.feature_names
+
+    @property
+    def model_path(self):
+        return self._active.path
+
+    @staticmethod
+    def _engine(model):
+        return 'compiled' if isinstance(model, CompiledModel) else 'lightgbm'
+
+    def _load(self, model_path):
+        """Load (and validate) a model file; raises on failure"""
+        signature = _file_signature(model_path)
+        model = None
+        predict_params = {}
+        if self.compiled:
+            try:
+                model = CompiledModel.from_file(model_path)
+            except UnsupportedModelError as e:
+                if self.logger:
+                    self.logger.warning(f"Model not compiled ({e}), using lightgbm")
+        if model is None:
+            import lightgbm as lgb
+            model = lgb.Booster(model_file=model_path)
+            # Single rows: one thread beats OpenMP start-up; the buffer always has
+            # exactly len(feature_names) columns, so the shape check can be skipped
+            predict_params = {'num_threads': self.num_threads, 'predict_disable_shape_check': True}
+
+        # Column order of the row buffer = training column order
+        feature_names = model.feature_name()
+        if not feature_names or model.num_trees() == 0:
+            raise ValueError(f"Model has no features or no trees: {model_path}")
+        probability = model.predict(np.zeros((1, len(feature_names))), **predict_params)[0]
+        if not 0.0 <= probability <= 1.0:
+            raise ValueError(f"Model output {probability} is not a probability: {model_path}")
+
+        return LoadedModel(model_path, model, feature_names, predict_params, signature)
+
+    def _row(self, size):
+        row = getattr(self._local, 'row', None)
+        if row is None or row.shape[1] != size:
+            row = self._local.row = np.empty((1, size), dtype=np.float64)
+        return row
+
+    def _predict(self, active, features):
+        if isinstance(features, dict):
+            # Fill the preallocated row in model feature order
+            row = self._row(len(active.feature_names))
+            values = row[0]
+            for i, name in enumerate(active.feature_names):
+                values[i] = features[name]
+            probabilities = active.model.predict(row, **active.predict_params)
+        else:
+            # DataFrame / array with the model's columns
+            probabilities = active.model.predict(features)
+
+        # Get confidence (probability of class 1)
+        if len(probabilities.shape) > 1:
+            # Multi-class
+            return probabilities[0][1]
+        # Binary
+        return probabilities[0]
+
     def predict(self, features):
         """
         Make prediction from features
@@ -30,33 +141,43 @@ class Predictor:
             confidence: probability (0.0 to 1.0)
         """
         try:
-            # Convert features dict to DataFrame
-            if isinstance(features, dict):
-                df = pd.DataFrame([features])
-            else:
-                df = features
-
-            # Make prediction
-            probabilities = self.model.predict(df)
-
-            # Get confidence (probability of class 1)
-            if len(probabilities.shape) > 1:
-                # Multi-class
-                confidence = probabilities[0][1]
-            else:
-                # Binary
-                confidence = probabilities[0]
+            # One model for the whole prediction, even if a swap happens meanwhile
+            confidence = self._predict(self._active, features)
+            self.predictions += 1
+            self._last_features = features
 
             # Determine prediction
             prediction = 1 if confidence >= 0.5 else 0
 
             return prediction, confidence
 
+        except KeyError as e:
+            if self.logger:
+                self.logger.error(f"Prediction error: missing feature {e}")
+            return 0, 0.0
+
         except Exception as e:
             if self.logger:
                 self.logger.error(f"Prediction error: {e}")
             return 0, 0.0
 
+    def probability(self, features):
+        """
+        Probability of class 1 for a feature dict (or model-column DataFrame/array)
+        Unlike predict(), errors are raised, not swallowed; not counted in predictions.
+        """
+        return self._predict(self._active, features)
+
+    def predict_batch(self, rows):
+        """
+        Probabilities for a (rows, features) float64 array in feature_names order
+        (one model for the whole batch; errors are raised, not swallowed)
+        """
+        active = self._active
+        probabilities = active.model.predict(rows, **active.predict_params)
+        self.predictions += len(rows)
+        return probabilities if probabilities.ndim == 1 else probabilities[:, 1]
+
     def should_trade(self, features, threshold=0.40):
         """
         Determine if we should trade based on confidence threshold
@@ -67,3 +188,95 @@ class Predictor:
         should_trade = prediction == 1 and confidence >= threshold
 
         return should_trade, confidence
+
+    # =========================
+    # Hot-swap
+    # =========================
+    def reload(self, model_path=None):
+        """
+        Load model_path (default: the current file again) and swap it in
+        The current model keeps serving during the load and stays if it fails.
+        Returns: True if swapped
+        """
+        with self._reload_lock:
+            old = self._active
+            model_path = model_path or old.path
+            start = time.time()
+            served = self.predictions
+
+            try:
+                new = self._load(model_path)
+            except Exception as e:
+                if self.logger:
+                    self.logger.error(f"Model reload failed, keeping {old.path}: {e}")
+                return False
+
+            load_ms = (time.time() - start) * 1000
+            self._active = new
+
+            if self.logger:
+                self.logger.info(f"Model swapped: {old.path} -> {new.path} ({self._engine(new.model)}, "
+                                 f"{new.model.num_trees()} trees, loaded in {load_ms:.0f} ms, "
+                                 f"{self.predictions - served} predictions served meanwhile)")
+                if new.feature_names != old.feature_names:
+                    self.logger.warning(f"Model features changed: {old.feature_names} -> {new.feature_names}")
+                self._log_continuity(old, new)
+            return True
+
+    def _log_continuity(self, old, new):
+        """Confidence of the old and new model on the last features seen"""
+        features = self._last_features
+        if features is None:
+            return
+        try:
+            before = self._predict(old, features)
+            after = self._predict(new, features)
+            self.logger.info(f"Model continuity: last features {before*100:.2f}% (old) -> {after*100:.2f}% (new)")
+        except Exception as e:
+            self.logger.warning(f"Model continuity check skipped: {e}")
+
+    def watch_file(self, interval=5):
+        """
+        Reload when the model file changes (polls mtime/size every interval seconds)
+        A change is loaded once the file has been unchanged for one interval,
+        so a model that is still being written is not picked up.
+        """
+        if self._watcher_running:
+            return
+        self._watcher_running = True
+
+        def watcher():
+            pending = failed = None
+            while self._watcher_running:
+                time.sleep(interval)
+                if not self._watcher_running:
+                    break
+                try:
+                    active = self._active
+                    signature = _file_signature(active.path)
+                    if signature is None or signature in (active.signature, failed):
+                        pending = None
+                    elif signature == pending:
+                        if self.logger:
+                            self.logger.info(f"Model file changed: {active.path}")
+                        # A file that fails to load is retried only once it changes again
+                        failed = None if self.reload(active.path) else signature
+                        pending = None
+                    else:
+                        pending = signature
+                except Exception as e:
+                    if self.logger:
+                        self.logger.error(f"Model watcher error: {e}")
+
+        self._watcher_thread = threading.Thread(target=watcher, name="model-watcher", daemon=True)
+        self._watcher_thread.start()
+
+    def stop_watcher(self):
+        """Stop the model file watcher"""
+        self._watcher_running = False
+        if self._watcher_thread:
+            self._watcher_thread.join(timeout=5)
+
+    def close(self):
+        """Release background resources (the file watcher)"""
+        self.stop_watcher()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shadow Models
+Challenger models scored on the live feature stream next to the primary
+model, without trading on them: the bot hands each new feature vector and
+its primary prediction to submit(), which only queues it; a worker thread
+scores every shadow model on it and appends one CSV row per model to the
+shadow log. Each bot has its own ShadowModels, even when bots share the
+primary Predictor.
+
+Log columns:
+    time, bot_id, symbol, primary_model, primary_p, primary_signal, model, p, signal
+(p = probability of class 1, signal = 1 if p >= the caller's threshold).
+One feed and one feature computation serve any number of candidate models;
+compare them later with e.g. pandas.read_csv(log_path).
+"""
+
+import csv
+import os
+import queue
+import threading
+import time
+
+# Feature vectors waiting for the worker; more are dropped (and counted)
+SHADOW_QUEUE_SIZE = 1000
+
+LOG_COLUMNS = ['time', 'bot_id', 'symbol', 'primary_model', 'primary_p', 'primary_signal', 'model', 'p', 'signal']
+
+
+class ShadowModels:
+    def __init__(self, log_path, bot_id, symbol, logger=None, max_queue=SHADOW_QUEUE_SIZE):
+        self.log_path = log_path
+        self.bot_id = bot_id
+        self.symbol = symbol.upper()
+        self.logger = logger
+        self.queue = queue.Queue(maxsize=max_queue)
+        # path -> Predictor, replaced as one reference (under _models_lock)
+        self.models = {}
+        self._models_lock = threading.Lock()
+        # Models whose features were found in a submitted vector
+        self._checked = set()
+        self.scored = 0
+        self.dropped = 0
+        # Last vector submitted: the same snapshot is asked about on every tick
+        self._last = None
+
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="shadow-models", daemon=True)
+        self.thread.start()
+
+    @property
+    def paths(self):
+        return list(self.models)
+
+    def set_models(self, model_paths):
+        """Score exactly these model files (loaded here, not on the worker; failures are logged and skipped)"""
+        from core.predictor import Predictor
+
+        models = {}
+        for path in model_paths:
+            if path in self.models:
+                models[path] = self.models[path]
+                continue
+            try:
+                models[path] = Predictor(path, logger=self.logger)
+            except Exception as e:
+                if self.logger:
+                    self.logger.error(f"Shadow model not loaded, skipping {path}: {e}")
+                continue
+            self._checked.discard(path)
+        with self._models_lock:
+            self.models = models
+        if self.logger:
+            self.logger.info(f"Shadow models: {len(models)} -> {self.log_path}")
+
+    def submit(self, features, primary_model, confidence, threshold):
+        """Queue a feature vector scored by the primary model (never blocks)"""
+        if not self.models or self._last is features:
+            return
+        self._last = features
+        try:
+            self.queue.put_nowait((time.time(), primary_model, confidence, threshold, features))
+        except queue.Full:
+            self.dropped += 1
+
+    def _disable(self, paths):
+        with self._models_lock:
+            self.models = {path: model for path, model in self.models.items() if path not in paths}
+
+    def _open_log(self):
+        directory = os.path.dirname(os.path.abspath(self.log_path))
+        os.makedirs(directory, exist_ok=True)
+        new = not os.path.exists(self.log_path) or os.path.getsize(self.log_path) == 0
+        f = open(self.log_path, 'a', newline='')
+        writer = csv.writer(f)
+        if new:
+            writer.writerow(LOG_COLUMNS)
+        return f, writer
+
+    def _run(self):
+        f = writer = None
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            timestamp, primary_model, confidence, threshold, features = item
+            models = self.models
+            if not models:
+                continue
+
+            if f is None:
+                try:
+                    f, writer = self._open_log()
+                except OSError as e:
+                    if self.logger:
+                        self.logger.error(f"Shadow log not writable, shadow models stopped: {e}")
+                    break
+
+            primary = os.path.basename(primary_model)
+            primary_signal = int(confidence >= threshold)
+            disabled = []
+            for path, predictor in models.items():
+                if path not in self._checked:
+                    # A challenger trained on features the live stream does not compute would fail
+                    # on every vector: report it once and stop scoring it
+                    missing = [name for name in predictor.feature_names if name not in features]
+                    if missing:
+                        if self.logger:
+                            self.logger.error(f"Shadow model {os.path.basename(path)} disabled, features not "
+                                              f"computed by this bot: {missing}")
+                        disabled.append(path)
+                        continue
+                    self._checked.add(path)
+                try:
+                    p = predictor.probability(features)
+                except Exception as e:
+                    if self.logger:
+                        self.logger.error(f"Shadow scoring error ({os.path.basename(path)}): {e}")
+                    continue
+                writer.writerow([f"{timestamp:.3f}", self.bot_id, self.symbol, primary, f"{confidence:.6f}", primary_signal,
+                                 os.path.basename(path), f"{p:.6f}", int(p >= threshold)])
+            if disabled:
+                self._disable(disabled)
+            self.scored += 1
+            if self.queue.empty():
+                f.flush()
+
+        if f is not None:
+            f.close()
+
+    def close(self):
+        """Score what is queued, then stop the worker"""
+        if not self.running:
+            return
+        self.running = False
+        try:
+            self.queue.put(None, timeout=1)
+        except queue.Full:
+            pass
+        self.thread.join(timeout=5)
+        if self.logger:
+            self.logger.info(f"Shadow models stopped: {self.scored:,} vectors scored, {self.dropped:,} dropped")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Stream Decoder
+Fast JSON decoding and table-driven dispatch for Binance aggTrade/depth/markPrice streams
+Uses orjson or msgspec when installed, stdlib json otherwise
+"""
+
+import json
+from collections import namedtuple
+
+try:
+    import orjson
+    loads = orjson.loads
+    JSON_BACKEND = "orjson"
+except ImportError:
+    try:
+        import msgspec
+        loads = msgspec.json.Decoder().decode
+        JSON_BACKEND = "msgspec"
+    except ImportError:
+        loads = json.loads
+        JSON_BACKEND = "json"
+
+# =========================
+# Typed tick records
+# =========================
+# Field order of AggTrade matches WebSocketHandler.process_trade(*trade)
+AggTrade = namedtuple('AggTrade', ['timestamp_ms', 'price', 'quantity', 'is_buyer_maker'])
+
+# bids/asks stay as [price, qty] string pairs; the order book converts them
+DepthUpdate = namedtuple('DepthUpdate', [
+    'event_time', 'first_update_id', 'final_update_id', 'prev_final_update_id', 'bids', 'asks'
+])
+
+MarkPrice = namedtuple('MarkPrice', ['event_time', 'mark_price', 'funding_rate'])
+
+
+def parse_agg_trade(data):
+    return AggTrade(data['T'], float(data['p']), float(data['q']), data['m'])
+
+
+def parse_depth_update(data):
+    # 'pu' only exists on futures streams
+    return DepthUpdate(data.get('E', 0), data.get('U', 0), data.get('u', 0), data.get('pu'),
+                       data.get('b', []), data.get('a', []))
+
+
+def parse_mark_price(data):
+    return MarkPrice(data.get('E', 0), float(data.get('p') or 0), float(data.get('r') or 0))
+
+
+# Stream type (text after the symbol) -> parser
+STREAM_PARSERS = {
+    'aggTrade': parse_agg_trade,
+    'depth': parse_depth_update,
+    'markPrice': parse_mark_price,
+}
+
+
+def decode_agg_trade(message):
+    """Decode a raw (single-stream) aggTrade message"""
+    return parse_agg_trade(loads(message))
+
+
+class StreamDecoder:
+    """
+    Dispatches combined-stream messages ({"stream": ..., "data": ...})
+    through a table built once from the exact stream names, so the hot path
+    is one JSON decode, one dict lookup and one record constructor.
+    """
+
+    def __init__(self):
+        self.table = {}
+
+        # Stats
+        self.decoded = 0
+        self.unrouted = 0
+
+    def register(self, stream, callback):
+        """
+        Route a stream to a callback taking the typed record
+        Args:
+            stream: full stream name, e.g. 'btcusdc@aggTrade' or 'btcusdc@depth@500ms'
+        """
+        stream_type = stream.split('@')[1]
+        if stream_type not in STREAM_PARSERS:
+            raise ValueError(f"Unsupported stream type: {stream}")
+        self.table[stream] = (STREAM_PARSERS[stream_type], callback)
+
+    def dispatch(self, message):
+        """Decode one combined-stream message and call its handler (errors propagate)"""
+        msg = loads(message)
+        entry = self.table.get(msg.get('stream'))
+
+        if entry is None:
+            self.unrouted += 1
+            return
+
+        parser, callback = entry
+        callback(parser(msg['data']))
+        self.decoded += 1
+
+    def get_stats(self):
+        return {
+            'backend': JSON_BACKEND,
+            'decoded': self.decoded,
+            'unrouted': self.unrouted
+        }
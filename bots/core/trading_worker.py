@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Trading Worker
+Runs order/signal logic on its own thread so slow REST calls never block the socket
+"""
+
+import queue
+import threading
+import time
+
+
+class TradingWorker:
+    """
+    Consumes ticks from a bounded queue and calls on_tick(price) at most once
+    per check_interval. Ticks that queue up while a check is running are
+    coalesced into the latest one; if the queue fills, the oldest tick is
+    dropped so the reader never blocks.
+    """
+
+    STATS_LOG_INTERVAL = 300  # seconds
+
+    def __init__(self, on_tick, logger, max_queue_size=1000, check_interval=2.0):
+        self.on_tick = on_tick
+        self.logger = logger
+        self.check_interval = check_interval
+        self.queue = queue.Queue(maxsize=max_queue_size)
+
+        self.thread = None
+        self.running = False
+        self.last_check_time = 0.0
+        self.last_stats_log = time.time()
+
+        # Counters
+        self.stats = {
+            'enqueued': 0,
+            'dropped': 0,
+            'coalesced': 0,
+            'processed': 0,
+            'max_queue_depth': 0,
+            'last_lag_ms': 0.0,
+            'max_lag_ms': 0.0,
+            'last_check_ms': 0.0,
+            'max_check_ms': 0.0,
+        }
+
+    def start(self):
+        """Start the worker thread"""
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="trading-worker", daemon=True)
+        self.thread.start()
+        self.logger.info("Trading worker started")
+
+    def stop(self, timeout=10):
+        """Stop the worker and wait for the current check to finish"""
+        if not self.running:
+            return
+        self.running = False
+        self._put(None)
+        if self.thread:
+            self.thread.join(timeout=timeout)
+        self.logger.info(f"Trading worker stopped | {self._format_stats()}")
+
+    def submit(self, price, trade_time_ms=None):
+        """Queue a tick (never blocks the caller)"""
+        self.stats['enqueued'] += 1
+        self._put((price, trade_time_ms, time.time()))
+
+        depth = self.queue.qsize()
+        if depth > self.stats['max_queue_depth']:
+            self.stats['max_queue_depth'] = depth
+
+    def _put(self, item):
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.stats['dropped'] += 1
+                except queue.Empty:
+                    pass
+
+    def _run(self):
+        while self.running:
+            try:
+                tick = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            # Only the newest price matters for the order checks
+            while True:
+                try:
+                    newer = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if tick is not None:
+                    self.stats['coalesced'] += 1
+                tick = newer
+
+            if tick is None:
+                break
+
+            now = time.time()
+            if now - self.last_check_time < self.check_interval:
+                continue
+            self.last_check_time = now
+
+            price, trade_time_ms, enqueued_at = tick
+            lag_ms = (now - enqueued_at) * 1000
+            self.stats['last_lag_ms'] = lag_ms
+            self.stats['max_lag_ms'] = max(self.stats['max_lag_ms'], lag_ms)
+
+            try:
+                self.on_tick(price)
+            except Exception as e:
+                self.logger.error(f"Trading worker error: {e}")
+
+            check_ms = (time.time() - now) * 1000
+            self.stats['processed'] += 1
+            self.stats['last_check_ms'] = check_ms
+            self.stats['max_check_ms'] = max(self.stats['max_check_ms'], check_ms)
+
+            if now - self.last_stats_log >= self.STATS_LOG_INTERVAL:
+                self.last_stats_log = now
+                self.logger.info(f"Trading worker | {self._format_stats()}")
+
+    def get_stats(self):
+        """Get queue depth and counters"""
+        return {**self.stats, 'queue_depth': self.queue.qsize()}
+
+    def _format_stats(self):
+        s = self.get_stats()
+        return (f"Queue={s['queue_depth']} (max {s['max_queue_depth']}) | "
+                f"Processed={s['processed']} Coalesced={s['coalesced']} Dropped={s['dropped']} | "
+                f"Lag={s['last_lag_ms']:.1f}ms (max {s['max_lag_ms']:.1f}ms) | "
+                f"Check={s['last_check_ms']:.1f}ms (max {s['max_check_ms']:.1f}ms)")
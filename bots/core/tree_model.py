@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compiled Tree Model
+Evaluates a LightGBM text model (booster.save_model) with NumPy only, no
+lightgbm import and no ctypes call per prediction.
+
+All trees are flattened into one node array (split nodes and leaves; a leaf
+is its own child) and walked together, one level per step: every step is a
+few vectorised gathers over (rows, trees), so a call costs max_depth steps
+however many trees the model has. Node arrays hold every node twice (slots
+2k and 2k + 1) and children are stored as slot numbers, so the next node is
+children[slot + go_right] without any index arithmetic per step.
+
+Supported: numerical splits with LightGBM's missing-value handling,
+binary and regression objectives, boosted or averaged (random forest). Anything else (categorical splits, linear
+trees, multiclass) raises UnsupportedModelError so the caller can fall back
+to lightgbm; a malformed file raises ValueError.
+"""
+
+import numpy as np
+
+# LightGBM decision_type bits / kZeroThreshold
+_DEFAULT_LEFT = 2
+_MISSING_ZERO = 1
+_MISSING_NAN = 2
+_ZERO_THRESHOLD = 1e-35
+
+# Rows per chunk for batch predictions ((rows, trees) intermediates)
+_BATCH_ROWS = 1024
+
+_IDENTITY_OBJECTIVES = ('regression', 'regression_l1', 'huber', 'fair', 'quantile', 'mape')
+
+
+class UnsupportedModelError(ValueError):
+    """Valid LightGBM model that uses something the evaluator does not implement"""
+
+
+def _parse_blocks(text):
+    """Header dict and one dict per tree from the model text"""
+    header, trees, current = {}, [], None
+    for line in text.splitlines():
+        line = line.strip()
+        if line == "end of trees":
+            return header, trees
+        if not line:
+            continue
+        if '=' not in line:
+            # Header flags such as average_output (random forest)
+            if current is None:
+                header[line] = ''
+            continue
+        key, value = line.split('=', 1)
+        if key == 'Tree':
+            current = {}
+            trees.append(current)
+        elif current is None:
+            header[key] = value
+        else:
+            current[key] = value
+    # Also what a model file still being written looks like
+    raise ValueError("Truncated model file (no 'end of trees')")
+
+
+def _floats(value):
+    return [float(item) for item in value.split()]
+
+
+def _ints(value):
+    return [int(item) for item in value.split()]
+
+
+def _output_transform(objective):
+    """Raw score -> prediction, as Booster.predict (raw_score=False)"""
+    name, *options = objective.split()
+    options = dict(option.split(':', 1) for option in options if ':' in option)
+    if name == 'binary':
+        sigmoid = float(options.get('sigmoid', 1.0))
+        return lambda raw: 1.0 / (1.0 + np.exp(-sigmoid * raw))
+    if name in ('cross_entropy', 'xentropy'):
+        return lambda raw: 1.0 / (1.0 + np.exp(-raw))
+    if name in _IDENTITY_OBJECTIVES:
+        return lambda raw: raw
+    raise UnsupportedModelError(f"Unsupported objective: {objective}")
+
+
+def _tree_depth(left_child, right_child):
+    depth, level = 0, [0]
+    while level:
+        depth += 1
+        level = [child for node in level for child in (left_child[node], right_child[node]) if child >= 0]
+    return depth
+
+
+class CompiledModel:
+    """NumPy evaluator of a LightGBM text model with the Booster.predict interface used by Predictor"""
+
+    def __init__(self, text):
+        header, trees = _parse_blocks(text)
+        if int(header.get('num_class', 1)) != 1:
+            raise UnsupportedModelError("Multiclass models are not supported")
+        if not trees or 'feature_names' not in header:
+            raise ValueError("Not a LightGBM text model (no trees or feature names)")
+
+        self._feature_names = header['feature_names'].split()
+        self._transform = _output_transform(header.get('objective', 'regression'))
+        # Random forest (boosting=rf): the raw score is the mean of the trees, not the sum
+        self._average_output = 'average_output' in header
+
+        # Per node k: feature/threshold/missing/default_left/value; children[2k], children[2k + 1] = left, right
+        features, thresholds, missing, default_left, values, children, roots = [], [], [], [], [], [], []
+        depth = 0
+        for tree in trees:
+            if int(tree.get('num_cat', 0)) > 0:
+                raise UnsupportedModelError("Categorical splits are not supported")
+            if int(tree.get('is_linear', 0)):
+                raise UnsupportedModelError("Linear trees are not supported")
+
+            num_leaves = int(tree['num_leaves'])
+            num_splits = num_leaves - 1
+            base = len(features)
+            leaf_base = base + num_splits
+            roots.append(base)
+
+            if num_splits:
+                left_child = _ints(tree['left_child'])
+                right_child = _ints(tree['right_child'])
+                decision_type = _ints(tree['decision_type'])
+                features.extend(_ints(tree['split_feature']))
+                thresholds.extend(_floats(tree['threshold']))
+                missing.extend((decision & 12) >> 2 for decision in decision_type)
+                default_left.extend(bool(decision & _DEFAULT_LEFT) for decision in decision_type)
+                values.extend([0.0] * num_splits)
+                for left, right in zip(left_child, right_child):
+                    children.append(base + left if left >= 0 else leaf_base + ~left)
+                    children.append(base + right if right >= 0 else leaf_base + ~right)
+                depth = max(depth, _tree_depth(left_child, right_child))
+
+            # Leaves stay where they are
+            for leaf, value in enumerate(_floats(tree['leaf_value'])):
+                features.append(0)
+                thresholds.append(np.inf)
+                missing.append(0)
+                default_left.append(True)
+                values.append(value)
+                children.extend([leaf_base + leaf] * 2)
+
+        # Slot arrays: node k at slots 2k and 2k + 1
+        self._features = np.repeat(np.asarray(features, dtype=np.intp), 2)
+        self._thresholds = np.repeat(np.asarray(thresholds, dtype=np.float64), 2)
+        self._missing = np.repeat(np.asarray(missing, dtype=np.int8), 2)
+        self._default_left = np.repeat(np.asarray(default_left, dtype=bool), 2)
+        self._values = np.repeat(np.asarray(values, dtype=np.float64), 2)
+        self._children = 2 * np.asarray(children, dtype=np.intp)
+        self._roots = 2 * np.asarray(roots, dtype=np.intp)
+        self._depth = depth
+        # Without zero-as-missing splits, NaN-free rows need only the plain comparison
+        self._has_zero_missing = bool(np.any(self._missing == _MISSING_ZERO))
+
+    @classmethod
+    def from_file(cls, model_path):
+        with open(model_path) as f:
+            return cls(f.read())
+
+    def feature_name(self):
+        return list(self._feature_names)
+
+    def num_feature(self):
+        return len(self._feature_names)
+
+    def num_trees(self):
+        return len(self._roots)
+
+    def _go_right(self, nodes, values):
+        """Split decisions (LightGBM NumericalDecision) for feature values at nodes"""
+        missing = self._missing[nodes]
+        is_nan = np.isnan(values)
+        nan_missing = missing == _MISSING_NAN
+        # NaN counts as 0.0 unless the split has a NaN branch
+        values = np.where(is_nan & ~nan_missing, 0.0, values)
+        is_missing = (nan_missing & is_nan) | ((missing == _MISSING_ZERO) & (np.abs(values) <= _ZERO_THRESHOLD))
+        return np.where(is_missing, ~self._default_left[nodes], values > self._thresholds[nodes])
+
+    def _raw_scores(self, X):
+        rows = np.arange(len(X))[:, None]
+        nodes = np.broadcast_to(self._roots, (len(X), len(self._roots)))
+        plain = not self._has_zero_missing and not np.isnan(X).any()
+        for _ in range(self._depth):
+            values = X[rows, self._features[nodes]]
+            if plain:
+                go_right = values > self._thresholds[nodes]
+            else:
+                go_right = self._go_right(nodes, values)
+            nodes = self._children[nodes + go_right]
+        return self._values[nodes].sum(axis=1)
+
+    def _raw_score_row(self, x):
+        """Single NaN-free row: the same walk on 1-d arrays"""
+        nodes = self._roots
+        for _ in range(self._depth):
+            nodes = self._children[nodes + (x[self._features[nodes]] > self._thresholds[nodes])]
+        return self._values[nodes].sum()
+
+    def predict(self, data, raw_score=False):
+        """
+        Predictions for a (rows, features) array in feature_name() order
+        Returns: float64 array (rows,), probabilities for binary models
+        """
+        X = np.asarray(data, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != len(self._feature_names):
+            raise ValueError(f"Expected {len(self._feature_names)} features, got {X.shape[1]}")
+
+        if len(X) == 1 and not self._has_zero_missing and not np.isnan(X).any():
+            raw = np.array([self._raw_score_row(X[0])])
+        elif len(X) <= _BATCH_ROWS:
+            raw = self._raw_scores(X)
+        else:
+            raw = np.concatenate([self._raw_scores(X[i:i + _BATCH_ROWS]) for i in range(0, len(X), _BATCH_ROWS)])
+        if self._average_output:
+            raw = raw / len(self._roots)
+        return raw if raw_score else self._transform(raw)
+
+
+def compile_model(model_path):
+    """CompiledModel for a LightGBM text model file (UnsupportedModelError if it cannot be compiled)"""
+    return CompiledModel.from_file(model_path)
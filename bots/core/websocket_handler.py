@@ -5,12 +5,9 @@ WebSocket Handler
 Connects to Binance WebSocket and processes real-time trade data
 """
 
-import json
 import time
 import ssl
-from collections import deque
 from datetime import datetime
-import pandas as pd
 
 try:
     from websocket import WebSocketApp
@@ -18,21 +15,24 @@ except ImportError:
     import websocket
     WebSocketApp = websocket.WebSocketApp
 
-from .feature_engineering import FeatureEngineer
+from .feature_engineering import IncrementalFeatureEngine
+from .stream_decoder import decode_agg_trade
+from .trading_worker import TradingWorker
 
 class WebSocketHandler:
-    def __init__(self, symbol, config, predictor, order_manager, logger):
+    def __init__(self, symbol, config, predictor, order_manager, logger, shadows=None):
         self.symbol = symbol.lower()
         self.config = config
         self.predictor = predictor
+        # Challenger models (core.shadow.ShadowModels) fed the same features, or None
+        self.shadows = shadows
         self.order_manager = order_manager
         self.logger = logger
 
-        # Feature engineer
-        self.feature_engineer = FeatureEngineer(logger)
+        # Feature engine (updated once per closed second)
+        self.feature_engine = IncrementalFeatureEngine(window_size=60, logger=logger)
+        self.latest_features = None
 
-        # Data buffer (60 seconds of data)
-        self.buffer = deque(maxlen=60)
         self.current_sec = {
             'net_flow': 0.0,
             'total_volume': 0.0,
@@ -48,7 +48,14 @@ class WebSocketHandler:
         self.ws_url = self._get_ws_url(socket_type)
 
         self.ws = None
-        self.last_check_time = time.time()
+
+        # Order/signal logic runs on a worker thread (checks every 2 seconds)
+        self.trading_worker = TradingWorker(
+            self._check_trading_logic,
+            logger,
+            max_queue_size=config.get('tick_queue_size', 1000),
+            check_interval=2.0
+        )
 
     def _get_ws_url(self, socket_type):
         """Get WebSocket URL based on type"""
@@ -62,14 +69,15 @@ class WebSocketHandler:
     def on_message(self, ws, message):
         """Process incoming trade message"""
         try:
-            data = json.loads(message)
-
             # Parse trade data
-            timestamp = data["T"]
-            price = float(data["p"])
-            quantity = float(data["q"])
-            is_buyer_maker = data["m"]
+            self.process_trade(*decode_agg_trade(message))
 
+        except Exception as e:
+            self.logger.error(f"Message processing error: {e}")
+
+    def process_trade(self, timestamp, price, quantity, is_buyer_maker):
+        """Aggregate one trade into the current second (also called by MarketDataEngine)"""
+        try:
             # Update current second data
             current_second = timestamp // 1000
 
@@ -78,8 +86,8 @@ class WebSocketHandler:
 
             # Check if new second
             if current_second != self.current_sec['timestamp']:
-                # Save completed second to buffer
-                self.buffer.append({
+                # Completed second goes straight into the feature engine
+                bar = {
                     'timestamp': self.current_sec['timestamp'],
                     'close': self.current_sec['close'],
                     'high': self.current_sec['high'],
@@ -87,7 +95,11 @@ class WebSocketHandler:
                     'total_volume': self.current_sec['total_volume'],
                     'net_flow': self.current_sec['net_flow'],
                     'trade_count': self.current_sec['trade_count']
-                })
+                }
+                self.feature_engine.update(bar)
+
+                # Publish a snapshot for the trading worker thread
+                self.latest_features = self.feature_engine.get_features()
 
                 # Reset for new second
                 self.current_sec = {
@@ -113,11 +125,8 @@ class WebSocketHandler:
             else:
                 self.current_sec['net_flow'] += quantity  # Buy pressure
 
-            # Check orders periodically (every 2 seconds)
-            current_time = time.time()
-            if current_time - self.last_check_time >= 2:
-                self.last_check_time = current_time
-                self._check_trading_logic(price)
+            # Hand the tick to the trading worker (never blocks on REST calls)
+            self.trading_worker.submit(price, timestamp)
 
         except Exception as e:
             self.logger.error(f"Message processing error: {e}")
@@ -130,7 +139,7 @@ class WebSocketHandler:
             self.order_manager.check_active_orders(current_price)
 
             # Check for new signals (if we can place orders)
-            if self.order_manager.can_place_order() and len(self.buffer) >= 60:
+            if self.order_manager.can_place_order() and self.latest_features is not None:
                 self._check_for_signal(current_price)
 
         except Exception as e:
@@ -139,18 +148,21 @@ class WebSocketHandler:
     def _check_for_signal(self, current_price):
         """Check AI signal for new trade"""
         try:
-            # Convert buffer to DataFrame
-            df = pd.DataFrame(list(self.buffer))
-
-            # Calculate features
-            features = self.feature_engineer.calculate_features(df)
+            # Snapshot published by the socket thread when the last second closed
+            features = self.latest_features
 
             if features is None:
                 return
 
             # Check AI prediction
             confidence_threshold = self.config.get('confidence_threshold', 0.40)
-            should_trade, confidence = self.predictor.should_trade(features, confidence_threshold)
+            predictor = self.predictor
+            should_trade, confidence = predictor.should_trade(features, confidence_threshold)
+
+            # Only queued; the shadow models score it on their own thread
+            shadows = self.shadows
+            if shadows is not None:
+                shadows.submit(features, predictor.model_path, confidence, confidence_threshold)
 
             if should_trade:
                 self.logger.info(f"AI SIGNAL: BUY | Confidence: {confidence*100:.2f}% | Price: ${current_price:.2f}")
@@ -178,6 +190,8 @@ class WebSocketHandler:
         sslopt = {"cert_reqs": ssl.CERT_NONE}
         reconnect_delay = 5
 
+        self.start_worker()
+
         while True:
             try:
                 self.ws = WebSocketApp(
@@ -202,3 +216,20 @@ class WebSocketHandler:
 
             self.logger.info(f"Reconnecting in {reconnect_delay}s...")
             time.sleep(reconnect_delay)
+
+    def start_worker(self):
+        """Start the trading worker (needed when ticks come from MarketDataEngine)"""
+        self.trading_worker.start()
+
+    def stop(self):
+        """Stop the WebSocket and the trading worker"""
+        if self.ws:
+            try:
+                self.ws.close()
+            except Exception:
+                pass
+        self.trading_worker.stop()
+
+    def get_stats(self):
+        """Get ingestion/execution queue stats"""
+        return self.trading_worker.get_stats()
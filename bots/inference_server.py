@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Inference Server
+Shared model service for all bots on this host: each model file is loaded
+once (core.predictor.Predictor, compiled and hot-swapped on file change),
+and feature rows from every connected bot are micro-batched per model:
+whatever is queued is taken at once, then more rows are collected for up
+to --batch-window-ms before one batched prediction answers them all.
+Protocol: core/inference_client.py
+
+Usage:
+    python3 bots/inference_server.py
+    python3 bots/inference_server.py --socket /tmp/bot_inference.sock --batch-window-ms 1 --max-batch 256
+
+    # Per-model queue/latency metrics of a running service
+    python3 bots/inference_server.py --metrics
+
+Bots use it with "inference_socket": "/tmp/bot_inference.sock" in their config.
+Models that get no requests for --idle-timeout seconds are unloaded; a bot
+still using one gets a "stale" reply and simply loads it again.
+"""
+
+import argparse
+import json
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from core.inference_client import DEFAULT_SOCKET_PATH, feature_schema, request
+from core.predictor import Predictor
+from utils.logger import Logger
+
+# Requests kept for the latency percentiles
+LATENCY_WINDOW = 4096
+
+# Idle model check period cap (s)
+IDLE_CHECK_INTERVAL = 30
+
+
+class ModelWorker:
+    """One loaded model: request queue, batching thread and metrics"""
+
+    def __init__(self, model_path, logger, batch_window, max_batch, model_check_interval):
+        self.model_path = model_path
+        self.logger = logger
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.predictor = Predictor(model_path, logger=logger)
+        self.predictor.watch_file(model_check_interval)
+        self.queue = queue.Queue()
+        self._schema_for = (None, None)
+        self.last_used = time.monotonic()
+        self.stopping = False
+
+        # Metrics
+        self.requests = 0
+        self.errors = 0
+        self.batches = 0
+        self.max_batch_seen = 0
+        self.max_queue_depth = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.batch_times = deque(maxlen=LATENCY_WINDOW)
+
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name=f"batcher-{os.path.basename(model_path)}", daemon=True)
+        self.thread.start()
+
+    def describe(self):
+        self.last_used = time.monotonic()
+        names = self.predictor.feature_names
+        return {'ok': True, 'model': self.model_path, 'feature_names': names, 'schema': self.schema(),
+                'num_trees': self.predictor.model.num_trees()}
+
+    def schema(self):
+        names = self.predictor.feature_names
+        if self._schema_for[0] is not names:
+            self._schema_for = (names, feature_schema(names))
+        return self._schema_for[1]
+
+    def submit(self, row, schema, reply):
+        """Queue one row; False if this worker is being unloaded"""
+        if self.stopping:
+            return False
+        self.last_used = time.monotonic()
+        # Checked here so one malformed row cannot fail the whole batch it lands in
+        row = np.asarray(row, dtype=np.float64)
+        if row.shape != (len(self.predictor.feature_names),):
+            raise ValueError(f"Expected {len(self.predictor.feature_names)} feature values, got shape {row.shape}")
+        self.queue.put((time.perf_counter(), row, schema, reply))
+        depth = self.queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+        return True
+
+    def _collect(self):
+        """Next batch: everything queued, then up to batch_window more"""
+        batch = [self.queue.get()]
+        if batch[0] is None:
+            return None
+        deadline = time.perf_counter() + self.batch_window
+        while len(batch) < self.max_batch:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+            if item is None:
+                self.running = False
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while self.running:
+            batch = self._collect()
+            if batch is None:
+                break
+            schema = self.schema()
+            valid = [item for item in batch if item[2] == schema]
+            for item in batch:
+                if item[2] != schema:
+                    self.errors += 1
+                    item[3]({'ok': False, 'error': 'Model features changed', 'stale': True})
+
+            if valid:
+                start = time.perf_counter()
+                try:
+                    probabilities = self.predictor.predict_batch(np.stack([item[1] for item in valid]))
+                    replies = [{'ok': True, 'p': float(p)} for p in probabilities]
+                except Exception as e:
+                    self.errors += len(valid)
+                    replies = [{'ok': False, 'error': str(e)}] * len(valid)
+                done = time.perf_counter()
+                self.batch_times.append(done - start)
+                self.batches += 1
+                self.max_batch_seen = max(self.max_batch_seen, len(valid))
+
+                for item, reply in zip(valid, replies):
+                    item[3](reply)
+                    self.latencies.append(done - item[0])
+            self.requests += len(batch)
+
+    def metrics(self):
+        latencies = np.array(self.latencies) * 1000
+        batch_times = np.array(self.batch_times) * 1000
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'batches': self.batches,
+            'avg_batch': self.requests / self.batches if self.batches else 0.0,
+            'max_batch': self.max_batch_seen,
+            'queue_depth': self.queue.qsize(),
+            'max_queue_depth': self.max_queue_depth,
+            'latency_p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else None,
+            'latency_p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else None,
+            'batch_p50_ms': float(np.percentile(batch_times, 50)) if len(batch_times) else None,
+            'num_trees': self.predictor.model.num_trees(),
+        }
+
+    def stop(self):
+        self.stopping = True
+        self.queue.put(None)
+        self.thread.join(timeout=5)
+        self.predictor.close()
+        # Requests that raced the unload: the client loads the model again
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[3]({'ok': False, 'error': 'Model unloaded', 'stale': True})
+
+
+class InferenceServer:
+    def __init__(self, socket_path, logger, batch_window_ms=1.0, max_batch=256, model_check_interval=5,
+                 idle_timeout=600):
+        self.socket_path = socket_path
+        self.idle_timeout = idle_timeout
+        self.logger = logger
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch = max_batch
+        self.model_check_interval = model_check_interval
+        self.workers = {}
+        self._workers_lock = threading.Lock()
+        self.running = False
+        self.server = None
+
+    def _worker(self, model_path):
+        model_path = os.path.abspath(model_path)
+        with self._workers_lock:
+            worker = self.workers.get(model_path)
+            if worker is None:
+                worker = ModelWorker(model_path, self.logger, self.batch_window, self.max_batch,
+                                     self.model_check_interval)
+                self.workers[model_path] = worker
+            return worker
+
+    def _evict_idle(self):
+        """Unload models that had no requests for idle_timeout seconds"""
+        while self.running:
+            time.sleep(min(self.idle_timeout / 2, IDLE_CHECK_INTERVAL))
+            now = time.monotonic()
+            with self._workers_lock:
+                idle = [path for path, worker in self.workers.items() if now - worker.last_used >= self.idle_timeout]
+                evicted = [self.workers.pop(path) for path in idle]
+            for worker in evicted:
+                m = worker.metrics()
+                self.logger.info(f"Unloading idle model {worker.model_path} "
+                                 f"(no requests for {self.idle_timeout:.0f}s, {m['requests']:,} served)")
+                worker.stop()
+
+    def _handle(self, message, reply):
+        op = message.get('op')
+        if op == 'predict':
+            worker = self.workers.get(message.get('model'))
+            if worker is None or not worker.submit(message['row'], message.get('schema'), reply):
+                reply({'ok': False, 'error': 'Model not loaded', 'stale': True})
+        elif op == 'load':
+            try:
+                reply(self._worker(message['model']).describe())
+            except Exception as e:
+                reply({'ok': False, 'error': str(e)})
+        elif op == 'metrics':
+            reply({'ok': True, 'models': {path: worker.metrics() for path, worker in list(self.workers.items())}})
+        else:
+            reply({'ok': False, 'error': f"Unknown op: {op}"})
+
+    def _serve_client(self, conn):
+        send_lock = threading.Lock()
+
+        def reply(message):
+            data = json.dumps(message, separators=(',', ':')).encode() + b"\n"
+            try:
+                with send_lock:
+                    conn.sendall(data)
+            except OSError:
+                pass
+
+        try:
+            with conn, conn.makefile('rb') as reader:
+                for line in reader:
+                    try:
+                        message = json.loads(line)
+                    except ValueError:
+                        reply({'ok': False, 'error': 'Invalid JSON'})
+                        continue
+                    try:
+                        self._handle(message, reply)
+                    except Exception as e:
+                        # Malformed request (not an object, missing/invalid row, ...): answer and keep the connection
+                        reply({'ok': False, 'error': f"Invalid request: {type(e).__name__}: {e}"})
+        except OSError:
+            pass
+
+    def _report_metrics(self, interval):
+        while self.running:
+            time.sleep(interval)
+            for path, worker in list(self.workers.items()):
+                m = worker.metrics()
+                if not m['batches']:
+                    continue
+                self.logger.info(
+                    f"{os.path.basename(path)}: {m['requests']:,} requests, avg batch {m['avg_batch']:.1f} "
+                    f"(max {m['max_batch']}), queue {m['queue_depth']} (max {m['max_queue_depth']}), "
+                    f"latency p50 {m['latency_p50_ms']:.2f} ms / p99 {m['latency_p99_ms']:.2f} ms, "
+                    f"errors {m['errors']}")
+
+    def serve(self, metrics_interval=60):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(self.socket_path)
+        self.server.listen(128)
+        self.running = True
+        threading.Thread(target=self._report_metrics, args=(metrics_interval,), name="metrics", daemon=True).start()
+        if self.idle_timeout > 0:
+            threading.Thread(target=self._evict_idle, name="idle-models", daemon=True).start()
+        self.logger.info(f"Inference service listening on {self.socket_path}")
+
+        try:
+            while self.running:
+                try:
+                    conn, _ = self.server.accept()
+                except OSError:
+                    break
+                threading.Thread(target=self._serve_client, args=(conn,), name="client", daemon=True).start()
+        finally:
+            self.stop()
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        if self.server:
+            self.server.close()
+        for worker in list(self.workers.values()):
+            worker.stop()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.logger.info("Inference service stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Shared batched model inference for bots on this host')
+    parser.add_argument('--socket', type=str, default=DEFAULT_SOCKET_PATH, help='Unix socket path')
+    parser.add_argument('--batch-window-ms', type=float, default=1.0,
+                        help='Extra time to collect rows into a batch after the first one')
+    parser.add_argument('--max-batch', type=int, default=256, help='Maximum rows per batch')
+    parser.add_argument('--model-check-interval', type=float, default=5, help='Model file change check (s)')
+    parser.add_argument('--metrics-interval', type=float, default=60, help='Metrics log interval (s)')
+    parser.add_argument('--idle-timeout', type=float, default=600,
+                        help='Unload a model after this many seconds without requests (0: never)')
+    parser.add_argument('--metrics', action='store_true', help='Print the metrics of a running service and exit')
+    args = parser.parse_args()
+
+    if args.metrics:
+        print(json.dumps(request({'op': 'metrics'}, args.socket), indent=2))
+        return
+
+    server = InferenceServer(args.socket, Logger(0, "INFERENCE"), args.batch_window_ms, args.max_batch,
+                             args.model_check_interval, args.idle_timeout)
+    try:
+        server.serve(args.metrics_interval)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Label Grid
+Win rate of the fill/profit target for a whole grid of
+(profit_target_pct, fill_window, profit_window) combinations, computed in
+one sweep over the cached 1-second bars (training.labels.label_matrix)
+
+Usage:
+    python label_grid.py --symbol BTCUSDC
+    python label_grid.py --symbol BTCUSDC --targets 0.0002,0.0003,0.0005 \
+        --fill-windows 10,20,30 --profit-windows 120,300,600 --output grid.csv
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from training.dataset_cache import DatasetCache
+from training.labels import label_grid, label_matrix
+
+DB_PATH = os.path.join(os.path.dirname(__file__), "..", "server", "data", "bot_manager.db")
+
+
+def log(level, message):
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    print(f"[{timestamp}] [{level}] {message}", flush=True)
+
+
+def parse_list(value, cast):
+    return [cast(item) for item in value.split(',') if item.strip()]
+
+
+def summarize(matrix, grid):
+    """One row per combination: rows with a complete window, wins, win rate"""
+    rows = []
+    for column, (pct, fill, profit) in enumerate(grid):
+        labels = matrix[:, column]
+        valid = int(np.count_nonzero(labels >= 0))
+        wins = int(np.count_nonzero(labels == 1))
+        rows.append({
+            'profit_target_pct': pct,
+            'fill_window': fill,
+            'profit_window': profit,
+            'rows': valid,
+            'wins': wins,
+            'win_rate_pct': wins / valid * 100 if valid else 0.0,
+        })
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Label win rates for a grid of target/window combinations')
+    parser.add_argument('--symbol', type=str, required=True, help='Trading symbol (e.g., BTCUSDC)')
+    parser.add_argument('--db', type=str, default=DB_PATH, help='SQLite database path')
+    parser.add_argument('--targets', type=str, default='0.0002,0.0003,0.0005,0.001',
+                        help='Comma-separated profit_target_pct values')
+    parser.add_argument('--fill-windows', type=str, default='10,20,30,60', help='Comma-separated fill windows (s)')
+    parser.add_argument('--profit-windows', type=str, default='60,120,300,600',
+                        help='Comma-separated profit windows (s)')
+    parser.add_argument('--output', type=str, help='Write the summary to this CSV file')
+    args = parser.parse_args()
+
+    grid = label_grid(parse_list(args.targets, float), parse_list(args.fill_windows, int),
+                      parse_list(args.profit_windows, int))
+    if not grid:
+        parser.error("Empty grid")
+
+    conn = sqlite3.connect(args.db)
+    df_1s = DatasetCache(args.symbol, log=log).update_bars(conn)
+    conn.close()
+
+    start = time.time()
+    matrix = label_matrix(df_1s, grid)
+    log("INFO", f"Labeled {len(df_1s):,} bars x {len(grid)} combinations in {time.time() - start:.1f}s")
+
+    summary = summarize(matrix, grid)
+    with pd.option_context('display.max_rows', None, 'display.width', 120):
+        print(summary.sort_values('win_rate_pct', ascending=False).to_string(index=False))
+
+    if args.output:
+        summary.to_csv(args.output, index=False)
+        log("INFO", f"Summary written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
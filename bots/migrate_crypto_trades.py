@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Migrate crypto_trades to the compact layout
+Copies rows from the crypto_trades table into crypto_trades_compact in
+chunks (one short transaction each, so collectors keep writing), then
+atomically renames the old table to crypto_trades_legacy and replaces it
+with a crypto_trades view that has the old columns.
+
+Safe to stop and re-run: copying resumes after the last migrated id.
+
+Usage:
+    python migrate_crypto_trades.py
+    python migrate_crypto_trades.py --chunk-size 200000 --drop-legacy --vacuum
+    python migrate_crypto_trades.py --no-swap   # copy only, keep using the old table
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from utils.compact_trades import (COMPACT_TABLE, LEGACY_TABLE, ensure_compact_schema,
+                                  create_compat_view, is_compact)
+
+DB_PATH = os.path.join(os.path.dirname(__file__), "..", "server", "data", "bot_manager.db")
+
+COPY_SQL = f"""
+    INSERT INTO {COMPACT_TABLE} (id, bot_id, symbol_id, timestamp_ms, price, quantity, is_maker)
+    SELECT t.id, t.bot_id, s.id, t.timestamp_ms,
+           CAST(ROUND(t.price * s.price_scale) AS INTEGER),
+           CAST(ROUND(t.quantity * s.qty_scale) AS INTEGER),
+           CASE WHEN t.is_maker THEN 1 ELSE 0 END
+    FROM crypto_trades t
+    JOIN trade_symbols s ON s.symbol = t.symbol
+    WHERE t.id > ? AND t.id <= ?
+"""
+
+
+def log(level, message):
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    print(f"[{timestamp}] [{level}] {message}", flush=True)
+
+
+def db_size_mb(conn):
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    return page_size * page_count / 1024 / 1024
+
+
+def table_sizes_mb(conn, tables):
+    """Per-table size incl. indexes (needs the dbstat virtual table), None if unavailable"""
+    sizes = {}
+    try:
+        for table in tables:
+            row = conn.execute("""
+                SELECT SUM(pgsize) FROM dbstat
+                WHERE name = ? OR name IN (SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ?)
+            """, (table, table)).fetchone()
+            sizes[table] = (row[0] or 0) / 1024 / 1024
+    except sqlite3.OperationalError:
+        return None
+    return sizes
+
+
+def register_symbols(conn):
+    conn.execute("INSERT OR IGNORE INTO trade_symbols (symbol) SELECT DISTINCT symbol FROM crypto_trades")
+
+
+def copy_range(conn, after_id, up_to_id):
+    return conn.execute(COPY_SQL, (after_id, up_to_id)).rowcount
+
+
+def migrate(conn, chunk_size, pause):
+    """Copy crypto_trades into the compact table chunk by chunk; returns the last copied id"""
+    conn.execute("BEGIN IMMEDIATE")
+    register_symbols(conn)
+    conn.execute("COMMIT")
+
+    last_id = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {COMPACT_TABLE}").fetchone()[0]
+    max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM crypto_trades").fetchone()[0]
+    total = conn.execute("SELECT COUNT(*) FROM crypto_trades WHERE id > ?", (last_id,)).fetchone()[0]
+    if last_id:
+        log("INFO", f"Resuming after id {last_id:,}")
+    log("INFO", f"Rows to copy: {total:,} (chunk size {chunk_size:,})")
+
+    copied = 0
+    start = time.time()
+    while last_id < max_id:
+        # Upper id of the next chunk (ids can be sparse after deletes)
+        row = conn.execute(
+            "SELECT id FROM crypto_trades WHERE id > ? ORDER BY id LIMIT 1 OFFSET ?",
+            (last_id, chunk_size - 1)
+        ).fetchone()
+        up_to_id = row[0] if row else max_id
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            copied += copy_range(conn, last_id, up_to_id)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        last_id = up_to_id
+
+        elapsed = time.time() - start
+        rate = copied / elapsed if elapsed > 0 else 0
+        log("INFO", f"Copied {copied:,}/{total:,} rows (up to id {last_id:,}) | {rate:,.0f} rows/s")
+
+        if pause:
+            time.sleep(pause)
+
+    return last_id
+
+
+def swap(conn, last_id, drop_legacy):
+    """Copy rows written meanwhile, then replace the table with the view in one transaction"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        register_symbols(conn)
+        max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM crypto_trades").fetchone()[0]
+        tail = copy_range(conn, last_id, max_id) if max_id > last_id else 0
+        # Rows deleted from the old table after they were copied (e.g. a --no-swap run earlier)
+        conn.execute(f"DELETE FROM {COMPACT_TABLE} WHERE id NOT IN (SELECT id FROM crypto_trades)")
+
+        legacy_rows = conn.execute("SELECT COUNT(*) FROM crypto_trades").fetchone()[0]
+        compact_rows = conn.execute(f"SELECT COUNT(*) FROM {COMPACT_TABLE}").fetchone()[0]
+        if legacy_rows != compact_rows:
+            raise RuntimeError(f"Row count mismatch: crypto_trades={legacy_rows:,} {COMPACT_TABLE}={compact_rows:,}")
+
+        conn.execute(f"ALTER TABLE crypto_trades RENAME TO {LEGACY_TABLE}")
+        create_compat_view(conn)
+        if drop_legacy:
+            conn.execute(f"DROP TABLE {LEGACY_TABLE}")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    log("INFO", f"Copied {tail:,} rows written during migration")
+    log("INFO", f"crypto_trades is now a view over {COMPACT_TABLE} ({compact_rows:,} rows)")
+    if drop_legacy:
+        log("INFO", f"Dropped {LEGACY_TABLE}")
+    else:
+        log("INFO", f"Old table kept as {LEGACY_TABLE} (re-run with --drop-legacy to remove it)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Migrate crypto_trades to the compact layout')
+    parser.add_argument('--db', type=str, default=DB_PATH, help='SQLite database path')
+    parser.add_argument('--chunk-size', type=int, default=100000, help='Rows copied per transaction')
+    parser.add_argument('--pause', type=float, default=0.05, help='Seconds to sleep between chunks')
+    parser.add_argument('--no-swap', action='store_true', help='Only copy, keep crypto_trades as a table')
+    parser.add_argument('--drop-legacy', action='store_true', help=f'Drop {LEGACY_TABLE} after the swap')
+    parser.add_argument('--vacuum', action='store_true',
+                        help='VACUUM afterwards to return freed pages to disk (needs free space ~ DB size)')
+    args = parser.parse_args()
+
+    # isolation_level=None: transactions are managed explicitly with BEGIN/COMMIT
+    conn = sqlite3.connect(args.db, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA busy_timeout=10000")
+
+    log("INFO", f"Database: {args.db} ({db_size_mb(conn):,.1f} MB)")
+
+    if is_compact(conn):
+        log("INFO", "crypto_trades is already a view over the compact table")
+        if args.drop_legacy:
+            conn.execute(f"DROP TABLE IF EXISTS {LEGACY_TABLE}")
+            log("INFO", f"Dropped {LEGACY_TABLE}")
+    else:
+        ensure_compact_schema(conn)
+        last_id = migrate(conn, args.chunk_size, args.pause)
+
+        sizes = table_sizes_mb(conn, ['crypto_trades', COMPACT_TABLE])
+        if sizes:
+            log("INFO", f"Size: crypto_trades={sizes['crypto_trades']:,.1f} MB | "
+                f"{COMPACT_TABLE}={sizes[COMPACT_TABLE]:,.1f} MB (incl. indexes)")
+
+        if args.no_swap:
+            log("INFO", "Copy done, crypto_trades left in place (--no-swap)")
+        else:
+            swap(conn, last_id, args.drop_legacy)
+
+    if args.vacuum:
+        log("INFO", "Running VACUUM...")
+        conn.execute("VACUUM")
+
+    log("INFO", f"Done. Database size: {db_size_mb(conn):,.1f} MB")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,13 +4,18 @@ Simulate Bot for Bot Manager
 Integrates with Bot Manager for configuration and logging
 """
 
-import websocket, json, datetime, sys, requests, threading, time, argparse, logging
-import pandas as pd
+import websocket, json, datetime, sys, os, requests, threading, time, argparse, logging
+import numpy as np
 import lightgbm as lgb
-from collections import deque
 from binance.client import Client
 from binance.enums import *
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from core.bar_buffer import BarRingBuffer
+from core.stream_decoder import decode_agg_trade
+from core.inference_client import RemotePredictor
+from core.shadow import ShadowModels
+
 # ==========================================
 # PARSE ARGUMENTS
 # ==========================================
@@ -18,6 +23,9 @@ parser = argparse.ArgumentParser(description='Simulate Bot')
 parser.add_argument('--bot-id', required=True, help='Bot ID from database')
 parser.add_argument('--symbol', required=True, help='Trading symbol (e.g., BTCUSDC)')
 parser.add_argument('--model-path', required=True, help='Path to LightGBM model file')
+parser.add_argument('--inference-socket', default='', help='Use the shared inference service on this socket')
+parser.add_argument('--shadow-models', default='', help='Comma-separated challenger models scored on the same features (not traded)')
+parser.add_argument('--shadow-log', default='', help='Shadow model CSV log (default: models/shadow/bot_<bot-id>.csv)')
 parser.add_argument('--api-key', required=True, help='Binance API Key')
 parser.add_argument('--secret-key', required=True, help='Binance Secret Key')
 parser.add_argument('--telegram-token', default='', help='Telegram Bot Token')
@@ -114,17 +122,32 @@ timeout_history = []
 last_trade_time_per_slot = [0] * MAX_POSITIONS
 last_status_report_time = time.time()
 last_update_id = 0
-buffer = deque(maxlen=60)
-current_sec = {'net_flow': 0.0, 'total_volume': 0.0, 'trade_count': 0, 'close': 0.0, 'low': 999999.0, 'ts': None}
+buffer = BarRingBuffer(capacity=60)
+current_sec = {'net_flow': 0.0, 'total_volume': 0.0, 'trade_count': 0, 'close': 0.0, 'high': 0.0, 'low': 999999.0, 'ts': None}
 
-# Load model
+# Load model (or use the shared inference service)
+remote_predictor = None
 try:
-    model = lgb.Booster(model_file=MODEL_FILE)
-    logger.info(f"✅ Loaded AI Model: {MODEL_FILE}")
+    if args.inference_socket:
+        remote_predictor = RemotePredictor(MODEL_FILE, args.inference_socket, logger)
+        FEATURE_NAMES = remote_predictor.feature_names
+    else:
+        model = lgb.Booster(model_file=MODEL_FILE)
+        logger.info(f"✅ Loaded AI Model: {MODEL_FILE}")
+        # Feature order bound once; predict() fills this row instead of building a DataFrame
+        FEATURE_NAMES = model.feature_name()
+        feature_row = np.empty((1, len(FEATURE_NAMES)), dtype=np.float64)
 except Exception as e:
     logger.error(f"❌ Model file not found: {e}")
     sys.exit(1)
 
+shadow_models = None
+if args.shadow_models:
+    shadow_models = ShadowModels(
+        args.shadow_log or os.path.join(os.path.dirname(__file__), "..", "models", "shadow", f"bot_{BOT_ID}.csv"),
+        BOT_ID, SYMBOL_TRADE, logger=logger)
+    shadow_models.set_models([path for path in args.shadow_models.split(',') if path])
+
 # ==========================================
 # TELEGRAM FUNCTIONS
 # ==========================================
@@ -489,7 +512,7 @@ def get_available_slot(current_ts):
 
     return None
 
-def predict(data_list, last_price, current_ts):
+def predict(last_price, current_ts):
     """AI Prediction and order placement"""
     global last_trade_time_per_slot
 
@@ -500,30 +523,41 @@ def predict(data_list, last_price, current_ts):
     if available_slot is None:
         return
 
-    df = pd.DataFrame(data_list)
-    if len(df) < 15:
+    if len(buffer) < 15:
         return
 
+    # Zero-copy views over the last 15 seconds
+    close = buffer.window('close', 15)
+    net_flow = buffer.window('net_flow', 15)
+    total_volume = buffer.window('total_volume', 15)
+
     # Feature engineering
     feat = {
-        'total_volume': df['total_volume'].iloc[-1],
-        'net_flow': df['net_flow'].iloc[-1],
-        'trade_count': df['trade_count'].iloc[-1],
-        'net_flow_ma5': df['net_flow'].rolling(5).mean().iloc[-1],
-        'net_flow_ma15': df['net_flow'].rolling(15).mean().iloc[-1],
-        'volume_ma5': df['total_volume'].rolling(5).mean().iloc[-1],
-        'net_flow_diff': df['net_flow'].diff().iloc[-1],
-        'price_change': df['close'].pct_change().iloc[-1] * 100,
-        'std_5': df['close'].rolling(5).std().iloc[-1],
-        'dist_ma15': df['close'].iloc[-1] - df['close'].rolling(15).mean().iloc[-1]
+        'total_volume': total_volume[-1],
+        'net_flow': net_flow[-1],
+        'trade_count': buffer.last('trade_count'),
+        'net_flow_ma5': net_flow[-5:].mean(),
+        'net_flow_ma15': net_flow.mean(),
+        'volume_ma5': total_volume[-5:].mean(),
+        'net_flow_diff': net_flow[-1] - net_flow[-2],
+        'price_change': (close[-1] / close[-2] - 1) * 100,
+        'std_5': close[-5:].std(ddof=1),
+        'dist_ma15': close[-1] - close.mean()
     }
 
-    delta = df['close'].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(14).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-    feat['rsi'] = 100 - (100 / (1 + (gain / (loss + 1e-10)))).iloc[-1]
+    delta = np.diff(close)
+    gain = np.where(delta > 0, delta, 0).mean()
+    loss = np.where(delta < 0, -delta, 0).mean()
+    feat['rsi'] = 100 - (100 / (1 + (gain / (loss + 1e-10))))
 
-    prob = model.predict(pd.DataFrame([feat]))[0]
+    if remote_predictor:
+        prob = remote_predictor.predict(feat)[1]
+    else:
+        for i, name in enumerate(FEATURE_NAMES):
+            feature_row[0, i] = feat[name]
+        prob = model.predict(feature_row, num_threads=1, predict_disable_shape_check=True)[0]
+    if shadow_models:
+        shadow_models.submit(feat, MODEL_FILE, prob, CONFIDENCE_THRESHOLD)
 
     # Print slot status
     slot_status = ""
@@ -619,8 +653,8 @@ def predict(data_list, last_price, current_ts):
 # ==========================================
 def on_message(ws, msg):
     global current_sec
-    d = json.loads(msg)
-    p, q, m, t = float(d['p']), float(d['q']), d['m'], int(d['T']/1000)
+    trade = decode_agg_trade(msg)
+    p, q, m, t = trade.price, trade.quantity, trade.is_buyer_maker, trade.timestamp_ms // 1000
 
     if current_sec['ts'] is None:
         current_sec['ts'] = t
@@ -630,14 +664,16 @@ def on_message(ws, msg):
     send_status_report()
 
     if t > current_sec['ts']:
-        buffer.append(current_sec.copy())
-        predict(list(buffer), p, t)
-        current_sec = {'net_flow':0.0, 'total_volume':0.0, 'trade_count':0, 'close':p, 'low':p, 'ts':t}
+        buffer.append({**current_sec, 'timestamp': current_sec['ts']})
+        predict(p, t)
+        current_sec = {'net_flow':0.0, 'total_volume':0.0, 'trade_count':0, 'close':p, 'high':p, 'low':p, 'ts':t}
 
     current_sec['net_flow'] += -q if m else q
     current_sec['total_volume'] += q
     current_sec['trade_count'] += 1
     current_sec['close'] = p
+    if p > current_sec['high']:
+        current_sec['high'] = p
     if p < current_sec['low']:
         current_sec['low'] = min(current_sec['low'], p)
 
@@ -681,3 +717,6 @@ if __name__ == "__main__":
     )
 
     ws.run_forever()
+
+    if shadow_models:
+        shadow_models.close()
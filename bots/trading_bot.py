@@ -4,12 +4,14 @@
 Trading Bot Entry Point
 Follows the same pattern as collect_price.py
 Usage: python3 bots/trading_bot.py --bot-id <id> --symbol <symbol> --config-json '{...}'
+       python3 bots/trading_bot.py --bots-json '[{"bot_id": 1, "symbol": "BTCUSDC", "config": {...}}, ...]'
 """
 
 import argparse
 import json
 import sys
 import os
+import threading
 import time
 from datetime import datetime
 
@@ -20,8 +22,11 @@ from utils.config_loader import ConfigLoader
 from utils.logger import Logger
 from trading.binance_client import BinanceClient
 from core.websocket_handler import WebSocketHandler
+from core.market_data_engine import MarketDataEngine
 from core.order_manager import OrderManager
 from core.predictor import Predictor
+from core.inference_client import RemotePredictor
+from core.shadow import ShadowModels
 from reporters.composite_reporter import CompositeReporter
 from reporters.backend_reporter import BackendReporter
 from reporters.telegram_reporter import TelegramReporter
@@ -31,12 +36,56 @@ from reporters.telegram_reporter import TelegramReporter
 # =========================
 DB_PATH = os.path.join(os.path.dirname(__file__), "..", "server", "data", "bot_manager.db")
 API_BASE_URL = "http://localhost:3001/api"
+SHADOW_LOG_DIR = os.path.join(os.path.dirname(__file__), "..", "models", "shadow")
+
+# =========================
+# Shared Predictors
+# =========================
+class SharedPredictors:
+    """Predictors shared by the bots of one process: one per model file, closed when its last bot leaves"""
+
+    def __init__(self):
+        # model_path -> [predictor, bots using it]
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def acquire(self, model_path, load):
+        """Predictor for model_path (load() creates it on first use); pair with release()"""
+        with self.lock:
+            entry = self.entries.get(model_path)
+            if entry is None:
+                entry = self.entries[model_path] = [load(), 0]
+            entry[1] += 1
+            return entry[0]
+
+    def release(self, model_path):
+        """A bot stopped using model_path's Predictor"""
+        with self.lock:
+            entry = self.entries.get(model_path)
+            if entry is None:
+                return
+            entry[1] -= 1
+            if entry[1] > 0:
+                return
+            del self.entries[model_path]
+        # Watcher thread join outside the lock
+        entry[0].close()
+
+    def close_all(self):
+        with self.lock:
+            entries, self.entries = self.entries, {}
+        for predictor, _ in entries.values():
+            predictor.close()
+
 
 # =========================
 # Main Bot Class
 # =========================
 class TradingBot:
-    def __init__(self, bot_id, symbol, initial_config=None):
+    def __init__(self, bot_id, symbol, initial_config=None, predictor_cache=None):
         self.bot_id = bot_id
         self.symbol = symbol.upper()
         self.is_running = True
@@ -64,11 +113,10 @@ class TradingBot:
             self.logger.error("Failed to connect to Binance")
             sys.exit(1)
 
-        # Load AI model
-        self.predictor = Predictor(
-            model_path=self.config.get('model_path'),
-            logger=self.logger
-        )
+        # Load AI model (bots in one process share a Predictor per model file)
+        self.predictor_cache = predictor_cache
+        self.model_path = self.config.get('model_path')
+        self.predictor = self._get_predictor(self.model_path)
 
         # Order manager
         self.order_manager = OrderManager(
@@ -87,6 +135,14 @@ class TradingBot:
             logger=self.logger
         )
 
+        # Challenger models fed this bot's features (own log, even with a shared Predictor)
+        self.shadows = None
+        self._shadow_config = None
+        self._apply_shadows(self.config)
+
+        # Serialises background model/shadow loads from successive config updates
+        self._model_lock = threading.Lock()
+
         # Start config watcher
         self.config_loader.watch_updates(self._on_config_update)
 
@@ -111,6 +167,55 @@ class TradingBot:
 
         return CompositeReporter(reporters)
 
+    def _get_predictor(self, model_path):
+        """Shared (or own) Predictor for a model file, reloaded when the file changes"""
+        if self.predictor_cache is not None:
+            return self.predictor_cache.acquire(model_path, lambda: self._load_predictor(model_path))
+        return self._load_predictor(model_path)
+
+    def _load_predictor(self, model_path):
+        predictor = None
+        socket_path = self.config.get('inference_socket')
+        if socket_path:
+            # Shared inference service (inference_server.py); local model if it is not running
+            try:
+                predictor = RemotePredictor(model_path, socket_path, logger=self.logger)
+            except Exception as e:
+                self.logger.warning(f"Inference service unavailable ({e}), loading the model locally")
+
+        if predictor is None:
+            predictor = Predictor(
+                model_path=model_path,
+                logger=self.logger
+            )
+            predictor.watch_file(self.config.get('model_check_interval', 5))
+        return predictor
+
+    def _shadow_settings(self, config):
+        """(shadow model paths, log path) from config"""
+        model_paths = tuple(config.get('shadow_models') or [])
+        log_path = config.get('shadow_log') or os.path.join(SHADOW_LOG_DIR, f"bot_{self.bot_id}.csv")
+        return model_paths, log_path
+
+    def _apply_shadows(self, config):
+        """Challenger models from config "shadow_models", scored next to the live model"""
+        self._shadow_config = self._shadow_settings(config)
+        model_paths, log_path = self._shadow_config
+
+        if self.shadows is not None and (not model_paths or self.shadows.log_path != log_path):
+            self.ws_handler.shadows = None
+            self.shadows.close()
+            self.shadows = None
+        if not model_paths:
+            return
+
+        if self.shadows is None:
+            shadows = ShadowModels(log_path, self.bot_id, self.symbol, logger=self.logger)
+            shadows.set_models(model_paths)
+            self.shadows = self.ws_handler.shadows = shadows
+        else:
+            self.shadows.set_models(model_paths)
+
     def _on_config_update(self, new_config):
         """Called when configuration is updated"""
         self.logger.info("Config updated, reloading...")
@@ -118,21 +223,67 @@ class TradingBot:
         self.order_manager.update_config(new_config)
         self.reporter.report_status("Config reloaded", {"config": new_config})
 
+        # Model files (live and shadow) are loaded off the config-watcher thread
+        model_path = new_config.get('model_path')
+        swap = model_path and model_path != self.model_path
+        if swap or self._shadow_settings(new_config) != self._shadow_config:
+            threading.Thread(target=self._load_models, name="model-loader", daemon=True).start()
+
+    def _load_models(self):
+        """Apply the model and shadow model settings of the current config (background thread)"""
+        with self._model_lock:
+            # Latest config: a loader started for an older update catches up with newer ones
+            config = self.config
+            model_path = config.get('model_path')
+            if model_path and model_path != self.model_path:
+                self._swap_model(model_path)
+            if self._shadow_settings(config) != self._shadow_config:
+                self._apply_shadows(config)
+
+    def _swap_model(self, model_path):
+        """Load a new model file in the background and swap it in between two predictions"""
+        self.logger.info(f"Model changed in config, loading {model_path}...")
+        old_path = self.model_path
+
+        if self.predictor_cache is None:
+            # Own Predictor: swap its model in place
+            if not self.predictor.reload(model_path):
+                return
+        else:
+            # Shared Predictors stay with their file; switch this bot to the one for model_path
+            try:
+                predictor = self._get_predictor(model_path)
+            except Exception as e:
+                self.logger.error(f"Model swap failed, keeping {old_path}: {e}")
+                return
+            self.predictor = predictor
+            self.ws_handler.predictor = predictor
+            self.logger.info(f"Model swapped: {old_path} -> {model_path}")
+            # Closed here if no other bot uses the old file
+            self.predictor_cache.release(old_path)
+        self.model_path = model_path
+
+        self.reporter.report_status("Model swapped", {"old_model_path": old_path, "model_path": model_path})
+
+    def _report_start(self):
+        """Log and report the bot start"""
+        self.logger.info(f"Starting Trading Bot for {self.symbol}")
+        self.logger.info(f"Bot ID: {self.bot_id}")
+        self.logger.info(f"Confidence Threshold: {self.config.get('confidence_threshold', 0.4)}")
+        self.logger.info(f"Capital per Trade: {self.config.get('capital_per_trade', 200)}")
+
+        self.reporter.report_status("Bot started", {
+            "symbol": self.symbol,
+            "config": {
+                "confidence_threshold": self.config.get('confidence_threshold'),
+                "capital_per_trade": self.config.get('capital_per_trade')
+            }
+        })
+
     def start(self):
         """Start the trading bot"""
         try:
-            self.logger.info(f"Starting Trading Bot for {self.symbol}")
-            self.logger.info(f"Bot ID: {self.bot_id}")
-            self.logger.info(f"Confidence Threshold: {self.config.get('confidence_threshold', 0.4)}")
-            self.logger.info(f"Capital per Trade: {self.config.get('capital_per_trade', 200)}")
-
-            self.reporter.report_status("Bot started", {
-                "symbol": self.symbol,
-                "config": {
-                    "confidence_threshold": self.config.get('confidence_threshold'),
-                    "capital_per_trade": self.config.get('capital_per_trade')
-                }
-            })
+            self._report_start()
 
             # Start WebSocket
             self.ws_handler.start()
@@ -146,31 +297,98 @@ class TradingBot:
             self.shutdown()
             sys.exit(1)
 
+    def start_shared(self, engine):
+        """Start the bot on a shared MarketDataEngine instead of its own socket"""
+        self._report_start()
+        self.ws_handler.start_worker()
+        engine.register(self.symbol, self.ws_handler, self.config.get('socket_type', 'demo'))
+
     def shutdown(self):
         """Graceful shutdown"""
         self.logger.info("Shutting down bot...")
         self.is_running = False
 
+        # Stop the socket and let the trading worker finish its current check
+        self.ws_handler.stop()
+
         # Close any open positions
         self.order_manager.close_all_positions("Bot shutdown")
 
         # Stop config watcher
         self.config_loader.stop_watcher()
+        if self.predictor_cache is None:
+            self.predictor.close()
+        else:
+            self.predictor_cache.release(self.model_path)
+        if self.shadows is not None:
+            self.shadows.close()
 
         self.reporter.report_status("Bot stopped")
         self.logger.info("Bot shutdown complete")
 
+# =========================
+# Multi-Symbol Mode
+# =========================
+def run_multi(bot_specs):
+    """Run many bots in one process over shared combined-stream connections"""
+    logger = Logger(0, "ENGINE")
+    engine = MarketDataEngine(logger)
+    predictor_cache = SharedPredictors()
+    bots = []
+
+    for spec in bot_specs:
+        try:
+            bot = TradingBot(spec['bot_id'], spec['symbol'], spec.get('config'), predictor_cache)
+            bot.start_shared(engine)
+            bots.append(bot)
+        except (Exception, SystemExit) as e:
+            logger.error(f"Failed to start bot {spec.get('bot_id')} ({spec.get('symbol')}): {e}")
+
+    if not bots:
+        logger.error("No bots started")
+        sys.exit(1)
+
+    logger.info(f"{len(bots)} bots running, {len(predictor_cache)} models loaded")
+
+    try:
+        engine.start()
+    except KeyboardInterrupt:
+        logger.info("Engine stopped by user")
+    except Exception as e:
+        logger.error(f"Fatal error: {e}")
+    finally:
+        engine.stop()
+        for bot in bots:
+            bot.shutdown()
+        # Bots that failed after loading their model
+        predictor_cache.close_all()
+
 # =========================
 # Main Entry Point
 # =========================
 def main():
     parser = argparse.ArgumentParser(description='Crypto Trading Bot')
-    parser.add_argument('--bot-id', type=int, required=True, help='Bot ID from database')
-    parser.add_argument('--symbol', type=str, required=True, help='Trading symbol (e.g., BTCUSDC)')
+    parser.add_argument('--bot-id', type=int, help='Bot ID from database')
+    parser.add_argument('--symbol', type=str, help='Trading symbol (e.g., BTCUSDC)')
     parser.add_argument('--config-json', type=str, help='Initial config as JSON string')
+    parser.add_argument('--bots-json', type=str,
+                        help='Run many bots in one process: JSON list of {"bot_id", "symbol", "config"}')
 
     args = parser.parse_args()
 
+    if args.bots_json:
+        try:
+            bot_specs = json.loads(args.bots_json)
+        except json.JSONDecodeError as e:
+            print(f"ERROR: Invalid bots JSON: {e}", file=sys.stderr)
+            sys.exit(1)
+
+        run_multi(bot_specs)
+        return
+
+    if args.bot_id is None or not args.symbol:
+        parser.error("--bot-id and --symbol are required (or use --bots-json)")
+
     # Parse initial config if provided
     initial_config = None
     if args.config_json:
@@ -13,9 +13,15 @@ import sys
 import argparse
 import sqlite3
 from datetime import datetime
-from sklearn.model_selection import train_test_split
 from sklearn.metrics import precision_score
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from utils.trade_archive import iter_trade_history
+from training.features import add_features, fill_second_bars
+from training.job_stats import TrainingStats, ensure_stats_column
+from training.labels import add_labels
+from training.resampler import resample_trades
+
 # =========================
 # Configuration
 # =========================
@@ -31,131 +37,63 @@ def log(message):
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     print(f"[{timestamp}] {message}", flush=True)
 
-def update_progress(model_id, progress):
-    """Update training progress in database"""
+def stage_log(level, message):
+    """TrainingStats logger"""
+    log(message)
+
+def update_progress(conn, model_id, progress):
+    """Update training progress in database (on the job's connection)"""
     try:
-        conn = sqlite3.connect(DB_PATH)
         conn.execute("""
             UPDATE ai_training_models 
             SET progress = ?
             WHERE id = ?
         """, (progress, model_id))
         conn.commit()
-        conn.close()
         print(f"Progress: {progress}%", flush=True)
     except Exception as e:
         log(f"Failed to update progress: {e}")
 
-def update_accuracy(model_id, accuracy):
+def update_accuracy(conn, model_id, accuracy):
     """Update model accuracy in database"""
     try:
-        conn = sqlite3.connect(DB_PATH)
         conn.execute("""
             UPDATE ai_training_models 
             SET accuracy = ?
             WHERE id = ?
         """, (accuracy, model_id))
         conn.commit()
-        conn.close()
     except Exception as e:
         log(f"Failed to update accuracy: {e}")
 
-def load_data_from_db(symbol):
-    """Load crypto trades data from database"""
+def load_data_from_db(conn, symbol):
+    """Load crypto trades for a symbol as 1-second candles (streamed in chunks)"""
     log(f"Loading data for {symbol} from database...")
     
-    conn = sqlite3.connect(DB_PATH)
+    # Parquet archive + one (symbol, timestamp_ms) index range scan, resampled chunk by chunk
+    df_1s, trade_count = resample_trades(iter_trade_history(conn, symbol))
     
-    # Load trades data
-    query = """
-        SELECT 
-            timestamp_ms,
-            price,
-            quantity,
-            side
-        FROM crypto_trades 
-        WHERE symbol = ?
-        ORDER BY timestamp_ms ASC
-    """
-    
-    df = pd.read_sql_query(query, conn, params=(symbol,))
-    conn.close()
-    
-    if len(df) == 0:
+    if trade_count == 0:
         raise ValueError(f"No data found for symbol {symbol}")
     
-    log(f"Loaded {len(df):,} trade records")
-    return df
+    log(f"Loaded {trade_count:,} trade records")
+    return df_1s
 
-def prepare_features(df, profit_target_pct, fill_window, profit_window):
-    """Prepare features and targets from raw trade data"""
+def prepare_features(df_1s, profit_target_pct, fill_window, profit_window):
+    """Prepare features and targets from 1-second candles (load_data_from_db)"""
     log("Preparing features and targets...")
     
-    # Convert timestamp and set index
-    df['datetime'] = pd.to_datetime(df['timestamp_ms'], unit='ms')
-    df = df.set_index('datetime')
-    
-    # Create signed volume (positive for BUY, negative for SELL)
-    df['signed_volume'] = df.apply(
-        lambda x: x['quantity'] if x['side'] == 'BUY' else -x['quantity'], 
-        axis=1
-    )
-    
-    # Resample to 1-second candles
-    df_1s = df.resample('1s').agg({
-        'price': ['last', 'min', 'max'], 
-        'quantity': 'sum',
-        'signed_volume': 'sum',
-        'side': 'count'
-    })
-    
-    df_1s.columns = ['close_price', 'low_price', 'high_price', 'total_volume', 'net_flow', 'trade_count']
-    
-    # Fill missing values
-    df_1s['close_price'] = df_1s['close_price'].ffill()
-    df_1s['low_price'] = df_1s['low_price'].fillna(df_1s['close_price'])
-    df_1s['high_price'] = df_1s['high_price'].fillna(df_1s['close_price'])
-    df_1s['total_volume'] = df_1s['total_volume'].fillna(0)
-    df_1s['net_flow'] = df_1s['net_flow'].fillna(0)
-    df_1s['trade_count'] = df_1s['trade_count'].fillna(0)
-    
-    # Drop rows where price is still NaN
-    df_1s.dropna(subset=['close_price'], inplace=True)
+    # Fill missing values (rows before the first price are dropped)
+    fill_second_bars(df_1s)
     
     log(f"Resampled to {len(df_1s):,} 1-second candles")
     
     # Feature engineering
-    df_1s['net_flow_ma5'] = df_1s['net_flow'].rolling(5).mean()
-    df_1s['net_flow_ma15'] = df_1s['net_flow'].rolling(15).mean()
-    df_1s['volume_ma5'] = df_1s['total_volume'].rolling(5).mean()
-    df_1s['net_flow_diff'] = df_1s['net_flow'].diff()
-    df_1s['price_change'] = df_1s['close_price'].pct_change(fill_method=None) * 100
-    df_1s['std_5'] = df_1s['close_price'].rolling(5).std()
-    df_1s['dist_ma15'] = df_1s['close_price'] - df_1s['close_price'].rolling(15).mean()
-    
-    # RSI calculation
-    delta = df_1s['close_price'].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(14).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-    rs = gain / (loss + 1e-10)
-    df_1s['rsi'] = 100 - (100 / (1 + rs))
-    
-    # Target creation
-    log("Creating targets...")
-    
-    # Future minimum low (for fill check)
-    indexer_fill = pd.api.indexers.FixedForwardWindowIndexer(window_size=fill_window)
-    df_1s['future_min_low'] = df_1s['low_price'].rolling(window=indexer_fill).min().shift(-1)
-    is_filled = df_1s['future_min_low'] <= df_1s['close_price']
-    
-    # Future maximum high (for profit check)
-    indexer_profit = pd.api.indexers.FixedForwardWindowIndexer(window_size=profit_window)
-    df_1s['future_max_high'] = df_1s['high_price'].rolling(window=indexer_profit).max().shift(-1)
-    target_price = df_1s['close_price'] * (1 + profit_target_pct)
-    is_profit = df_1s['future_max_high'] > target_price
+    add_features(df_1s)
     
-    # Combined target (filled AND profitable)
-    df_1s['target'] = (is_filled & is_profit).astype(int)
+    # Target creation: filled within fill_window AND profitable within profit_window
+    log("Creating targets...")
+    add_labels(df_1s, profit_target_pct, fill_window, profit_window)
     
     # Remove NaN values
     df_1s.dropna(inplace=True)
@@ -174,7 +112,7 @@ def prepare_features(df, profit_target_pct, fill_window, profit_window):
     
     return df_1s
 
-def train_model(df_1s, model_id, learning_rate, n_estimators, max_depth, confidence_threshold):
+def train_model(conn, df_1s, model_id, learning_rate, n_estimators, max_depth, confidence_threshold, stats=None):
     """Train LightGBM model"""
     log("Training LightGBM model...")
     
@@ -188,8 +126,10 @@ def train_model(df_1s, model_id, learning_rate, n_estimators, max_depth, confide
     X = df_1s[feature_cols]
     y = df_1s['target']
     
-    # Train/test split (time-based)
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, shuffle=False)
+    # Train/test split (time-based; views, same rows as train_test_split(shuffle=False))
+    split = len(X) - int(np.ceil(len(X) * 0.2))
+    X_train, X_test = X.iloc[:split], X.iloc[split:]
+    y_train, y_test = y.iloc[:split], y.iloc[split:]
     
     # Calculate scale weight for imbalanced data
     neg = y_train.value_counts().get(0, 1)
@@ -198,7 +138,7 @@ def train_model(df_1s, model_id, learning_rate, n_estimators, max_depth, confide
     
     log(f"Scale pos weight: {scale_weight:.2f}")
     
-    update_progress(model_id, 30)
+    update_progress(conn, model_id, 30)
     
     # Train model
     model = lgb.LGBMClassifier(
@@ -211,11 +151,15 @@ def train_model(df_1s, model_id, learning_rate, n_estimators, max_depth, confide
         verbose=-1
     )
     
-    update_progress(model_id, 50)
+    update_progress(conn, model_id, 50)
     
-    model.fit(X_train, y_train)
+    callbacks = []
+    if stats:
+        callbacks.append(stats.lightgbm_callback(
+            n_estimators, lambda done, total: update_progress(conn, model_id, 50 + int(30 * done / total))))
+    model.fit(X_train, y_train, callbacks=callbacks)
     
-    update_progress(model_id, 80)
+    update_progress(conn, model_id, 80)
     
     # Evaluate model
     log("Evaluating model...")
@@ -226,7 +170,7 @@ def train_model(df_1s, model_id, learning_rate, n_estimators, max_depth, confide
     log(f"Model precision: {precision*100:.2f}%")
     
     # Update accuracy in database
-    update_accuracy(model_id, precision)
+    update_accuracy(conn, model_id, precision)
     
     return model, precision
 
@@ -246,33 +190,46 @@ def main():
     
     log(f"Starting training for Model ID: {args.model_id}, Symbol: {args.symbol}")
     
+    # One connection for the whole job (progress, stats, data)
+    conn = sqlite3.connect(DB_PATH)
+    
     try:
-        update_progress(args.model_id, 10)
+        ensure_stats_column(conn)
+        stats = TrainingStats(conn, args.model_id, stage_log)
+        update_progress(conn, args.model_id, 10)
         
         # Load data from database
-        df = load_data_from_db(args.symbol)
+        with stats.stage("load") as stage:
+            df_1s = load_data_from_db(conn, args.symbol)
+            stage['rows'] = len(df_1s)
         
-        update_progress(args.model_id, 20)
+        update_progress(conn, args.model_id, 20)
         
         # Prepare features and targets
-        df_1s = prepare_features(
-            df, 
-            args.profit_target_pct, 
-            args.fill_window, 
-            args.profit_window
-        )
+        with stats.stage("features") as stage:
+            stage['rows'] = len(df_1s)
+            df_1s = prepare_features(
+                df_1s, 
+                args.profit_target_pct, 
+                args.fill_window, 
+                args.profit_window
+            )
         
         # Train model
-        model, precision = train_model(
-            df_1s,
-            args.model_id,
-            args.learning_rate,
-            args.n_estimators,
-            args.max_depth,
-            args.confidence_threshold
-        )
+        with stats.stage("train") as stage:
+            stage['rows'] = len(df_1s)
+            model, precision = train_model(
+                conn,
+                df_1s,
+                args.model_id,
+                args.learning_rate,
+                args.n_estimators,
+                args.max_depth,
+                args.confidence_threshold,
+                stats=stats
+            )
         
-        update_progress(args.model_id, 90)
+        update_progress(conn, args.model_id, 90)
         
         # Save model
         model_filename = f"{args.symbol}_model_{args.model_id}.txt"
@@ -281,7 +238,7 @@ def main():
         
         log(f"Model saved: {model_filename}")
         
-        update_progress(args.model_id, 100)
+        update_progress(conn, args.model_id, 100)
         
         log(f"Training completed successfully! Precision: {precision*100:.2f}%")
         
@@ -290,6 +247,9 @@ def main():
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    
+    finally:
+        conn.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
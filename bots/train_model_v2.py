@@ -15,15 +15,39 @@ import sys
 import argparse
 import json
 from datetime import datetime
-from sklearn.model_selection import train_test_split
 from sklearn.metrics import precision_score
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from utils.trade_archive import iter_trade_history
+from training.dataset_cache import load_training_frame
+from training.job_stats import TrainingStats, ensure_stats_column
+from training.features import (BOOK_FEATURE_COLUMNS, add_book_features, add_features, fill_book_columns,
+                               fill_second_bars)
+from training.labels import add_labels
+from training.resampler import resample_trades
+from training.sweep import run_sweep
+from training.v2_bars import load_v2_bars
+from training.walk_forward import run_walk_forward
+
 # ==========================================
 # Database Configuration
 # ==========================================
 DB_PATH = os.path.join(os.path.dirname(__file__), "..", "server", "data", "bot_manager.db")
 MODEL_DEST_PATH = os.path.join(os.path.dirname(__file__), "..", "models")
 
+FEATURE_COLS = [
+    'total_volume', 'net_flow', 'trade_count',
+    'net_flow_ma5', 'net_flow_ma15', 'volume_ma5',
+    'net_flow_diff', 'price_change',
+    'std_5', 'dist_ma15', 'rsi'
+]
+
+def feature_columns(params):
+    """Model features for the data source (bars_v2 adds the order-book/flow features)"""
+    if params.get('data_source') == 'bars_v2':
+        return FEATURE_COLS + BOOK_FEATURE_COLUMNS
+    return FEATURE_COLS
+
 def log(level, message):
     """Log with timestamp and flush immediately"""
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
@@ -76,6 +100,83 @@ def update_status(conn, model_id, status, accuracy=None, model_file_path=None):
     except Exception as e:
         log("ERROR", f"Failed to update status: {e}")
 
+# Lineage columns of ai_training_models (also added by server/config/database.js)
+LINEAGE_COLUMNS = [
+    ('parent_model_id', 'INTEGER'),
+    ('training_mode', "TEXT DEFAULT 'full'"),
+    ('trained_from', 'TEXT'),
+    ('trained_until', 'TEXT'),
+    ('num_trees', 'INTEGER'),
+]
+
+def ensure_lineage_columns(conn):
+    """Add the lineage columns to older databases"""
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(ai_training_models)")}
+    for name, definition in LINEAGE_COLUMNS:
+        if name not in existing:
+            conn.execute(f"ALTER TABLE ai_training_models ADD COLUMN {name} {definition}")
+    conn.commit()
+
+def update_lineage(conn, model_id, mode, parent_model_id, X_train, model_path):
+    """Record what the saved model was trained on (trained_until = watermark for continuation)"""
+    num_trees = lgb.Booster(model_file=model_path).num_trees()
+    conn.execute("""
+        UPDATE ai_training_models
+        SET training_mode = ?, parent_model_id = ?, trained_from = ?, trained_until = ?, num_trees = ?
+        WHERE id = ?
+    """, (mode, parent_model_id, str(X_train.index[0]), str(X_train.index[-1]), num_trees, model_id))
+    conn.commit()
+
+def load_parent_model(conn, parent_id, symbol, feature_cols):
+    """
+    Completed model to continue from: (booster path, trained_until watermark)
+    feature_cols: columns this run trains on; must be the parent's features, in order
+    """
+    row = conn.execute("""
+        SELECT symbol, status, model_file_path, trained_until FROM ai_training_models WHERE id = ?
+    """, (parent_id,)).fetchone()
+    if not row:
+        raise ValueError(f"Parent model ID {parent_id} not found")
+
+    parent_symbol, status, model_file_path, trained_until = row
+    if parent_symbol != symbol:
+        raise ValueError(f"Parent model {parent_id} is for {parent_symbol}, not {symbol}")
+    if status != 'completed':
+        raise ValueError(f"Parent model {parent_id} is not completed (status: {status})")
+    if not trained_until:
+        raise ValueError(f"Parent model {parent_id} has no training watermark; retrain it fully first")
+
+    model_path = os.path.join(MODEL_DEST_PATH, f"{symbol}_model_{parent_id}.txt")
+    if not os.path.exists(model_path):
+        model_path = model_file_path
+    if not model_path or not os.path.exists(model_path):
+        raise ValueError(f"Model file of parent model {parent_id} not found")
+
+    parent_features = lgb.Booster(model_file=model_path).feature_name()
+    # Models fitted on unnamed arrays only have LightGBM's Column_<i> names: compare the count
+    unnamed = parent_features == [f"Column_{i}" for i in range(len(parent_features))]
+    if (len(parent_features) != len(feature_cols)) if unnamed else (parent_features != list(feature_cols)):
+        missing = [name for name in parent_features if name not in feature_cols]
+        extra = [name for name in feature_cols if name not in parent_features]
+        raise ValueError(
+            f"Parent model {parent_id} was trained on {len(parent_features)} features, this run uses "
+            f"{len(feature_cols)} (missing: {missing or 'none'}, extra: {extra or 'none'}); "
+            f"use the parent's --source ({parent_data_source(conn, parent_id)})")
+
+    return model_path, pd.Timestamp(trained_until)
+
+def parent_data_source(conn, parent_id):
+    """Input source a model was trained on (models from before it was recorded: trades)"""
+    try:
+        return load_parameters(conn, parent_id).get('data_source', 'trades')
+    except (ValueError, TypeError):
+        return 'trades'
+
+def save_parameters(conn, model_id, params):
+    """Write the resolved parameters back, so the model row describes what it was trained with"""
+    conn.execute("UPDATE ai_training_models SET parameters = ? WHERE id = ?", (json.dumps(params), model_id))
+    conn.commit()
+
 def load_parameters(conn, model_id):
     """Load training parameters from database"""
     cursor = conn.cursor()
@@ -87,110 +188,87 @@ def load_parameters(conn, model_id):
         raise ValueError(f"Model ID {model_id} not found")
     return json.loads(row[0])
 
-def load_trades_from_db(conn, symbol):
-    """Load trades from crypto_trades table"""
-    log("INFO", f"Loading trades for {symbol} from database...")
+def load_bars_from_db(conn, symbol, source='trades'):
+    """Load trades for a symbol and aggregate them to 1-second bars (streamed in chunks)"""
+    if source == 'bars_v2':
+        return load_v2_bars_from_db(conn, symbol)
 
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT timestamp_ms, price, quantity, side, is_maker
-        FROM crypto_trades
-        WHERE symbol = ?
-        ORDER BY timestamp_ms
-    """, (symbol.upper(),))
+    log("INFO", f"Loading trades for {symbol} from database...")
 
-    trades = cursor.fetchall()
+    # Archived days from Parquet, recent days via one (symbol, timestamp_ms) range scan
+    df_1s, trade_count = resample_trades(iter_trade_history(conn, symbol))
 
-    if not trades:
+    if trade_count == 0:
         raise ValueError(f"No trades found for {symbol}")
 
-    log("INFO", f"Loaded {len(trades):,} trades")
+    log("INFO", f"Loaded {trade_count:,} trades")
 
-    # Convert to DataFrame
-    df = pd.DataFrame(trades, columns=['timestamp_ms', 'price', 'quantity', 'side', 'is_maker'])
-    df['datetime'] = pd.to_datetime(df['timestamp_ms'], unit='ms')
-    df = df.set_index('datetime')
+    return df_1s
 
-    return df
+def load_v2_bars_from_db(conn, symbol):
+    """Load pre-aggregated 1-second bars (crypto_trades_v2) with empty seconds added"""
+    log("INFO", f"Loading V2 1-second bars for {symbol} from database...")
 
-def prepare_features(df, params):
-    """Prepare features from trade data"""
-    log("INFO", "Preparing features...")
+    df_1s, bar_count = load_v2_bars(conn, symbol)
 
-    PROFIT_TARGET_PCT = params.get('profit_target_pct', 0.0003)
-    FILL_WINDOW = params.get('fill_window', 20)
-    PROFIT_WINDOW = params.get('profit_window', 300)
+    if bar_count == 0:
+        raise ValueError(f"No V2 bars found for {symbol}")
 
-    # Calculate signed volume (BUY = positive, SELL = negative)
-    df['signed_volume'] = df.apply(
-        lambda x: x['quantity'] if x['side'] == 'BUY' else -x['quantity'],
-        axis=1
-    )
+    log("INFO", f"Loaded {bar_count:,} bars")
 
-    # Resample to 1-second candles
-    df_1s = df.resample('1s').agg({
-        'price': ['last', 'min', 'max'],
-        'quantity': 'sum',
-        'signed_volume': 'sum',
-        'side': 'count'
-    })
-    df_1s.columns = ['close_price', 'low_price', 'high_price', 'total_volume', 'net_flow', 'trade_count']
+    return df_1s
+
+def prepare_features(df_1s, params):
+    """Prepare features from 1-second bars (load_bars_from_db)"""
+    log("INFO", "Preparing features...")
 
     # Fill gaps for seconds with no trades
-    df_1s['close_price'] = df_1s['close_price'].ffill()
-    df_1s['low_price'] = df_1s['low_price'].fillna(df_1s['close_price'])
-    df_1s['high_price'] = df_1s['high_price'].fillna(df_1s['close_price'])
-    df_1s['total_volume'] = df_1s['total_volume'].fillna(0)
-    df_1s['net_flow'] = df_1s['net_flow'].fillna(0)
-    df_1s['trade_count'] = df_1s['trade_count'].fillna(0)
+    fill_second_bars(df_1s)
+    check_enough_data(df_1s, params)
+
+    # Feature engineering + target creation
+    add_features(df_1s)
+    if params.get('data_source') == 'bars_v2':
+        fill_book_columns(df_1s)
+        add_book_features(df_1s)
+    add_labels(df_1s, params.get('profit_target_pct', 0.0003),
+               params.get('fill_window', 20), params.get('profit_window', 300))
+
+    return drop_incomplete_rows(df_1s)
+
+def load_cached_dataset(conn, symbol, params, rebuild=False):
+    """Features + labels through the incremental dataset cache (training.dataset_cache)"""
+    log("INFO", f"Loading {symbol} dataset (cache)...")
+
+    df_1s, _ = load_training_frame(
+        conn, symbol,
+        params.get('profit_target_pct', 0.0003),
+        params.get('fill_window', 20),
+        params.get('profit_window', 300),
+        rebuild=rebuild, log=log, source=params.get('data_source', 'trades')
+    )
+    check_enough_data(df_1s, params)
 
-    # Drop rows without price (at the beginning)
-    df_1s.dropna(subset=['close_price'], inplace=True)
+    return drop_incomplete_rows(df_1s)
 
+def check_enough_data(df_1s, params):
     log("INFO", f"Resampled to {len(df_1s):,} 1-second candles")
 
-    if len(df_1s) < PROFIT_WINDOW + 100:
+    if len(df_1s) < params.get('profit_window', 300) + 100:
         raise ValueError(f"Not enough data after resampling ({len(df_1s)} rows)")
 
-    # Feature engineering
-    df_1s['net_flow_ma5'] = df_1s['net_flow'].rolling(5).mean()
-    df_1s['net_flow_ma15'] = df_1s['net_flow'].rolling(15).mean()
-    df_1s['volume_ma5'] = df_1s['total_volume'].rolling(5).mean()
-    df_1s['net_flow_diff'] = df_1s['net_flow'].diff()
-    df_1s['price_change'] = df_1s['close_price'].pct_change(fill_method=None) * 100
-    df_1s['std_5'] = df_1s['close_price'].rolling(5).std()
-    df_1s['dist_ma15'] = df_1s['close_price'] - df_1s['close_price'].rolling(15).mean()
-
-    # RSI calculation
-    delta = df_1s['close_price'].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(14).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-    rs = gain / (loss + 1e-10)
-    df_1s['rsi'] = 100 - (100 / (1 + rs))
-
-    # Target creation
-    indexer_fill = pd.api.indexers.FixedForwardWindowIndexer(window_size=FILL_WINDOW)
-    df_1s['future_min_low'] = df_1s['low_price'].rolling(window=indexer_fill).min().shift(-1)
-    is_filled = df_1s['future_min_low'] <= df_1s['close_price']
-
-    indexer_profit = pd.api.indexers.FixedForwardWindowIndexer(window_size=PROFIT_WINDOW)
-    df_1s['future_max_high'] = df_1s['high_price'].rolling(window=indexer_profit).max().shift(-1)
-    target_price = df_1s['close_price'] * (1 + PROFIT_TARGET_PCT)
-    is_profit = df_1s['future_max_high'] > target_price
-
-    df_1s['target'] = (is_filled & is_profit).astype(int)
-
-    # Drop NaN rows
+def drop_incomplete_rows(df_1s):
+    """Drop NaN rows (feature warm-up at the start, label horizon at the end)"""
     before_drop = len(df_1s)
     df_1s.dropna(inplace=True)
     log("INFO", f"Final training set: {len(df_1s):,} rows (dropped {before_drop - len(df_1s)} rows)")
 
     return df_1s
 
-def train_model(df_1s, params, model_id, symbol, conn):
-    """Train LightGBM model"""
-    log("INFO", "Starting model training...")
-
+def split_dataset(df_1s, feature_cols=FEATURE_COLS):
+    """Chronological 80/20 split
+    Returns: (X_train, X_test, y_train, y_test, scale_pos_weight)
+    """
     y = df_1s['target']
     counts = y.value_counts()
     pos_samples = counts.get(1, 0)
@@ -201,18 +279,12 @@ def train_model(df_1s, params, model_id, symbol, conn):
     if pos_samples < 50:
         raise ValueError(f"Not enough positive samples ({pos_samples})")
 
-    # Prepare features
-    feature_cols = [
-        'total_volume', 'net_flow', 'trade_count',
-        'net_flow_ma5', 'net_flow_ma15', 'volume_ma5',
-        'net_flow_diff', 'price_change',
-        'std_5', 'dist_ma15', 'rsi'
-    ]
-
+    # Time-based 80/20 split as views of one feature copy
+    # (same rows as train_test_split(test_size=0.2, shuffle=False), without copying them again)
     X = df_1s[feature_cols]
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, shuffle=False
-    )
+    split = len(X) - int(np.ceil(len(X) * 0.2))
+    X_train, X_test = X.iloc[:split], X.iloc[split:]
+    y_train, y_test = y.iloc[:split], y.iloc[split:]
 
     # Calculate scale pos weight
     neg = y_train.value_counts().get(0, 1)
@@ -220,6 +292,14 @@ def train_model(df_1s, params, model_id, symbol, conn):
     scale_weight = neg / pos if pos > 0 else 1.0
 
     log("INFO", f"Scale pos weight: {scale_weight:.2f}")
+    return X_train, X_test, y_train, y_test, scale_weight
+
+def train_model(df_1s, params, model_id, symbol, conn, init_model=None, parent_model_id=None, stats=None):
+    """Train LightGBM model (init_model: booster file to continue, adding n_estimators trees)"""
+    log("INFO", "Starting model training..." if init_model is None else
+        f"Continuing model {parent_model_id} with {params.get('n_estimators', 500)} trees...")
+
+    X_train, X_test, y_train, y_test, scale_weight = split_dataset(df_1s, feature_columns(params))
     update_progress(conn, model_id, 50, "Training model...")
 
     # Train model
@@ -233,7 +313,14 @@ def train_model(df_1s, params, model_id, symbol, conn):
         verbose=-1
     )
 
-    model.fit(X_train, y_train)
+    callbacks = []
+    if stats:
+        # Iteration progress -> training_stats, and the progress bar from 50% to 80%
+        callbacks.append(stats.lightgbm_callback(
+            model.n_estimators,
+            lambda done, total: update_progress(conn, model_id, 50 + int(30 * done / total),
+                                                f"Training model... {done}/{total} trees")))
+    model.fit(X_train, y_train, init_model=init_model, callbacks=callbacks)
     update_progress(conn, model_id, 80, "Evaluating model...")
 
     # Evaluate
@@ -252,16 +339,65 @@ def train_model(df_1s, params, model_id, symbol, conn):
     model_filename = f"{symbol}_model_{model_id}.txt"
     model_path = os.path.join(MODEL_DEST_PATH, model_filename)
     model.booster_.save_model(model_path)
+    update_lineage(conn, model_id, 'full' if init_model is None else 'continue', parent_model_id,
+                   X_train, model_path)
 
     log("INFO", f"Model saved: {model_filename}")
     update_progress(conn, model_id, 100, "Training completed!")
 
     return precision, model_path
 
+def continue_training(df_1s, params, model_id, symbol, conn, parent_id, stats=None):
+    """Add trees to a parent model using only bars after its training watermark"""
+    init_model, trained_until = load_parent_model(conn, parent_id, symbol, feature_columns(params))
+
+    df_new = df_1s[df_1s.index > trained_until]
+    log("INFO", f"Continuation from model {parent_id}: {len(df_new):,} new rows after {trained_until}")
+    if len(df_new) < params.get('profit_window', 300) + 100:
+        raise ValueError(f"Not enough new data since {trained_until} ({len(df_new)} rows)")
+
+    continue_params = dict(params, n_estimators=params.get('continue_estimators', 100))
+    return train_model(df_new, continue_params, model_id, symbol, conn,
+                       init_model=init_model, parent_model_id=parent_id, stats=stats)
+
+def train_sweep(df_1s, params, model_id, symbol, conn, workers=None):
+    """Hyperparameter sweep (params['sweep']); the best trial becomes the model"""
+    log("INFO", "Starting hyperparameter sweep...")
+
+    split = split_dataset(df_1s, feature_columns(params))
+    update_progress(conn, model_id, 50, "Running sweep trials...")
+
+    def on_trial(result, completed, total):
+        update_progress(conn, model_id, 50 + int(40 * completed / total), f"Sweep: {completed}/{total} trials done")
+
+    model_path = os.path.join(MODEL_DEST_PATH, f"{symbol}_model_{model_id}.txt")
+    best, _ = run_sweep(conn, DB_PATH, model_id, params['sweep'], params, split, model_path,
+                        workers=workers, on_trial=on_trial, log=log)
+    update_lineage(conn, model_id, 'full', None, split[0], model_path)
+
+    # Record the winning parameters so the model row describes the saved model
+    best_params = dict(params, **best['params'], best_trial=best['trial'])
+    save_parameters(conn, model_id, best_params)
+
+    log("INFO", f"Best trial {best['trial']}: precision {best['precision']*100:.2f}% {best['params']}")
+    log("INFO", f"Model saved: {os.path.basename(model_path)}")
+    update_progress(conn, model_id, 100, "Training completed!")
+
+    return best['precision'], model_path
+
 def main():
     parser = argparse.ArgumentParser(description='AI Model Training Script')
     parser.add_argument('--model-id', type=int, required=True, help='Model ID from database')
     parser.add_argument('--symbol', type=str, required=True, help='Trading symbol (e.g., BTCUSDC)')
+    parser.add_argument('--no-cache', action='store_true', help='Rebuild the dataset from all trades, bypassing the cache')
+    parser.add_argument('--rebuild-cache', action='store_true', help='Discard the cached dataset and rebuild it')
+    parser.add_argument('--source', type=str, choices=['trades', 'bars_v2'],
+                        help='Training input: crypto_trades ticks or crypto_trades_v2 bars (default: params.data_source or trades)')
+    parser.add_argument('--workers', type=int, help='Sweep worker processes (default: sweep.workers or all cores)')
+    parser.add_argument('--walk-forward', action='store_true',
+                        help='Run walk-forward validation before training (also enabled by params.walk_forward)')
+    parser.add_argument('--continue-from', type=int,
+                        help='Parent model ID: add trees on data after its watermark (also params.continue_from)')
 
     args = parser.parse_args()
     model_id = args.model_id
@@ -276,24 +412,63 @@ def main():
         conn.execute("PRAGMA synchronous=NORMAL")
 
         log("INFO", f"Starting training for Model ID: {model_id}, Symbol: {symbol}")
+        ensure_lineage_columns(conn)
+        ensure_stats_column(conn)
+        stats = TrainingStats(conn, model_id, log)
         update_status(conn, model_id, 'training')
         update_progress(conn, model_id, 10, "Loading parameters...")
 
         # Load parameters
         params = load_parameters(conn, model_id)
+        continue_from = args.continue_from or params.get('continue_from')
+        # Continuations default to the parent's source (same feature set)
+        params['data_source'] = (args.source or params.get('data_source')
+                                 or (parent_data_source(conn, int(continue_from)) if continue_from else 'trades'))
+        save_parameters(conn, model_id, params)
         log("INFO", f"Parameters: {json.dumps(params, indent=2)}")
+        if continue_from:
+            # Fail before loading data if the parent cannot be continued with these features
+            load_parent_model(conn, int(continue_from), symbol, feature_columns(params))
         update_progress(conn, model_id, 20, "Loading trade data...")
 
-        # Load trades
-        df = load_trades_from_db(conn, symbol)
-        update_progress(conn, model_id, 30, "Preparing features...")
-
-        # Prepare features
-        df_1s = prepare_features(df, params)
+        if args.no_cache:
+            # Load trades (or V2 bars) as 1-second bars
+            with stats.stage("load") as stage:
+                df_1s = load_bars_from_db(conn, symbol, params['data_source'])
+                stage['rows'] = len(df_1s)
+            update_progress(conn, model_id, 30, "Preparing features...")
+
+            # Prepare features
+            with stats.stage("features") as stage:
+                stage['rows'] = len(df_1s)
+                df_1s = prepare_features(df_1s, params)
+        else:
+            # Cached bars/features/labels, only trades after the watermark are processed
+            with stats.stage("load_features") as stage:
+                df_1s = load_cached_dataset(conn, symbol, params, rebuild=args.rebuild_cache)
+                stage['rows'] = len(df_1s)
         update_progress(conn, model_id, 40, "Feature preparation complete")
 
-        # Train model
-        precision, model_path = train_model(df_1s, params, model_id, symbol, conn)
+        # Walk-forward validation (per-fold results -> ai_training_folds)
+        if args.walk_forward or params.get('walk_forward'):
+            update_progress(conn, model_id, 45, "Walk-forward validation...")
+            with stats.stage("walk_forward") as stage:
+                stage['rows'] = len(df_1s)
+                _, summary = run_walk_forward(conn, model_id, symbol, df_1s, params, feature_columns(params),
+                                              workers=args.workers, log=log)
+            update_progress(conn, model_id, 48, f"Walk-forward: precision {summary['precision']*100:.2f}%, "
+                            f"PnL {summary['pnl_pct']:+.2f}% over {summary['folds']} folds")
+
+        # Train model (continue a parent model, or sweep the search space in params['sweep'])
+        with stats.stage("train") as stage:
+            stage['rows'] = len(df_1s)
+            if continue_from:
+                precision, model_path = continue_training(df_1s, params, model_id, symbol, conn, int(continue_from),
+                                                          stats=stats)
+            elif params.get('sweep'):
+                precision, model_path = train_sweep(df_1s, params, model_id, symbol, conn, workers=args.workers)
+            else:
+                precision, model_path = train_model(df_1s, params, model_id, symbol, conn, stats=stats)
 
         # Update final status
         update_status(conn, model_id, 'completed', accuracy=precision, model_file_path=model_path)
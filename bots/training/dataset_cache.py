@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Dataset Cache
+On-disk, incrementally updated training dataset per symbol:
+
+    <root>/<SYMBOL>/meta.json
+    <root>/<SYMBOL>/bars_v<FEATURE_VERSION>.pkl   gap-filled 1s bars + FEATURE_COLUMNS
+    <root>/<SYMBOL>/labels_<params>.pkl           LABEL_COLUMNS per label parameter set
+
+Bars resampled from crypto_trades (source 'trades'); with source 'bars_v2'
+(crypto_trades_v2) the same files carry a 'v2_' prefix and the frames also
+hold the order-book columns and BOOK_FEATURE_COLUMNS.
+
+A run only reads trades from the watermark (the last cached second, which
+may have been incomplete) onwards and appends. Feature columns are
+recomputed over a short lookback so rolling windows see their history.
+Cached values can differ from a full rebuild only by float rounding in
+pandas' rolling sums. Labels only depend on later bars, so labels of rows
+whose window is complete are final and never recomputed.
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from utils.trade_archive import ARCHIVE_ROOT, iter_trade_history
+from utils.trade_queries import DEFAULT_CHUNK_SIZE
+from .features import (FEATURE_LOOKBACK, FEATURE_VERSION, add_book_features, add_features,
+                       fill_book_columns, fill_second_bars)
+from .labels import LABEL_COLUMNS, add_labels, label_horizon
+from .resampler import resample_trades
+from .v2_bars import load_v2_bars
+
+SOURCES = ['trades', 'bars_v2']
+
+EPOCH = pd.Timestamp(0)
+
+CACHE_ROOT = os.path.join(os.path.dirname(__file__), "..", "..", "server", "data", "dataset_cache")
+
+# Rows of cached history re-fed to add_features on append (a few times the longest window)
+FEATURE_CONTEXT = 4 * FEATURE_LOOKBACK
+
+
+def _default_log(level, message):
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    print(f"[{timestamp}] [{level}] {message}", flush=True)
+
+
+def label_key(profit_target_pct, fill_window, profit_window):
+    """File-name-safe key for a label parameter set"""
+    return f"p{profit_target_pct:g}_f{int(fill_window)}_w{int(profit_window)}"
+
+
+def _second_of(timestamp):
+    """Unix second of a (naive, UTC) bar timestamp"""
+    return int((timestamp - EPOCH) // pd.Timedelta(seconds=1))
+
+
+def build_features(df_1s, source='trades'):
+    """Gap filling + feature columns for raw 1s bars of a source (in place)"""
+    fill_second_bars(df_1s)
+    add_features(df_1s)
+    if source == 'bars_v2':
+        fill_book_columns(df_1s)
+        add_book_features(df_1s)
+    return df_1s
+
+
+class DatasetCache:
+    def __init__(self, symbol, root=CACHE_ROOT, archive_root=ARCHIVE_ROOT,
+                 chunk_size=DEFAULT_CHUNK_SIZE, log=None, source='trades'):
+        if source not in SOURCES:
+            raise ValueError(f"Unknown data source: {source} (expected one of {SOURCES})")
+        self.symbol = symbol.upper()
+        self.source = source
+        self.prefix = "" if source == 'trades' else "v2_"
+        self.dir = os.path.join(root, self.symbol)
+        self.meta_path = os.path.join(self.dir, f"{self.prefix}meta.json")
+        self.bars_path = os.path.join(self.dir, f"{self.prefix}bars_v{FEATURE_VERSION}.pkl")
+        self.archive_root = archive_root
+        self.chunk_size = chunk_size
+        self.log = log or _default_log
+
+        # Stats of the last update (for logging/instrumentation)
+        self.stats = {}
+
+    # -------------------------
+    # Files
+    # -------------------------
+    def _load_meta(self):
+        if not os.path.exists(self.meta_path):
+            return {}
+        try:
+            with open(self.meta_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_meta(self, meta):
+        os.makedirs(self.dir, exist_ok=True)
+        tmp_path = self.meta_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp_path, self.meta_path)
+
+    def _write_frame(self, df, path):
+        os.makedirs(self.dir, exist_ok=True)
+        tmp_path = path + ".tmp"
+        df.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+
+    def _read_frame(self, path):
+        if not os.path.exists(path):
+            return None
+        try:
+            return pd.read_pickle(path)
+        except Exception as e:
+            self.log("WARNING", f"Dataset cache: unreadable {os.path.basename(path)} ({e}), rebuilding")
+            return None
+
+    def clear(self):
+        """Delete all cached files of the symbol for this source"""
+        if not os.path.isdir(self.dir):
+            return
+        for name in os.listdir(self.dir):
+            if name.startswith("v2_") == (self.source == 'bars_v2') and name != "walk_forward.json":
+                os.remove(os.path.join(self.dir, name))
+        self.log("INFO", f"Dataset cache cleared for {self.symbol} ({self.source})")
+
+    def _load_raw(self, conn, start_second=None):
+        """Raw 1s bars from start_second on: (bars, source rows read)"""
+        if self.source == 'bars_v2':
+            return load_v2_bars(conn, self.symbol, start_second, chunk_size=self.chunk_size,
+                                root=self.archive_root)
+        start_ms = start_second * 1000 if start_second is not None else None
+        return resample_trades(iter_trade_history(conn, self.symbol, start_ms=start_ms,
+                                                  chunk_size=self.chunk_size, root=self.archive_root),
+                               start_second=start_second)
+
+    # -------------------------
+    # Bars + features
+    # -------------------------
+    def update_bars(self, conn):
+        """
+        Bring the cached bars/features up to date with the trade history
+        Returns: DataFrame of gap-filled 1s bars + FEATURE_COLUMNS (all rows)
+        """
+        start = time.time()
+        meta = self._load_meta()
+        cached = None
+        if meta.get('feature_version') == FEATURE_VERSION and meta.get('last_second') is not None:
+            cached = self._read_frame(self.bars_path)
+
+        if cached is None or not len(cached):
+            raw, trades = self._load_raw(conn)
+            df = build_features(raw, self.source)
+            mode, new_rows = 'full', len(df)
+        else:
+            # The last cached second may have been incomplete: rebuild it from the source
+            last_second = meta['last_second']
+            raw, trades = self._load_raw(conn, last_second)
+
+            if trades == 0:
+                df, new_rows = cached, 0
+            else:
+                kept = cached[cached.index < raw.index[0]]
+                context = kept.iloc[-FEATURE_CONTEXT:]
+                tail = build_features(pd.concat([context, raw]), self.source)
+                appended = tail.iloc[len(context):]
+                df = pd.concat([kept, appended])
+                new_rows = len(appended) - 1
+            mode = 'incremental'
+
+        if trades or mode == 'full':
+            self._write_frame(df, self.bars_path)
+            meta.update({
+                'symbol': self.symbol,
+                'source': self.source,
+                'feature_version': FEATURE_VERSION,
+                'first_second': _second_of(df.index[0]) if len(df) else None,
+                'last_second': _second_of(df.index[-1]) if len(df) else None,
+                'rows': len(df),
+                'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            })
+            self._save_meta(meta)
+
+        self.stats = {
+            'mode': mode,
+            'source_rows': trades,
+            'new_rows': new_rows,
+            'rows': len(df),
+            'seconds': time.time() - start,
+        }
+        self.log("INFO", f"Dataset cache ({self.symbol}, {self.source}, {mode}): read {trades:,} rows, "
+                 f"+{new_rows:,} bars, {len(df):,} total ({self.stats['seconds']:.1f}s)")
+        return df
+
+    # -------------------------
+    # Labels
+    # -------------------------
+    def labels(self, df, profit_target_pct, fill_window, profit_window):
+        """
+        Label columns for `df` (from update_bars) for one parameter set
+        Only rows whose label window was incomplete last time are computed.
+        Returns: DataFrame with LABEL_COLUMNS, same index as df
+        """
+        key = label_key(profit_target_pct, fill_window, profit_window)
+        path = os.path.join(self.dir, f"{self.prefix}labels_{key}.pkl")
+        horizon = label_horizon(fill_window, profit_window)
+
+        cached = self._read_frame(path)
+        done = 0
+        if cached is not None and len(cached) and len(cached) <= len(df):
+            # Cached labels must line up with the bars (same start, same last final row)
+            if cached.index[0] == df.index[0] and cached.index[-1] == df.index[len(cached) - 1]:
+                done = len(cached)
+
+        tail = df.iloc[done:][['close_price', 'low_price', 'high_price']].copy()
+        add_labels(tail, profit_target_pct, fill_window, profit_window)
+        labels = tail[LABEL_COLUMNS] if not done else pd.concat([cached.iloc[:done], tail[LABEL_COLUMNS]])
+
+        # Final rows: the label window ends before the last (possibly incomplete) bar
+        final = max(0, len(df) - 1 - horizon)
+        if final > done:
+            self._write_frame(labels.iloc[:final], path)
+
+        self.stats['labels_reused'] = done
+        self.stats['labels_computed'] = len(tail)
+        self.log("INFO", f"Dataset cache labels [{key}]: reused {done:,}, computed {len(tail):,}")
+        return labels
+
+
+def load_training_frame(conn, symbol, profit_target_pct, fill_window, profit_window,
+                        root=CACHE_ROOT, rebuild=False, log=None, source='trades'):
+    """
+    Bars + features + labels for a symbol, updated incrementally through the cache
+    Returns: (DataFrame with all rows, NaN rows not dropped; DatasetCache)
+    """
+    cache = DatasetCache(symbol, root=root, log=log, source=source)
+    if rebuild:
+        cache.clear()
+    df = cache.update_bars(conn)
+    labels = cache.labels(df, profit_target_pct, fill_window, profit_window)
+    return pd.concat([df, labels], axis=1), cache
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Training Features
+Gap filling and feature columns on 1-second bars, shared by the trainers
+and the dataset cache. Bump FEATURE_VERSION whenever the definitions change
+so cached feature columns are rebuilt.
+"""
+
+FEATURE_VERSION = 1
+
+FEATURE_COLUMNS = [
+    'net_flow_ma5', 'net_flow_ma15', 'volume_ma5', 'net_flow_diff',
+    'price_change', 'std_5', 'dist_ma15', 'rsi'
+]
+
+# Rows of history a feature value depends on (longest window: RSI = diff + rolling(14))
+FEATURE_LOOKBACK = 15
+
+
+def fill_second_bars(df_1s):
+    """Fill seconds with no trades (in place): carry the close, zero volume/flow/count"""
+    df_1s['close_price'] = df_1s['close_price'].ffill()
+    df_1s['low_price'] = df_1s['low_price'].fillna(df_1s['close_price'])
+    df_1s['high_price'] = df_1s['high_price'].fillna(df_1s['close_price'])
+    df_1s['total_volume'] = df_1s['total_volume'].fillna(0)
+    df_1s['net_flow'] = df_1s['net_flow'].fillna(0)
+    df_1s['trade_count'] = df_1s['trade_count'].fillna(0)
+
+    # Drop rows without price (at the beginning)
+    df_1s.dropna(subset=['close_price'], inplace=True)
+    return df_1s
+
+
+def add_features(df_1s):
+    """Add FEATURE_COLUMNS to gap-filled 1-second bars (in place)"""
+    df_1s['net_flow_ma5'] = df_1s['net_flow'].rolling(5).mean()
+    df_1s['net_flow_ma15'] = df_1s['net_flow'].rolling(15).mean()
+    df_1s['volume_ma5'] = df_1s['total_volume'].rolling(5).mean()
+    df_1s['net_flow_diff'] = df_1s['net_flow'].diff()
+    df_1s['price_change'] = df_1s['close_price'].pct_change(fill_method=None) * 100
+    df_1s['std_5'] = df_1s['close_price'].rolling(5).std()
+    df_1s['dist_ma15'] = df_1s['close_price'] - df_1s['close_price'].rolling(15).mean()
+
+    # RSI calculation
+    delta = df_1s['close_price'].diff()
+    gain = (delta.where(delta > 0, 0)).rolling(14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
+    rs = gain / (loss + 1e-10)
+    df_1s['rsi'] = 100 - (100 / (1 + rs))
+    return df_1s
+
+
+# =========================
+# Order-book / flow features (crypto_trades_v2 bars)
+# =========================
+# Book state at the last trade of a second; carried forward over empty seconds
+BOOK_STATE_COLUMNS = ['bid_qty', 'ask_qty', 'spread', 'book_imbalance', 'funding_rate']
+# Per-second flow; zero in empty seconds
+FLOW_COLUMNS = ['buy_volume', 'sell_volume']
+
+BOOK_FEATURE_COLUMNS = [
+    'spread_bps', 'book_imbalance', 'book_imbalance_ma5', 'depth_ratio', 'buy_ratio', 'funding_rate'
+]
+
+
+def fill_book_columns(df_1s):
+    """Fill empty seconds of the v2 book/flow columns (in place; after fill_second_bars)"""
+    df_1s[BOOK_STATE_COLUMNS] = df_1s[BOOK_STATE_COLUMNS].ffill().fillna(0)
+    df_1s[FLOW_COLUMNS] = df_1s[FLOW_COLUMNS].fillna(0)
+    return df_1s
+
+
+def add_book_features(df_1s):
+    """Add BOOK_FEATURE_COLUMNS (in place)"""
+    df_1s['spread_bps'] = df_1s['spread'] / df_1s['close_price'] * 10000
+    df_1s['book_imbalance_ma5'] = df_1s['book_imbalance'].rolling(5).mean()
+    depth = df_1s['bid_qty'] + df_1s['ask_qty']
+    df_1s['depth_ratio'] = (df_1s['bid_qty'] / depth.where(depth > 0)).fillna(0.5)
+    # Share of taker buys in the second (neutral when nothing traded)
+    df_1s['buy_ratio'] = (df_1s['buy_volume'] / df_1s['total_volume'].where(df_1s['total_volume'] > 0)).fillna(0.5)
+    return df_1s
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Training Job Stats
+Per-stage wall time, rows/sec and peak RSS of a training run, plus LightGBM
+iteration progress, kept as JSON in ai_training_models.training_stats and
+rewritten on the job's own connection after every stage.
+
+    {"stages": {"load": {"seconds": 12.1, "rows": 864000, "rows_per_sec": 71404,
+                         "peak_rss_mb": 512, "rss_start_mb": 140, "rss_end_mb": 390}, ...},
+     "iterations": {"done": 500, "total": 500, "seconds": 40.2, "per_sec": 12.4},
+     "total_seconds": 95.3, "peak_rss_mb": 910}
+"""
+
+import json
+import time
+from contextlib import contextmanager
+
+from utils.memory import memory_stage
+
+
+def ensure_stats_column(conn):
+    """Add ai_training_models.training_stats to older databases (also server/config/database.js)"""
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(ai_training_models)")}
+    if 'training_stats' not in existing:
+        conn.execute("ALTER TABLE ai_training_models ADD COLUMN training_stats TEXT")
+        conn.commit()
+
+
+class TrainingStats:
+    """Stage/iteration stats of one training job, saved to its ai_training_models row"""
+
+    def __init__(self, conn, model_id, log=None):
+        self.conn = conn
+        self.model_id = model_id
+        self.log = log
+        self.start = time.time()
+        self.data = {'stages': {}}
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Time one stage; set stage['rows'] inside the block for rows/sec:
+            with stats.stage("load") as stage:
+                df = ...
+                stage['rows'] = len(df)
+        """
+        with memory_stage(name, self.log, self.data['stages']) as stage:
+            yield stage
+        if stage.get('rows') is not None and stage['seconds'] > 0:
+            stage['rows_per_sec'] = stage['rows'] / stage['seconds']
+        self.save()
+
+    def lightgbm_callback(self, rounds, on_progress=None):
+        """
+        lgb callback recording iteration progress about every 5% of rounds
+        on_progress(done, rounds) is called at the same points (e.g. to move the progress bar)
+        """
+        step = max(1, rounds // 20)
+        start = time.time()
+
+        def callback(env):
+            # Continued models start at the parent's tree count
+            done = env.iteration - env.begin_iteration + 1
+            if done % step and done != rounds:
+                return
+            seconds = time.time() - start
+            self.data['iterations'] = {'done': done, 'total': rounds, 'seconds': seconds,
+                                       'per_sec': done / seconds if seconds > 0 else None}
+            if on_progress:
+                on_progress(done, rounds)
+            self.save()
+
+        return callback
+
+    def save(self):
+        stages = self.data['stages'].values()
+        peaks = [stage['peak_rss_mb'] for stage in stages if stage.get('peak_rss_mb') is not None]
+        self.data['total_seconds'] = time.time() - self.start
+        self.data['peak_rss_mb'] = max(peaks) if peaks else None
+        try:
+            self.conn.execute("UPDATE ai_training_models SET training_stats = ? WHERE id = ?",
+                              (json.dumps(self.data), self.model_id))
+            self.conn.commit()
+        except Exception as e:
+            if self.log:
+                self.log("ERROR", f"Failed to save training stats: {e}")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Training Labels
+Fill/profit target on 1-second bars: a limit buy at the close is filled if
+a low within fill_window seconds reaches it, and profitable if a high within
+profit_window seconds exceeds close * (1 + profit_target_pct).
+
+Forward min/max for any number of windows are computed in one sweep over
+doubling (sparse table) levels: level k holds the min/max of 2^k bars, and
+any window w is the min/max of two overlapping level-floor(log2 w) blocks.
+A whole grid of (target, fill, profit) labels therefore costs
+log2(max window) passes plus one pass per distinct window and per column.
+"""
+
+import itertools
+
+import numpy as np
+
+LABEL_COLUMNS = ['future_min_low', 'future_max_high', 'target']
+
+
+def label_horizon(fill_window, profit_window):
+    """Rows after a bar that its label depends on"""
+    return max(fill_window, profit_window)
+
+
+def _forward_extrema(values, windows, reduce):
+    """
+    reduce() of values[i+1 : i+1+w] for every row i and every window w
+    Returns: {window: float64 array}; NaN where the window runs past the end
+             (or contains a NaN), like rolling(FixedForwardWindowIndexer).shift(-1)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+
+    by_level = {}
+    for window in set(int(w) for w in windows):
+        if window < 1:
+            raise ValueError(f"Window must be >= 1 (got {window})")
+        by_level.setdefault(window.bit_length() - 1, []).append(window)
+    if not by_level:
+        return {}
+
+    results = {}
+    table, span, level = values, 1, 0
+    max_level = max(by_level)
+    while True:
+        # table[j] = reduce(values[j : j + span]), span = 2^level
+        for window in by_level.get(level, ()):
+            out = np.full(n, np.nan)
+            count = n - window
+            if count > 0:
+                offset = 1 + window - span
+                out[:count] = reduce(table[1:1 + count], table[offset:offset + count])
+            results[window] = out
+        if level == max_level or len(table) <= span:
+            break
+        table = reduce(table[:-span], table[span:])
+        span *= 2
+        level += 1
+
+    # Windows longer than the data
+    for window in itertools.chain.from_iterable(by_level.values()):
+        results.setdefault(window, np.full(n, np.nan))
+    return results
+
+
+def forward_min(values, windows):
+    """Min of the next w values for each w in windows: {w: array}"""
+    return _forward_extrema(values, windows, np.minimum)
+
+
+def forward_max(values, windows):
+    """Max of the next w values for each w in windows: {w: array}"""
+    return _forward_extrema(values, windows, np.maximum)
+
+
+def add_labels(df_1s, profit_target_pct, fill_window, profit_window):
+    """Add LABEL_COLUMNS (in place); the last label_horizon() rows have no complete window (NaN)"""
+    close = df_1s['close_price'].to_numpy(dtype=np.float64)
+
+    future_min_low = forward_min(df_1s['low_price'].to_numpy(), [fill_window])[fill_window]
+    future_max_high = forward_max(df_1s['high_price'].to_numpy(), [profit_window])[profit_window]
+    is_filled = future_min_low <= close
+    is_profit = future_max_high > close * (1 + profit_target_pct)
+
+    df_1s['future_min_low'] = future_min_low
+    df_1s['future_max_high'] = future_max_high
+    df_1s['target'] = (is_filled & is_profit).astype(int)
+    return df_1s
+
+
+def label_grid(profit_targets, fill_windows, profit_windows):
+    """All (profit_target_pct, fill_window, profit_window) combinations"""
+    return [(float(pct), int(fill), int(profit))
+            for pct, fill, profit in itertools.product(profit_targets, fill_windows, profit_windows)]
+
+
+def label_matrix(df_1s, grid):
+    """
+    Targets for a whole parameter grid in one sweep
+    Args:
+        df_1s: gap-filled 1-second bars (close_price, low_price, high_price)
+        grid: list of (profit_target_pct, fill_window, profit_window), e.g. label_grid()
+    Returns: int8 array (rows, len(grid)) with 1 = filled and profitable, 0 = not,
+             -1 = window incomplete (the rows add_labels leaves NaN)
+    """
+    close = df_1s['close_price'].to_numpy(dtype=np.float64)
+    future_min_low = forward_min(df_1s['low_price'].to_numpy(), [fill for _, fill, _ in grid])
+    future_max_high = forward_max(df_1s['high_price'].to_numpy(), [profit for _, _, profit in grid])
+
+    target_prices = {pct: close * (1 + pct) for pct, _, _ in grid}
+    filled = {fill: values <= close for fill, values in future_min_low.items()}
+    fill_complete = {fill: ~np.isnan(values) for fill, values in future_min_low.items()}
+    profit_complete = {profit: ~np.isnan(values) for profit, values in future_max_high.items()}
+
+    matrix = np.empty((len(close), len(grid)), dtype=np.int8)
+    for column, (pct, fill, profit) in enumerate(grid):
+        target = filled[fill] & (future_max_high[profit] > target_prices[pct])
+        matrix[:, column] = np.where(fill_complete[fill] & profit_complete[profit], target, -1)
+    return matrix
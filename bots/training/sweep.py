@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Hyperparameter Sweep
+Runs LightGBM trials for a parameter grid or random search space across a
+process pool. The training split is written once as a LightGBM binary
+Dataset and the test split as .npy files (memory-mapped by the workers), so
+features are built once per sweep, not once per trial.
+
+Sweep spec (the 'sweep' key of ai_training_models.parameters):
+
+    {"grid": {"learning_rate": [0.01, 0.05], "num_leaves": [31, 63]}}
+    {"random": {"learning_rate": {"min": 0.005, "max": 0.1, "log": true},
+                "num_leaves": {"min": 15, "max": 127, "int": true},
+                "max_depth": [5, 7, 9]},
+     "n_trials": 20, "seed": 42}
+
+Optional: "workers" (default: all cores), "min_predictions" (trials with
+fewer positive test predictions rank last, default 10).
+Per-trial progress and precision are written to ai_training_trials.
+"""
+
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+import lightgbm as lgb
+from sklearn.metrics import precision_score
+
+# Parameters a sweep may vary (all others come from the model's parameters)
+SWEEP_KEYS = [
+    'learning_rate', 'n_estimators', 'max_depth', 'num_leaves', 'min_child_samples',
+    'subsample', 'colsample_bytree', 'reg_alpha', 'reg_lambda', 'confidence_threshold'
+]
+
+TRIAL_DEFAULTS = {
+    'learning_rate': 0.01,
+    'n_estimators': 500,
+    'max_depth': 7,
+    'num_leaves': 31,
+    'confidence_threshold': 0.60,
+}
+
+TRIALS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS ai_training_trials (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        model_id INTEGER NOT NULL,
+        trial INTEGER NOT NULL,
+        parameters TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        progress INTEGER DEFAULT 0,
+        precision REAL,
+        predicted_positives INTEGER,
+        duration_sec REAL,
+        error TEXT,
+        started_at TEXT,
+        completed_at TEXT,
+        UNIQUE(model_id, trial)
+    )
+"""
+
+
+def ensure_trials_table(conn):
+    """Same schema as server/config/database.js"""
+    conn.execute(TRIALS_TABLE_SQL)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_ai_trials_model_id ON ai_training_trials(model_id)")
+    conn.commit()
+
+
+# =========================
+# Search space
+# =========================
+def _sample(spec, rng):
+    if isinstance(spec, list):
+        return rng.choice(spec)
+    if isinstance(spec, dict):
+        low, high = spec['min'], spec['max']
+        if spec.get('int'):
+            return rng.randint(int(low), int(high))
+        if spec.get('log'):
+            return float(np.exp(rng.uniform(np.log(low), np.log(high))))
+        return rng.uniform(low, high)
+    return spec
+
+
+def expand_sweep(sweep, params):
+    """
+    Trial parameter sets for a sweep spec
+    Returns: list of dicts (SWEEP_KEYS values; unswept keys from params/defaults)
+    """
+    space = sweep.get('grid') or sweep.get('random')
+    if not space:
+        raise ValueError("Sweep needs a 'grid' or 'random' search space")
+    unknown = sorted(set(space) - set(SWEEP_KEYS))
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {unknown} (allowed: {SWEEP_KEYS})")
+
+    base = {key: params.get(key, TRIAL_DEFAULTS.get(key)) for key in SWEEP_KEYS}
+    base = {key: value for key, value in base.items() if value is not None}
+
+    if 'grid' in sweep:
+        keys = list(space)
+        values = [space[key] if isinstance(space[key], list) else [space[key]] for key in keys]
+        trials = [dict(base, **dict(zip(keys, combo))) for combo in itertools.product(*values)]
+    else:
+        rng = random.Random(sweep.get('seed', 42))
+        trials = [dict(base, **{key: _sample(spec, rng) for key, spec in space.items()})
+                  for _ in range(int(sweep.get('n_trials', 20)))]
+
+    if not trials:
+        raise ValueError("Sweep produced no trials")
+    return trials
+
+
+def booster_params(trial, scale_pos_weight, num_threads):
+    """lgb.train parameters equivalent to train_model_v2's LGBMClassifier"""
+    params = {
+        'objective': 'binary',
+        'learning_rate': trial['learning_rate'],
+        'num_leaves': int(trial['num_leaves']),
+        'max_depth': int(trial['max_depth']),
+        'scale_pos_weight': scale_pos_weight,
+        'seed': 42,
+        'num_threads': num_threads,
+        'verbose': -1,
+    }
+    for key in ('min_child_samples', 'subsample', 'colsample_bytree', 'reg_alpha', 'reg_lambda'):
+        if key in trial:
+            params[key] = trial[key]
+    if params.get('subsample', 1.0) < 1.0:
+        # Bagging only takes effect with a frequency (LGBMClassifier: subsample_freq)
+        params['subsample_freq'] = 1
+    return params
+
+
+# =========================
+# Worker
+# =========================
+def _connect(db_path):
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA busy_timeout=30000")
+    return conn
+
+
+def _update_trial(conn, model_id, trial, **fields):
+    assignments = ", ".join(f"{key} = ?" for key in fields)
+    conn.execute(f"UPDATE ai_training_trials SET {assignments} WHERE model_id = ? AND trial = ?",
+                 (*fields.values(), model_id, trial))
+    conn.commit()
+
+
+def _run_trial(task):
+    """Train and evaluate one trial (runs in a pool process)"""
+    model_id, trial, params = task['model_id'], task['trial'], task['params']
+    work_dir = task['work_dir']
+    conn = _connect(task['db_path'])
+    start = time.time()
+    try:
+        _update_trial(conn, model_id, trial, status='running', started_at=datetime.now().isoformat())
+
+        rounds = int(params['n_estimators'])
+        step = max(1, rounds // 20)
+
+        def report(env):
+            iteration = env.iteration + 1
+            if iteration % step == 0 and iteration < rounds:
+                _update_trial(conn, model_id, trial, progress=int(iteration * 100 / rounds))
+
+        train_set = lgb.Dataset(os.path.join(work_dir, 'train.bin'))
+        booster = lgb.train(booster_params(params, task['scale_pos_weight'], task['num_threads']),
+                            train_set, num_boost_round=rounds, callbacks=[report])
+
+        X_test = np.load(os.path.join(work_dir, 'X_test.npy'), mmap_mode='r')
+        y_test = np.load(os.path.join(work_dir, 'y_test.npy'), mmap_mode='r')
+        preds = (booster.predict(X_test) >= params['confidence_threshold']).astype(int)
+        precision = float(precision_score(y_test, preds, zero_division=0))
+        predicted = int(preds.sum())
+
+        model_path = os.path.join(work_dir, f"trial_{trial}.txt")
+        booster.save_model(model_path)
+
+        duration = time.time() - start
+        _update_trial(conn, model_id, trial, status='completed', progress=100, precision=precision,
+                      predicted_positives=predicted, duration_sec=duration,
+                      completed_at=datetime.now().isoformat())
+        return {'trial': trial, 'params': params, 'precision': precision, 'predicted_positives': predicted,
+                'duration': duration, 'model_path': model_path, 'error': None}
+    except Exception as e:
+        _update_trial(conn, model_id, trial, status='failed', error=str(e),
+                      duration_sec=time.time() - start, completed_at=datetime.now().isoformat())
+        return {'trial': trial, 'params': params, 'precision': None, 'error': str(e)}
+    finally:
+        conn.close()
+
+
+# =========================
+# Runner
+# =========================
+def _rank(result, min_predictions):
+    if result['error']:
+        return (0, 0.0)
+    return (1 if result['predicted_positives'] >= min_predictions else 0, result['precision'])
+
+
+def run_sweep(conn, db_path, model_id, sweep, params, split, model_path, workers=None,
+              on_trial=None, log=print):
+    """
+    Run all trials of a sweep and save the best model to model_path
+    Args:
+        split: (X_train, X_test, y_train, y_test, scale_pos_weight), e.g. train_model_v2.split_dataset
+        on_trial: callback(result, completed, total) after each finished trial
+    Returns: (best result dict, all results sorted by trial)
+    """
+    X_train, X_test, y_train, y_test, scale_pos_weight = split
+    trials = expand_sweep(sweep, params)
+    cpus = os.cpu_count() or 1
+    workers = max(1, min(int(workers or sweep.get('workers') or cpus), len(trials)))
+    num_threads = max(1, cpus // workers)
+    min_predictions = int(sweep.get('min_predictions', 10))
+
+    ensure_trials_table(conn)
+    conn.execute("DELETE FROM ai_training_trials WHERE model_id = ?", (model_id,))
+    conn.executemany(
+        "INSERT INTO ai_training_trials (model_id, trial, parameters, status) VALUES (?, ?, ?, 'pending')",
+        [(model_id, i, json.dumps(trial)) for i, trial in enumerate(trials)]
+    )
+    conn.commit()
+
+    work_dir = tempfile.mkdtemp(prefix=f"sweep_{model_id}_")
+    try:
+        # Shared inputs: binned training Dataset + memory-mapped test split
+        # (feature_pre_filter off so trials may vary min_child_samples)
+        lgb.Dataset(X_train, label=y_train, params={'feature_pre_filter': False, 'verbose': -1}) \
+            .save_binary(os.path.join(work_dir, 'train.bin'))
+        np.save(os.path.join(work_dir, 'X_test.npy'), np.ascontiguousarray(X_test, dtype=np.float64))
+        np.save(os.path.join(work_dir, 'y_test.npy'), np.asarray(y_test, dtype=np.int8))
+
+        log("INFO", f"Sweep: {len(trials)} trials on {workers} workers x {num_threads} threads")
+        tasks = [{'model_id': model_id, 'trial': i, 'params': trial, 'db_path': db_path,
+                  'work_dir': work_dir, 'scale_pos_weight': scale_pos_weight, 'num_threads': num_threads}
+                 for i, trial in enumerate(trials)]
+
+        results = []
+        # spawn: forking after LightGBM/OpenMP initialised threads can deadlock
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = [pool.submit(_run_trial, task) for task in tasks]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                if result['error']:
+                    log("ERROR", f"Trial {result['trial']} failed: {result['error']}")
+                else:
+                    log("INFO", f"Trial {result['trial']}: precision {result['precision']*100:.2f}% "
+                        f"({result['predicted_positives']:,} signals, {result['duration']:.1f}s) {result['params']}")
+                if on_trial:
+                    on_trial(result, len(results), len(trials))
+
+        results.sort(key=lambda r: r['trial'])
+        best = max(results, key=lambda r: _rank(r, min_predictions))
+        if best['error']:
+            raise RuntimeError("All sweep trials failed")
+
+        os.makedirs(os.path.dirname(os.path.abspath(model_path)), exist_ok=True)
+        shutil.copyfile(best['model_path'], model_path)
+        return best, results
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+V2 Bar Source
+1-second training bars read directly from crypto_trades_v2 (written per
+second by collect_price_v2), instead of resampling raw crypto_trades ticks.
+The collector only writes seconds that had trades; the missing seconds are
+added as empty bars, so the output has the same shape as
+training.resampler.resample_trades plus the order-book/flow columns.
+"""
+
+import numpy as np
+import pandas as pd
+
+from utils.trade_archive import ARCHIVE_ROOT, iter_bar_history
+from utils.trade_queries import DEFAULT_CHUNK_SIZE
+from .features import BOOK_STATE_COLUMNS, FLOW_COLUMNS
+from .resampler import SECOND_BAR_COLUMNS
+
+V2_SOURCE_COLUMNS = [
+    'timestamp_ms', 'high', 'low', 'close', 'total_volume', 'net_flow', 'trade_count'
+] + FLOW_COLUMNS + BOOK_STATE_COLUMNS
+
+V2_BAR_COLUMNS = SECOND_BAR_COLUMNS + FLOW_COLUMNS + BOOK_STATE_COLUMNS
+
+
+def load_v2_bars(conn, symbol, start_second=None, chunk_size=DEFAULT_CHUNK_SIZE, root=ARCHIVE_ROOT):
+    """
+    Contiguous 1-second bars from the archive + crypto_trades_v2
+    Args:
+        start_second: first bar to return (unix seconds); default: the first stored bar
+    Returns: (DataFrame indexed by 'datetime' with V2_BAR_COLUMNS; empty seconds have
+              NaN prices/book state and zero volume/count, number of stored bars read)
+    """
+    start_ms = start_second * 1000 if start_second is not None else None
+    chunks = list(iter_bar_history(conn, symbol, start_ms=start_ms, columns=V2_SOURCE_COLUMNS,
+                                   chunk_size=chunk_size, root=root))
+    if not chunks:
+        return pd.DataFrame(columns=V2_BAR_COLUMNS, index=pd.DatetimeIndex([], name='datetime')), 0
+
+    df = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+    rows = len(df)
+    del chunks
+
+    seconds = df['timestamp_ms'].to_numpy(dtype=np.int64) // 1000
+    bars = df.drop(columns='timestamp_ms').rename(columns={
+        'close': 'close_price', 'low': 'low_price', 'high': 'high_price'})
+    bars.index = seconds
+    # Two collectors on one symbol write the same second twice: rows come ordered by
+    # (timestamp_ms, id) from SQLite and the archive alike, so 'last' is the highest id
+    bars = bars[~bars.index.duplicated(keep='last')]
+
+    first = seconds[0] if start_second is None else start_second
+    bars = bars.reindex(np.arange(first, seconds[-1] + 1))
+    bars[['total_volume', 'net_flow']] = bars[['total_volume', 'net_flow']].fillna(0.0)
+    bars['trade_count'] = bars['trade_count'].fillna(0).astype(np.int64)
+    bars[FLOW_COLUMNS] = bars[FLOW_COLUMNS].fillna(0.0)
+
+    # Same index dtype as the trade resampler
+    bars.index = pd.to_datetime(bars.index.to_numpy() * 1000, unit='ms').rename('datetime')
+    return bars[V2_BAR_COLUMNS], rows
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Walk-Forward Validation
+Expanding-window folds over the training frame: every complete period
+(fold_hours, aligned to UTC) after min_train_hours of history is a test
+window, and the model is trained on all bars before it minus a purge gap of
+label_horizon() rows, so no training label looks into the test window.
+
+Folds run in a process pool over one memory-mapped copy of the features.
+Fold boundaries are anchored to wall-clock periods, so when new data
+completes another period only that fold is new; results of earlier folds
+are cached per symbol and model configuration and reused.
+
+Config (the 'walk_forward' key of ai_training_models.parameters, or defaults):
+    {"fold_hours": 24, "min_train_hours": 72, "max_folds": 10, "workers": 4, "fee_pct": 0.0}
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import lightgbm as lgb
+from sklearn.metrics import precision_score
+
+from .dataset_cache import CACHE_ROOT, EPOCH
+from .features import FEATURE_VERSION
+from .labels import label_horizon
+from .sweep import TRIAL_DEFAULTS, booster_params
+
+WALK_FORWARD_DEFAULTS = {
+    'fold_hours': 24,
+    'min_train_hours': 72,
+    'max_folds': 10,
+    'workers': None,
+    'fee_pct': 0.0,
+}
+
+FOLDS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS ai_training_folds (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        model_id INTEGER NOT NULL,
+        fold INTEGER NOT NULL,
+        train_start TEXT,
+        train_end TEXT,
+        test_start TEXT,
+        test_end TEXT,
+        train_rows INTEGER,
+        test_rows INTEGER,
+        precision REAL,
+        signals INTEGER,
+        trades INTEGER,
+        pnl_pct REAL,
+        duration_sec REAL,
+        cached INTEGER DEFAULT 0,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(model_id, fold)
+    )
+"""
+
+
+def ensure_folds_table(conn):
+    """Same schema as server/config/database.js"""
+    conn.execute(FOLDS_TABLE_SQL)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_ai_folds_model_id ON ai_training_folds(model_id)")
+    conn.commit()
+
+
+def walk_forward_config(params):
+    config = dict(WALK_FORWARD_DEFAULTS)
+    if isinstance(params.get('walk_forward'), dict):
+        config.update(params['walk_forward'])
+    return config
+
+
+def make_folds(seconds, fold_seconds, min_train_seconds, purge, max_folds=None):
+    """
+    Expanding-window folds over sorted bar seconds
+    Returns: list of dicts with row ranges train [0, train_end), test [test_start, test_end)
+             and the period start (test_second) that identifies the fold
+    """
+    if not len(seconds):
+        return []
+    first, last = int(seconds[0]), int(seconds[-1])
+
+    # First period starting after the minimum history, aligned to fold_seconds
+    period = -(-(first + min_train_seconds) // fold_seconds) * fold_seconds
+    folds = []
+    while period + fold_seconds <= last + 1:
+        test_start = int(np.searchsorted(seconds, period, side='left'))
+        test_end = int(np.searchsorted(seconds, period + fold_seconds, side='left'))
+        train_end = test_start - purge
+        if train_end > 0 and test_end > test_start:
+            folds.append({'test_second': period, 'train_end': train_end,
+                          'test_start': test_start, 'test_end': test_end})
+        period += fold_seconds
+
+    if max_folds:
+        folds = folds[-int(max_folds):]
+    return folds
+
+
+def trade_returns(df_1s, profit_target_pct, profit_window):
+    """
+    Simplified outcome of a limit buy at the close for every bar:
+    not filled -> no trade; filled and target reached -> +profit_target_pct;
+    filled, target missed -> exit at the close profit_window seconds later
+    Returns: (filled bool array, return array as a fraction)
+    """
+    close = df_1s['close_price']
+    exit_close = close.shift(-profit_window).fillna(close.iloc[-1]).to_numpy()
+    close = close.to_numpy()
+    filled = (df_1s['future_min_low'].to_numpy() <= close)
+    win = df_1s['target'].to_numpy() == 1
+    returns = np.where(win, profit_target_pct, exit_close / close - 1.0)
+    return filled, np.where(filled, returns, 0.0)
+
+
+def _config_key(params, config, columns):
+    model = {key: params.get(key, TRIAL_DEFAULTS.get(key)) for key in TRIAL_DEFAULTS}
+    key = {
+        'feature_version': FEATURE_VERSION,
+        'columns': list(columns),
+        'labels': [params.get('profit_target_pct', 0.0003), params.get('fill_window', 20),
+                   params.get('profit_window', 300)],
+        'model': model,
+        'fold_hours': config['fold_hours'],
+        'fee_pct': config['fee_pct'],
+    }
+    return hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _fold_key(fold, first_second):
+    # Same test period, same training history start and length -> same result
+    return f"{fold['test_second']}:{first_second}:{fold['train_end']}:{fold['test_end'] - fold['test_start']}"
+
+
+def _run_fold(task):
+    """Train on [0, train_end), evaluate on [test_start, test_end) (runs in a pool process)"""
+    start = time.time()
+    work_dir, fold = task['work_dir'], task['fold']
+    X = np.load(os.path.join(work_dir, 'X.npy'), mmap_mode='r')
+    y = np.load(os.path.join(work_dir, 'y.npy'), mmap_mode='r')
+    filled = np.load(os.path.join(work_dir, 'filled.npy'), mmap_mode='r')
+    returns = np.load(os.path.join(work_dir, 'returns.npy'), mmap_mode='r')
+
+    y_train = y[:fold['train_end']]
+    pos = int(y_train.sum())
+    neg = len(y_train) - pos
+    scale_pos_weight = neg / pos if pos > 0 else 1.0
+
+    params = task['params']
+    train_set = lgb.Dataset(X[:fold['train_end']], label=y_train, params={'verbose': -1})
+    booster = lgb.train(booster_params(params, scale_pos_weight, task['num_threads']), train_set,
+                        num_boost_round=int(params['n_estimators']))
+
+    test = slice(fold['test_start'], fold['test_end'])
+    signals = booster.predict(X[test]) >= params['confidence_threshold']
+    trades = signals & (filled[test] != 0)
+    n_trades = int(trades.sum())
+    pnl_pct = float(returns[test][signals].sum() * 100 - n_trades * task['fee_pct'])
+
+    return dict(fold, **{
+        'precision': float(precision_score(y[test], signals.astype(int), zero_division=0)),
+        'signals': int(signals.sum()),
+        'trades': n_trades,
+        'pnl_pct': pnl_pct,
+        'duration': time.time() - start,
+    })
+
+
+def _load_fold_cache(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_fold_cache(path, cache):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, path)
+
+
+def run_walk_forward(conn, model_id, symbol, df_1s, params, feature_cols, cache_root=CACHE_ROOT,
+                     workers=None, log=print):
+    """
+    Walk-forward validation of a training frame (after dropna)
+    Per-fold results are written to ai_training_folds for model_id.
+    Returns: (list of fold results, summary dict)
+    """
+    config = walk_forward_config(params)
+    fill_window = params.get('fill_window', 20)
+    profit_window = params.get('profit_window', 300)
+    profit_target_pct = params.get('profit_target_pct', 0.0003)
+    model_params = {key: params.get(key, default) for key, default in TRIAL_DEFAULTS.items()}
+
+    seconds = ((df_1s.index - EPOCH) // np.timedelta64(1, 's')).to_numpy()
+    folds = make_folds(seconds, int(config['fold_hours'] * 3600), int(config['min_train_hours'] * 3600),
+                       label_horizon(fill_window, profit_window), config['max_folds'])
+    if not folds:
+        raise ValueError(f"Not enough data for walk-forward validation "
+                         f"({config['min_train_hours']}h history + one {config['fold_hours']}h fold)")
+
+    cache_path = os.path.join(cache_root, symbol.upper(), "walk_forward.json")
+    config_key = _config_key(params, config, feature_cols)
+    cache = _load_fold_cache(cache_path)
+    cached_folds = cache.get(config_key, {})
+
+    results, pending = [], []
+    for fold in folds:
+        hit = cached_folds.get(_fold_key(fold, int(seconds[0])))
+        if hit:
+            results.append(dict(fold, **hit, cached=True))
+        else:
+            pending.append(fold)
+    log("INFO", f"Walk-forward: {len(folds)} folds ({len(folds) - len(pending)} cached, {len(pending)} to train)")
+
+    if pending:
+        cpus = os.cpu_count() or 1
+        workers = max(1, min(int(workers or config['workers'] or cpus), len(pending)))
+        work_dir = tempfile.mkdtemp(prefix=f"walk_forward_{model_id}_")
+        try:
+            filled, returns = trade_returns(df_1s, profit_target_pct, profit_window)
+            np.save(os.path.join(work_dir, 'X.npy'), df_1s[feature_cols].to_numpy(dtype=np.float64))
+            np.save(os.path.join(work_dir, 'y.npy'), df_1s['target'].to_numpy(dtype=np.int8))
+            np.save(os.path.join(work_dir, 'filled.npy'), filled.astype(np.int8))
+            np.save(os.path.join(work_dir, 'returns.npy'), returns)
+
+            tasks = [{'work_dir': work_dir, 'fold': fold, 'params': model_params, 'fee_pct': config['fee_pct'],
+                      'num_threads': max(1, cpus // workers)} for fold in pending]
+            # spawn: forking after LightGBM/OpenMP initialised threads can deadlock
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                for future in as_completed([pool.submit(_run_fold, task) for task in tasks]):
+                    result = future.result()
+                    log("INFO", f"Fold @{result['test_second']}: precision {result['precision']*100:.2f}%, "
+                        f"{result['trades']:,} trades, PnL {result['pnl_pct']:+.2f}% ({result['duration']:.1f}s)")
+                    cached_folds[_fold_key(result, int(seconds[0]))] = {
+                        key: result[key] for key in ('precision', 'signals', 'trades', 'pnl_pct', 'duration')}
+                    results.append(dict(result, cached=False))
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        cache[config_key] = cached_folds
+        _save_fold_cache(cache_path, cache)
+
+    results.sort(key=lambda r: r['test_second'])
+    index = df_1s.index
+    ensure_folds_table(conn)
+    conn.execute("DELETE FROM ai_training_folds WHERE model_id = ?", (model_id,))
+    conn.executemany("""
+        INSERT INTO ai_training_folds
+        (model_id, fold, train_start, train_end, test_start, test_end, train_rows, test_rows,
+         precision, signals, trades, pnl_pct, duration_sec, cached)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, [(model_id, i, str(index[0]), str(index[r['train_end'] - 1]), str(index[r['test_start']]),
+           str(index[r['test_end'] - 1]), r['train_end'], r['test_end'] - r['test_start'],
+           r['precision'], r['signals'], r['trades'], r['pnl_pct'], r['duration'], int(r['cached']))
+          for i, r in enumerate(results)])
+    conn.commit()
+
+    signals = sum(r['signals'] for r in results)
+    summary = {
+        'folds': len(results),
+        # Signal-weighted: all true positives / all signals
+        'precision': sum(r['precision'] * r['signals'] for r in results) / signals if signals else 0.0,
+        'signals': signals,
+        'trades': sum(r['trades'] for r in results),
+        'pnl_pct': sum(r['pnl_pct'] for r in results),
+        'profitable_folds': sum(1 for r in results if r['pnl_pct'] > 0),
+    }
+    log("INFO", f"Walk-forward: precision {summary['precision']*100:.2f}% over {summary['folds']} folds, "
+        f"{summary['trades']:,} trades, PnL {summary['pnl_pct']:+.2f}% "
+        f"({summary['profitable_folds']}/{summary['folds']} folds profitable)")
+    return results, summary
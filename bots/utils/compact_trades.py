@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compact crypto_trades storage
+Raw aggTrades are kept in crypto_trades_compact: a symbol dictionary id,
+integer-scaled price/quantity and a single maker bit. After migration
+(migrate_crypto_trades.py) crypto_trades becomes a view with the old
+columns, so existing readers and old-style INSERTs keep working.
+"""
+
+# Price/quantity are stored as round(value * scale); 8 decimals covers every Binance pair
+DEFAULT_PRICE_SCALE = 10 ** 8
+DEFAULT_QTY_SCALE = 10 ** 8
+
+COMPACT_TABLE = "crypto_trades_compact"
+LEGACY_TABLE = "crypto_trades_legacy"
+
+INSERT_COMPACT_SQL = """
+    INSERT INTO crypto_trades_compact
+    (bot_id, symbol_id, timestamp_ms, price, quantity, is_maker)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+# Same columns as the original crypto_trades table; readable_time is local
+# time like the collector used to write it (millisecond precision)
+VIEW_SQL = f"""
+    CREATE VIEW IF NOT EXISTS crypto_trades AS
+    SELECT
+        t.id,
+        t.bot_id,
+        s.symbol,
+        t.timestamp_ms,
+        strftime('%Y-%m-%d %H:%M:%f', t.timestamp_ms / 1000.0, 'unixepoch', 'localtime') AS readable_time,
+        t.price * 1.0 / s.price_scale AS price,
+        t.quantity * 1.0 / s.qty_scale AS quantity,
+        CASE t.is_maker WHEN 1 THEN 'SELL' ELSE 'BUY' END AS side,
+        t.is_maker,
+        datetime(t.timestamp_ms / 1000, 'unixepoch') AS created_at
+    FROM {COMPACT_TABLE} t
+    JOIN trade_symbols s ON s.id = t.symbol_id
+"""
+
+# Old-style writers (INSERT/DELETE on crypto_trades) go through these
+TRIGGERS_SQL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS crypto_trades_insert
+    INSTEAD OF INSERT ON crypto_trades
+    BEGIN
+        INSERT OR IGNORE INTO trade_symbols (symbol) VALUES (NEW.symbol);
+        INSERT INTO {COMPACT_TABLE} (id, bot_id, symbol_id, timestamp_ms, price, quantity, is_maker)
+        SELECT NEW.id, NEW.bot_id, s.id, NEW.timestamp_ms,
+               CAST(ROUND(NEW.price * s.price_scale) AS INTEGER),
+               CAST(ROUND(NEW.quantity * s.qty_scale) AS INTEGER),
+               CASE WHEN NEW.is_maker THEN 1 ELSE 0 END
+        FROM trade_symbols s WHERE s.symbol = NEW.symbol;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS crypto_trades_delete
+    INSTEAD OF DELETE ON crypto_trades
+    BEGIN
+        DELETE FROM {COMPACT_TABLE} WHERE id = OLD.id;
+    END
+    """
+]
+
+
+def ensure_compact_schema(conn):
+    """Create the symbol dictionary and compact trades table (no-op if they exist)"""
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS trade_symbols (
+            id INTEGER PRIMARY KEY,
+            symbol TEXT NOT NULL UNIQUE,
+            price_scale INTEGER NOT NULL DEFAULT {DEFAULT_PRICE_SCALE},
+            qty_scale INTEGER NOT NULL DEFAULT {DEFAULT_QTY_SCALE}
+        )
+    """)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {COMPACT_TABLE} (
+            id INTEGER PRIMARY KEY,
+            bot_id INTEGER NOT NULL,
+            symbol_id INTEGER NOT NULL,
+            timestamp_ms INTEGER NOT NULL,
+            price INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            is_maker INTEGER NOT NULL,
+            FOREIGN KEY (bot_id) REFERENCES bots(id) ON DELETE CASCADE
+        )
+    """)
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_crypto_trades_compact_bot_id ON {COMPACT_TABLE}(bot_id)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_crypto_trades_compact_symbol_ts ON {COMPACT_TABLE}(symbol_id, timestamp_ms)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_crypto_trades_compact_timestamp ON {COMPACT_TABLE}(timestamp_ms)")
+
+
+def create_compat_view(conn):
+    """Expose crypto_trades_compact as crypto_trades (the old table must be gone/renamed)"""
+    conn.execute(VIEW_SQL)
+    for sql in TRIGGERS_SQL:
+        conn.execute(sql)
+
+
+def is_compact(conn):
+    """True once crypto_trades has been migrated to the compact view"""
+    row = conn.execute("SELECT type FROM sqlite_master WHERE name = 'crypto_trades'").fetchone()
+    return row is not None and row[0] == 'view'
+
+
+def get_symbol(conn, symbol):
+    """
+    Look up (or register) a symbol in the dictionary
+    Returns: (symbol_id, price_scale, qty_scale)
+    """
+    symbol = symbol.upper()
+    conn.execute("INSERT OR IGNORE INTO trade_symbols (symbol) VALUES (?)", (symbol,))
+    return conn.execute(
+        "SELECT id, price_scale, qty_scale FROM trade_symbols WHERE symbol = ?", (symbol,)
+    ).fetchone()
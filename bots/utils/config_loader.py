@@ -54,12 +54,13 @@ class ConfigLoader:
                     if not self.watcher_running:
                         break
 
+                    # load() replaces current_config, so compare with the previous one
+                    old_config = self.current_config
                     new_config = self.load()
 
                     # Check if config changed
-                    if new_config != self.current_config:
+                    if new_config != old_config:
                         print(f"[CONFIG] Config updated, reloading...")
-                        self.current_config = new_config
                         if self.update_callback:
                             self.update_callback(new_config)
 
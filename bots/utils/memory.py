@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Memory Usage
+Current and peak resident set size of this process, per stage.
+Linux: /proc/self/status (VmRSS/VmHWM); the peak is reset at each stage
+start via /proc/self/clear_refs so every stage reports its own peak.
+Elsewhere: resource.getrusage (lifetime peak only).
+"""
+
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+_STATUS_PATH = "/proc/self/status"
+_CLEAR_REFS_PATH = "/proc/self/clear_refs"
+
+
+def _read_status_kb(field):
+    try:
+        with open(_STATUS_PATH) as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def rss_mb():
+    """Current RSS in MB (None if unknown)"""
+    kb = _read_status_kb("VmRSS")
+    return kb / 1024 if kb is not None else None
+
+
+def peak_rss_mb():
+    """Peak RSS in MB since start or the last reset_peak_rss()"""
+    kb = _read_status_kb("VmHWM")
+    if kb is None and resource is not None:
+        # ru_maxrss is KB on Linux, bytes on macOS
+        kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if kb > 1 << 32:
+            kb //= 1024
+    return kb / 1024 if kb is not None else None
+
+
+def reset_peak_rss():
+    """Reset the peak to the current RSS; False where not supported"""
+    try:
+        with open(_CLEAR_REFS_PATH, "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+@contextmanager
+def memory_stage(name, log=None, stats=None):
+    """
+    Measure one stage:
+        with memory_stage("load", log, stats) as stage:
+            ...
+    stage/stats[name] gets rss_start_mb, rss_end_mb, peak_rss_mb, seconds
+    """
+    reset = reset_peak_rss()
+    stage = {'rss_start_mb': rss_mb()}
+    start = time.time()
+    try:
+        yield stage
+    finally:
+        stage['seconds'] = time.time() - start
+        stage['rss_end_mb'] = rss_mb()
+        stage['peak_rss_mb'] = peak_rss_mb()
+        if not reset:
+            stage['peak_is_lifetime'] = True
+        if stats is not None:
+            stats[name] = stage
+        if log and stage['peak_rss_mb'] is not None:
+            log("INFO", f"Memory [{name}]: peak {stage['peak_rss_mb']:,.0f} MB, "
+                f"RSS {stage['rss_start_mb'] or 0:,.0f} -> {stage['rss_end_mb'] or 0:,.0f} MB "
+                f"({stage['seconds']:.1f}s)")
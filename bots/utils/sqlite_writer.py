@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite Writer
+Background thread that owns the DB connection and inserts rows in group commits
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+
+def _default_log(level, message):
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    print(f"[{timestamp}] [{level}] {message}", flush=True)
+
+
+class SQLiteWriter:
+    """
+    Rows go into a bounded queue; the writer thread commits them in groups of
+    up to batch_size rows or every max_delay seconds, whichever comes first,
+    inside one explicit transaction. If the DB is locked the same group is
+    retried with backoff, so rows are only lost if the queue overflows.
+    """
+
+    STATS_LOG_INTERVAL = 60  # seconds
+    MAX_RETRY_DELAY = 5.0
+    MAX_ERROR_RETRIES = 5  # for errors other than "database is locked/busy"
+
+    def __init__(self, db_path, insert_sql, setup=None, batch_size=500, max_delay=1.0,
+                 max_queue_rows=100000, log=None, name="sqlite-writer"):
+        """
+        Args:
+            insert_sql: INSERT statement with ? placeholders, one row per tuple
+            setup: optional callable(conn) run after every (re)connect, e.g. CREATE TABLE
+        """
+        self.db_path = db_path
+        self.insert_sql = insert_sql
+        self.setup = setup
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.log = log or _default_log
+        self.name = name
+
+        self.queue = queue.Queue(maxsize=max_queue_rows)
+        self.thread = None
+        self.running = False
+        self.draining = False
+        self.conn = None
+        self.last_stats_log = time.time()
+        self.last_drop_log = 0.0
+
+        # Stats
+        self.stats = {
+            'queued': 0,
+            'written': 0,
+            'commits': 0,
+            'dropped': 0,
+            'failed': 0,
+            'retries': 0,
+            'last_commit_ms': 0.0,
+            'max_commit_ms': 0.0,
+        }
+
+    def start(self):
+        """Start the writer thread"""
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=30):
+        """Write everything still queued, then stop"""
+        if not self.running:
+            return
+        self.running = False
+        deadline = time.time() + timeout
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            # Writer stuck on a locked DB with a full queue: no room for the sentinel,
+            # so tell it directly to drain what is left and exit
+            self.draining = True
+        if self.thread:
+            self.thread.join(timeout=max(deadline - time.time(), 0))
+        self.log("INFO", f"SQLite writer stopped | {self._format_stats()}")
+
+    def submit(self, row):
+        """Queue one row (never blocks; drops and counts it if the queue is full)"""
+        try:
+            self.queue.put_nowait(row)
+            self.stats['queued'] += 1
+        except queue.Full:
+            self.stats['dropped'] += 1
+            now = time.time()
+            if now - self.last_drop_log >= 10:
+                self.last_drop_log = now
+                self.log("ERROR", f"SQLite writer queue full, dropping rows | {self._format_stats()}")
+
+    def get_backlog(self):
+        return self.queue.qsize()
+
+    def get_stats(self):
+        return {**self.stats, 'backlog': self.queue.qsize()}
+
+    def _connect(self):
+        # isolation_level=None: transactions are managed explicitly with BEGIN/COMMIT
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        if self.setup:
+            self.setup(conn)
+        return conn
+
+    def _close(self):
+        if self.conn:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+            self.conn = None
+
+    def _next_batch(self):
+        """Block for the first row, then gather more until the size or time bound"""
+        batch = []
+        deadline = time.time() + self.max_delay
+
+        while len(batch) < self.batch_size:
+            if self.draining:
+                # Shutting down: take whatever is left without waiting
+                timeout = 0
+            elif batch:
+                timeout = deadline - time.time()
+            else:
+                timeout = 0.5
+
+            try:
+                row = self.queue.get(timeout=timeout) if timeout > 0 else self.queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if row is None:
+                self.draining = True
+            else:
+                batch.append(row)
+
+        return batch
+
+    def _write(self, batch):
+        """Insert a batch in one transaction, retrying with backoff"""
+        delay = 0.1
+        errors = 0
+
+        while True:
+            try:
+                if self.conn is None:
+                    self.conn = self._connect()
+
+                start = time.time()
+                self.conn.execute("BEGIN IMMEDIATE")
+                self.conn.executemany(self.insert_sql, batch)
+                self.conn.execute("COMMIT")
+                commit_ms = (time.time() - start) * 1000
+
+                self.stats['written'] += len(batch)
+                self.stats['commits'] += 1
+                self.stats['last_commit_ms'] = commit_ms
+                self.stats['max_commit_ms'] = max(self.stats['max_commit_ms'], commit_ms)
+                return True
+
+            except sqlite3.Error as e:
+                if self.conn:
+                    try:
+                        self.conn.execute("ROLLBACK")
+                    except sqlite3.Error:
+                        pass
+
+                message = str(e).lower()
+                locked = 'locked' in message or 'busy' in message
+                if not locked:
+                    errors += 1
+                    # Reconnect in case the connection itself is broken
+                    self._close()
+                    if errors > self.MAX_ERROR_RETRIES:
+                        self.stats['failed'] += len(batch)
+                        self.log("ERROR", f"SQLite writer giving up on {len(batch)} rows: {e}")
+                        return False
+
+                self.stats['retries'] += 1
+                self.log("WARNING", f"SQLite write failed ({e}), retrying {len(batch)} rows in {delay:.1f}s "
+                         f"| Backlog: {self.queue.qsize()}")
+                time.sleep(delay)
+                delay = min(delay * 2, self.MAX_RETRY_DELAY)
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+
+            if batch:
+                self._write(batch)
+
+            now = time.time()
+            if now - self.last_stats_log >= self.STATS_LOG_INTERVAL:
+                self.last_stats_log = now
+                self.log("INFO", f"SQLite writer | {self._format_stats()}")
+
+            if self.draining and self.queue.empty():
+                break
+
+        self._close()
+
+    def _format_stats(self):
+        s = self.get_stats()
+        return (f"Written={s['written']:,} Commits={s['commits']:,} Backlog={s['backlog']:,} | "
+                f"Commit={s['last_commit_ms']:.1f}ms (max {s['max_commit_ms']:.1f}ms) | "
+                f"Retries={s['retries']} Dropped={s['dropped']} Failed={s['failed']}")
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Trade Archive
+Columnar (Parquet) archive tier for closed days of raw trades and 1s bars:
+
+    <root>/trades/<SYMBOL>/<YYYY-MM-DD>.parquet   (from crypto_trades)
+    <root>/bars/<SYMBOL>/<YYYY-MM-DD>.parquet     (from crypto_trades_v2)
+
+Days are UTC. Files are written by archive_trades.py; readers memory-map
+only the requested columns and days. Requires pyarrow (optional dependency).
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+from .compact_trades import COMPACT_TABLE, is_compact
+from .trade_queries import (BAR_COLUMNS, DEFAULT_CHUNK_SIZE, KEY_COLUMNS, TRADE_COLUMNS,
+                            iter_bar_chunks, iter_trade_chunks)
+
+ARCHIVE_ROOT = os.path.join(os.path.dirname(__file__), "..", "..", "server", "data", "archive")
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+DATASETS = {
+    # dataset -> (source table, columns)
+    'trades': ('crypto_trades', TRADE_COLUMNS),
+    'bars': ('crypto_trades_v2', BAR_COLUMNS),
+}
+
+
+def _require_pyarrow():
+    if pq is None:
+        raise ImportError("The 'pyarrow' package is required for the Parquet archive (pip install pyarrow)")
+
+
+def _check_dataset(dataset):
+    if dataset not in DATASETS:
+        raise ValueError(f"Unknown dataset: {dataset} (expected one of {sorted(DATASETS)})")
+
+
+def day_start_ms(day):
+    """UTC midnight of a 'YYYY-MM-DD' day, in ms"""
+    dt = datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+
+def day_of(timestamp_ms):
+    """'YYYY-MM-DD' (UTC) containing timestamp_ms"""
+    return datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+def days_between(start_ms, end_ms):
+    """UTC days overlapping [start_ms, end_ms)"""
+    days = []
+    day = datetime.strptime(day_of(start_ms), "%Y-%m-%d")
+    while True:
+        name = day.strftime("%Y-%m-%d")
+        if day_start_ms(name) >= end_ms:
+            break
+        days.append(name)
+        day += timedelta(days=1)
+    return days
+
+
+def day_path(dataset, symbol, day, root=ARCHIVE_ROOT):
+    return os.path.join(root, dataset, symbol.upper(), f"{day}.parquet")
+
+
+def list_days(dataset, symbol, root=ARCHIVE_ROOT):
+    """Archived days for a symbol, oldest first"""
+    _check_dataset(dataset)
+    folder = os.path.join(root, dataset, symbol.upper())
+    if not os.path.isdir(folder):
+        return []
+    return sorted(name[:-len(".parquet")] for name in os.listdir(folder) if name.endswith(".parquet"))
+
+
+def list_symbols(dataset, root=ARCHIVE_ROOT):
+    _check_dataset(dataset)
+    folder = os.path.join(root, dataset)
+    if not os.path.isdir(folder):
+        return []
+    return sorted(name for name in os.listdir(folder) if os.path.isdir(os.path.join(folder, name)))
+
+
+# =========================
+# Writing
+# =========================
+def export_day(conn, dataset, symbol, day, root=ARCHIVE_ROOT, chunk_size=200000):
+    """
+    Write one UTC day of a symbol from SQLite to its Parquet file
+    Rows already in an existing file for that day are kept (merged by id),
+    so re-running after a partial run or with --no-delete never duplicates.
+    The file is written to a temp name and renamed into place.
+    Returns: (rows read from SQLite, highest id read); (0, None) = nothing to archive
+    """
+    _require_pyarrow()
+    _check_dataset(dataset)
+    start_ms = day_start_ms(day)
+    end_ms = start_ms + DAY_MS
+
+    if dataset == 'trades':
+        chunks = iter_trade_chunks(conn, symbol, start_ms, end_ms, chunk_size, with_keys=True)
+    else:
+        chunks = iter_bar_chunks(conn, symbol, start_ms, end_ms, KEY_COLUMNS + BAR_COLUMNS, chunk_size)
+
+    chunks = list(chunks)
+    if not chunks:
+        return 0, None
+    df = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+    exported = len(df)
+    max_id = int(df['id'].max())
+
+    path = day_path(dataset, symbol, day, root)
+    if os.path.exists(path):
+        existing = pq.read_table(path).to_pandas()
+        df = pd.concat([existing, df], ignore_index=True).drop_duplicates('id', keep='last')
+    df = df.sort_values(['timestamp_ms', 'id'], kind='stable').reset_index(drop=True)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_path,
+                   compression='zstd', row_group_size=256 * 1024)
+    if pq.read_metadata(tmp_path).num_rows != len(df):
+        os.remove(tmp_path)
+        raise IOError(f"Archive verification failed for {path}")
+    os.replace(tmp_path, path)
+    return exported, max_id
+
+
+def delete_day(conn, dataset, symbol, day, max_id):
+    """
+    Delete an archived day from SQLite (rows with id <= max_id only, so rows
+    that arrived after export stay for the next run). Caller owns the transaction.
+    Returns: rows deleted
+    """
+    _check_dataset(dataset)
+    start_ms = day_start_ms(day)
+    end_ms = start_ms + DAY_MS
+    symbol = symbol.upper()
+
+    if dataset == 'trades' and is_compact(conn):
+        row = conn.execute("SELECT id FROM trade_symbols WHERE symbol = ?", (symbol,)).fetchone()
+        if row is None:
+            return 0
+        table, key, value = COMPACT_TABLE, 'symbol_id', row[0]
+    else:
+        table, key, value = DATASETS[dataset][0], 'symbol', symbol
+
+    return conn.execute(
+        f"DELETE FROM {table} WHERE {key} = ? AND timestamp_ms >= ? AND timestamp_ms < ? AND id <= ?",
+        (value, start_ms, end_ms, max_id)
+    ).rowcount
+
+
+# =========================
+# Reading
+# =========================
+def iter_archive(dataset, symbol, start_ms=None, end_ms=None, columns=None, root=ARCHIVE_ROOT):
+    """
+    Stream archived rows for a symbol in [start_ms, end_ms), one DataFrame per day
+    Only the requested columns are read; files are memory-mapped.
+    """
+    _check_dataset(dataset)
+    days = list_days(dataset, symbol, root)
+    if not days:
+        return
+    _require_pyarrow()
+
+    columns = list(columns or DATASETS[dataset][1])
+    read_columns = columns if 'timestamp_ms' in columns else ['timestamp_ms'] + columns
+
+    for day in days:
+        day_ms = day_start_ms(day)
+        if start_ms is not None and day_ms + DAY_MS <= start_ms:
+            continue
+        if end_ms is not None and day_ms >= end_ms:
+            break
+
+        table = pq.read_table(day_path(dataset, symbol, day, root), columns=read_columns, memory_map=True)
+        df = table.to_pandas()
+
+        # Partial first/last day
+        if (start_ms is not None and day_ms < start_ms) or (end_ms is not None and day_ms + DAY_MS > end_ms):
+            ts = df['timestamp_ms'].to_numpy()
+            mask = np.ones(len(df), dtype=bool)
+            if start_ms is not None:
+                mask &= ts >= start_ms
+            if end_ms is not None:
+                mask &= ts < end_ms
+            df = df[mask].reset_index(drop=True)
+
+        if len(df):
+            yield df[columns]
+
+
+def read_archive(dataset, symbol, start_ms=None, end_ms=None, columns=None, root=ARCHIVE_ROOT):
+    """Archived rows for a symbol in [start_ms, end_ms) as one DataFrame"""
+    columns = list(columns or DATASETS[dataset][1])
+    return _concat(iter_archive(dataset, symbol, start_ms, end_ms, columns, root), columns)
+
+
+def _iter_history(dataset, symbol, start_ms, end_ms, columns, root, iter_recent):
+    """Archived days first, then SQLite from the day after the last archived one"""
+    days = list_days(dataset, symbol, root)
+    if not days:
+        yield from iter_recent(start_ms, end_ms)
+        return
+
+    archived_end_ms = day_start_ms(days[-1]) + DAY_MS
+    yield from iter_archive(dataset, symbol, start_ms, end_ms, columns, root)
+    if end_ms is not None and end_ms <= archived_end_ms:
+        return
+
+    for chunk in iter_recent(max(start_ms or 0, archived_end_ms), end_ms):
+        yield chunk[columns]
+
+
+def iter_trade_history(conn, symbol, start_ms=None, end_ms=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                       root=ARCHIVE_ROOT):
+    """
+    Stream trades in [start_ms, end_ms) from the archive + crypto_trades, in time order
+    Yields: DataFrames with TRADE_COLUMNS (one per archived day, then chunk_size rows)
+    """
+    return _iter_history('trades', symbol, start_ms, end_ms, TRADE_COLUMNS, root,
+                         lambda start, end: iter_trade_chunks(conn, symbol, start, end, chunk_size))
+
+
+def iter_bar_history(conn, symbol, start_ms=None, end_ms=None, columns=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                     root=ARCHIVE_ROOT):
+    """Stream V2 bars in [start_ms, end_ms) from the archive + crypto_trades_v2, in time order"""
+    columns = list(columns or BAR_COLUMNS)
+    if 'timestamp_ms' not in columns:
+        columns = ['timestamp_ms'] + columns
+    return _iter_history('bars', symbol, start_ms, end_ms, columns, root,
+                         lambda start, end: iter_bar_chunks(conn, symbol, start, end, columns, chunk_size))
+
+
+def _concat(chunks, columns):
+    chunks = list(chunks)
+    if not chunks:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+
+
+def load_trade_history(conn, symbol, start_ms=None, end_ms=None, root=ARCHIVE_ROOT):
+    """Trades in [start_ms, end_ms) from the archive + crypto_trades (TRADE_COLUMNS)"""
+    return _concat(iter_trade_history(conn, symbol, start_ms, end_ms, root=root), TRADE_COLUMNS)
+
+
+def load_bar_history(conn, symbol, start_ms=None, end_ms=None, columns=None, root=ARCHIVE_ROOT):
+    """V2 bars in [start_ms, end_ms) from the archive + crypto_trades_v2"""
+    columns = list(columns or BAR_COLUMNS)
+    if 'timestamp_ms' not in columns:
+        columns = ['timestamp_ms'] + columns
+    return _concat(iter_bar_history(conn, symbol, start_ms, end_ms, columns, root=root), columns)
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Trade Queries
+Range scans over crypto_trades / crypto_trades_v2 for training loaders.
+Queries are shaped for the (symbol, timestamp_ms) indexes, so a [start, end)
+range per symbol is one index range scan, streamed in chunks via fetchmany.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .compact_trades import COMPACT_TABLE, is_compact
+
+DEFAULT_CHUNK_SIZE = 200000
+
+TRADE_DTYPE = np.dtype([
+    ('timestamp_ms', np.int64),
+    ('price', np.float64),
+    ('quantity', np.float64),
+    ('is_maker', np.int8)
+])
+TRADE_COLUMNS = list(TRADE_DTYPE.names)
+
+# Same columns with float32 quantities (half the memory; ~7 significant digits)
+LEAN_TRADE_DTYPE = np.dtype([
+    ('timestamp_ms', np.int64),
+    ('price', np.float64),
+    ('quantity', np.float32),
+    ('is_maker', np.int8)
+])
+
+# Row identity, for callers that need it (e.g. the archive job)
+KEY_DTYPE = [('id', np.int64), ('bot_id', np.int64)]
+TRADE_KEY_DTYPE = np.dtype(KEY_DTYPE + TRADE_DTYPE.descr)
+KEY_COLUMNS = ['id', 'bot_id']
+
+BAR_COLUMNS = [
+    'timestamp_ms', 'open', 'high', 'low', 'close',
+    'buy_volume', 'sell_volume', 'total_volume', 'net_flow',
+    'buy_count', 'sell_count', 'trade_count',
+    'best_bid', 'best_ask', 'bid_qty', 'ask_qty',
+    'spread', 'book_imbalance', 'funding_rate'
+]
+
+
+def _range_clause(start_ms, end_ms):
+    """WHERE fragment + params for [start_ms, end_ms); None means unbounded"""
+    clause, params = "", []
+    if start_ms is not None:
+        clause += " AND timestamp_ms >= ?"
+        params.append(int(start_ms))
+    if end_ms is not None:
+        clause += " AND timestamp_ms < ?"
+        params.append(int(end_ms))
+    return clause, params
+
+
+def _iter_rows(conn, sql, params, chunk_size):
+    cursor = conn.execute(sql, params)
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
+
+
+def _trade_query(conn, symbol, start_ms, end_ms, select):
+    """(FROM/WHERE sql, params, price_scale, qty_scale) for one symbol; None if the symbol is unknown"""
+    symbol = symbol.upper()
+    clause, range_params = _range_clause(start_ms, end_ms)
+
+    if is_compact(conn):
+        # Read the compact table directly and unscale in NumPy instead of per row in SQL
+        row = conn.execute("SELECT id, price_scale, qty_scale FROM trade_symbols WHERE symbol = ?",
+                           (symbol,)).fetchone()
+        if row is None:
+            return None
+        symbol_id, price_scale, qty_scale = row
+        return (f"SELECT {select} FROM {COMPACT_TABLE} WHERE symbol_id = ?{clause}",
+                [symbol_id] + range_params, price_scale, qty_scale)
+
+    return (f"SELECT {select} FROM crypto_trades WHERE symbol = ?{clause}",
+            [symbol] + range_params, None, None)
+
+
+def _decode_trades(rows, dtype, price_scale, qty_scale):
+    """Row tuples -> typed columns in one pass (faster than zip/from_records)"""
+    records = np.array(rows, dtype=dtype)
+    columns = {name: records[name] for name in dtype.names}
+    if price_scale:
+        columns['price'] = columns['price'] / price_scale
+        columns['quantity'] = columns['quantity'] / qty_scale
+    return columns
+
+
+def count_trades(conn, symbol, start_ms=None, end_ms=None):
+    """Number of trades for one symbol in [start_ms, end_ms) (counted on the composite index)"""
+    query = _trade_query(conn, symbol, start_ms, end_ms, "COUNT(*)")
+    if query is None:
+        return 0
+    sql, params, _, _ = query
+    return conn.execute(sql, params).fetchone()[0]
+
+
+def iter_trade_chunks(conn, symbol, start_ms=None, end_ms=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                      with_keys=False, lean=False):
+    """
+    Stream raw trades for one symbol in [start_ms, end_ms), ordered by timestamp
+    Yields: DataFrames with TRADE_COLUMNS (price/quantity as float, is_maker 0/1),
+            prefixed by KEY_COLUMNS if with_keys; lean=True stores quantity as float32
+    """
+    dtype = TRADE_KEY_DTYPE if with_keys else TRADE_DTYPE
+    query = _trade_query(conn, symbol, start_ms, end_ms, ", ".join(dtype.names))
+    if query is None:
+        return
+    sql, params, price_scale, qty_scale = query
+
+    for rows in _iter_rows(conn, sql + " ORDER BY timestamp_ms", params, chunk_size):
+        columns = _decode_trades(rows, dtype, price_scale, qty_scale)
+        del rows
+        if lean:
+            columns['quantity'] = columns['quantity'].astype(np.float32)
+        yield pd.DataFrame(columns, copy=False)
+
+
+def iter_bar_chunks(conn, symbol, start_ms=None, end_ms=None, columns=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream 1-second V2 bars (crypto_trades_v2) for one symbol in [start_ms, end_ms)
+    Yields: DataFrames with `columns` (default BAR_COLUMNS; timestamp_ms is always included,
+            KEY_COLUMNS may be requested too)
+    """
+    columns = list(columns or BAR_COLUMNS)
+    unknown = set(columns) - set(BAR_COLUMNS) - set(KEY_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown crypto_trades_v2 columns: {sorted(unknown)}")
+    if 'timestamp_ms' not in columns:
+        columns = ['timestamp_ms'] + columns
+
+    clause, range_params = _range_clause(start_ms, end_ms)
+    sql = (f"SELECT {', '.join(columns)} FROM crypto_trades_v2 "
+           f"WHERE symbol = ?{clause} ORDER BY timestamp_ms, id")
+
+    for rows in _iter_rows(conn, sql, [symbol.upper()] + range_params, chunk_size):
+        yield pd.DataFrame.from_records(rows, columns=columns)
+
+
+def _concat(chunks, columns):
+    chunks = list(chunks)
+    if not chunks:
+        return pd.DataFrame(columns=columns)
+    if len(chunks) == 1:
+        return chunks[0]
+    return pd.concat(chunks, ignore_index=True)
+
+
+def load_trades(conn, symbol, start_ms=None, end_ms=None, chunk_size=DEFAULT_CHUNK_SIZE, lean=False):
+    """
+    All trades for one symbol in [start_ms, end_ms) as one DataFrame
+    Rows are streamed from the cursor into preallocated typed columns (sized by
+    count_trades), so at peak only the result plus one chunk is in memory.
+    lean=True stores quantity as float32 (~7 significant digits).
+    """
+    dtype = LEAN_TRADE_DTYPE if lean else TRADE_DTYPE
+    query = _trade_query(conn, symbol, start_ms, end_ms, ", ".join(TRADE_COLUMNS))
+    if query is None:
+        return pd.DataFrame({name: np.empty(0, dtype=dtype[name]) for name in dtype.names})
+    sql, params, price_scale, qty_scale = query
+
+    capacity = count_trades(conn, symbol, start_ms, end_ms)
+    columns = {name: np.empty(capacity, dtype=dtype[name]) for name in dtype.names}
+    filled = 0
+    for rows in _iter_rows(conn, sql + " ORDER BY timestamp_ms", params, chunk_size):
+        chunk = _decode_trades(rows, TRADE_DTYPE, price_scale, qty_scale)
+        del rows
+        end = filled + len(chunk['timestamp_ms'])
+        if end > capacity:
+            # Rows inserted since the count (open-ended range on a live DB)
+            capacity = max(end, capacity + capacity // 4)
+            columns = {name: np.resize(values, capacity) for name, values in columns.items()}
+        for name in dtype.names:
+            columns[name][filled:end] = chunk[name]
+        filled = end
+
+    return pd.DataFrame({name: values[:filled] for name, values in columns.items()}, copy=False)
+
+
+def load_bars(conn, symbol, start_ms=None, end_ms=None, columns=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """All V2 bars for one symbol in [start_ms, end_ms) as one DataFrame"""
+    return _concat(iter_bar_chunks(conn, symbol, start_ms, end_ms, columns, chunk_size),
+                   list(columns or BAR_COLUMNS))
+
+
+def get_time_range(conn, symbol, table='crypto_trades'):
+    """
+    (first_ms, last_ms) for a symbol, or (None, None) if it has no rows
+    Two index seeks with the composite index, no scan
+    """
+    symbol = symbol.upper()
+    if table == 'crypto_trades' and is_compact(conn):
+        row = conn.execute("SELECT id FROM trade_symbols WHERE symbol = ?", (symbol,)).fetchone()
+        if row is None:
+            return None, None
+        table, key, value = COMPACT_TABLE, 'symbol_id', row[0]
+    elif table in ('crypto_trades', 'crypto_trades_v2'):
+        key, value = 'symbol', symbol
+    else:
+        raise ValueError(f"Unsupported table: {table}")
+
+    first = conn.execute(f"SELECT MIN(timestamp_ms) FROM {table} WHERE {key} = ?", (value,)).fetchone()[0]
+    last = conn.execute(f"SELECT MAX(timestamp_ms) FROM {table} WHERE {key} = ?", (value,)).fetchone()[0]
+    return first, last
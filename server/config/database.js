@@ -120,15 +120,22 @@ export const initializeDatabase = () => {
   `)
 
   // Indexes for crypto_trades
-  database.exec(`
-    CREATE INDEX IF NOT EXISTS idx_crypto_trades_bot_id ON crypto_trades(bot_id)
-  `)
-  database.exec(`
-    CREATE INDEX IF NOT EXISTS idx_crypto_trades_symbol ON crypto_trades(symbol)
-  `)
-  database.exec(`
-    CREATE INDEX IF NOT EXISTS idx_crypto_trades_timestamp ON crypto_trades(timestamp_ms)
-  `)
+  // (skipped once bots/migrate_crypto_trades.py has turned it into a view over crypto_trades_compact)
+  const cryptoTrades = database.prepare(`SELECT type FROM sqlite_master WHERE name = 'crypto_trades'`).get()
+  if (cryptoTrades?.type === 'table') {
+    database.exec(`
+      CREATE INDEX IF NOT EXISTS idx_crypto_trades_bot_id ON crypto_trades(bot_id)
+    `)
+    database.exec(`
+      CREATE INDEX IF NOT EXISTS idx_crypto_trades_symbol ON crypto_trades(symbol)
+    `)
+    database.exec(`
+      CREATE INDEX IF NOT EXISTS idx_crypto_trades_timestamp ON crypto_trades(timestamp_ms)
+    `)
+    database.exec(`
+      CREATE INDEX IF NOT EXISTS idx_crypto_trades_symbol_ts ON crypto_trades(symbol, timestamp_ms)
+    `)
+  }
 
   // Create crypto_trades_v2 table for V2 multi-stream price collector
   database.exec(`
@@ -171,6 +178,9 @@ export const initializeDatabase = () => {
   database.exec(`
     CREATE INDEX IF NOT EXISTS idx_crypto_trades_v2_timestamp ON crypto_trades_v2(timestamp_ms)
   `)
+  database.exec(`
+    CREATE INDEX IF NOT EXISTS idx_crypto_trades_v2_symbol_ts ON crypto_trades_v2(symbol, timestamp_ms)
+  `)
 
   // Create promotion_fees table
   database.exec(`
@@ -362,6 +372,24 @@ export const initializeDatabase = () => {
     )
   `)
 
+  // Lineage columns for continuation training (migration for existing databases)
+  const lineageColumns = [
+    'parent_model_id INTEGER',
+    "training_mode TEXT DEFAULT 'full'",
+    'trained_from TEXT',
+    'trained_until TEXT',
+    'num_trees INTEGER',
+    // Per-stage timing/throughput/memory of the last run (JSON, bots/training/job_stats.py)
+    'training_stats TEXT'
+  ]
+  for (const column of lineageColumns) {
+    try {
+      database.exec(`ALTER TABLE ai_training_models ADD COLUMN ${column}`)
+    } catch (error) {
+      // Column already exists, ignore error
+    }
+  }
+
   // Indexes for ai_training_models
   database.exec(`
     CREATE INDEX IF NOT EXISTS idx_ai_models_symbol ON ai_training_models(symbol)
@@ -370,5 +398,53 @@ export const initializeDatabase = () => {
     CREATE INDEX IF NOT EXISTS idx_ai_models_status ON ai_training_models(status)
   `)
 
+  // Create ai_training_trials table (hyperparameter sweep trials, bots/training/sweep.py)
+  database.exec(`
+    CREATE TABLE IF NOT EXISTS ai_training_trials (
+      id INTEGER PRIMARY KEY AUTOINCREMENT,
+      model_id INTEGER NOT NULL,
+      trial INTEGER NOT NULL,
+      parameters TEXT NOT NULL,
+      status TEXT NOT NULL DEFAULT 'pending',
+      progress INTEGER DEFAULT 0,
+      precision REAL,
+      predicted_positives INTEGER,
+      duration_sec REAL,
+      error TEXT,
+      started_at TEXT,
+      completed_at TEXT,
+      UNIQUE(model_id, trial)
+    )
+  `)
+  database.exec(`
+    CREATE INDEX IF NOT EXISTS idx_ai_trials_model_id ON ai_training_trials(model_id)
+  `)
+
+  // Create ai_training_folds table (walk-forward validation, bots/training/walk_forward.py)
+  database.exec(`
+    CREATE TABLE IF NOT EXISTS ai_training_folds (
+      id INTEGER PRIMARY KEY AUTOINCREMENT,
+      model_id INTEGER NOT NULL,
+      fold INTEGER NOT NULL,
+      train_start TEXT,
+      train_end TEXT,
+      test_start TEXT,
+      test_end TEXT,
+      train_rows INTEGER,
+      test_rows INTEGER,
+      precision REAL,
+      signals INTEGER,
+      trades INTEGER,
+      pnl_pct REAL,
+      duration_sec REAL,
+      cached INTEGER DEFAULT 0,
+      created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+      UNIQUE(model_id, fold)
+    )
+  `)
+  database.exec(`
+    CREATE INDEX IF NOT EXISTS idx_ai_folds_model_id ON ai_training_folds(model_id)
+  `)
+
   console.log('✅ Database schema initialized')
 }
@@ -39,6 +39,11 @@ router.get('/', verifyToken, (req, res) => {
         status,
         progress,
         accuracy,
+        parent_model_id,
+        training_mode,
+        trained_from,
+        trained_until,
+        num_trees,
         created_at,
         started_at,
         completed_at
@@ -96,7 +101,9 @@ router.post('/', verifyToken, async (req, res) => {
       confidence_threshold = 0.60,
       learning_rate = 0.01,
       n_estimators = 500,
-      max_depth = 7
+      max_depth = 7,
+      sweep,
+      walk_forward
     } = req.body
 
     if (!name || !symbol) {
@@ -130,7 +137,9 @@ router.post('/', verifyToken, async (req, res) => {
       confidence_threshold,
       learning_rate,
       n_estimators,
-      max_depth
+      max_depth,
+      sweep,
+      walk_forward
     })
 
     const result = db.prepare(`
@@ -159,6 +168,61 @@ router.post('/', verifyToken, async (req, res) => {
   }
 })
 
+// Create a continuation model: adds trees to a completed model using only data after its watermark
+router.post('/:id/continue', verifyToken, (req, res) => {
+  try {
+    const parentId = parseInt(req.params.id)
+    const db = getDatabase()
+
+    const parent = db.prepare(`
+      SELECT * FROM ai_training_models WHERE id = ?
+    `).get(parentId)
+
+    if (!parent) {
+      return res.status(404).json({ success: false, error: 'Model not found' })
+    }
+
+    if (parent.status !== 'completed' || !parent.trained_until) {
+      return res.status(400).json({
+        success: false,
+        error: 'Only completed models with a training watermark can be continued'
+      })
+    }
+
+    const { name, continue_estimators = 100 } = req.body
+    const { sweep, walk_forward, best_trial, ...parentParams } = JSON.parse(parent.parameters)
+    const parameters = JSON.stringify({
+      ...parentParams,
+      continue_from: parentId,
+      continue_estimators
+    })
+    const modelName = name || `${parent.name} (continued)`
+
+    const result = db.prepare(`
+      INSERT INTO ai_training_models
+      (name, symbol, parameters, status, progress, parent_model_id, training_mode, created_at)
+      VALUES (?, ?, ?, 'created', 0, ?, 'continue', datetime('now'))
+    `).run(modelName, parent.symbol, parameters, parentId)
+
+    res.status(201).json({
+      success: true,
+      message: 'Continuation model created successfully',
+      data: {
+        id: result.lastInsertRowid,
+        name: modelName,
+        symbol: parent.symbol,
+        parameters: JSON.parse(parameters),
+        parent_model_id: parentId,
+        status: 'created',
+        progress: 0
+      }
+    })
+  } catch (error) {
+    console.error('Error creating continuation model:', error)
+    res.status(500).json({ success: false, error: error.message })
+  }
+})
+
 // Start training
 router.post('/:id/start', verifyToken, async (req, res) => {
   try {
@@ -181,7 +245,7 @@ router.post('/:id/start', verifyToken, async (req, res) => {
     // Update status to training
     db.prepare(`
       UPDATE ai_training_models 
-      SET status = 'training', progress = 0, started_at = datetime('now')
+      SET status = 'training', progress = 0, training_stats = NULL, started_at = datetime('now')
       WHERE id = ?
     `).run(modelId)
 
@@ -294,6 +358,78 @@ router.post('/:id/stop', verifyToken, (req, res) => {
   }
 })
 
+// Get sweep trials of a model
+router.get('/:id/trials', verifyToken, (req, res) => {
+  try {
+    const modelId = parseInt(req.params.id)
+    const db = getDatabase()
+
+    const trials = db.prepare(`
+      SELECT trial, parameters, status, progress, precision, predicted_positives,
+             duration_sec, error, started_at, completed_at
+      FROM ai_training_trials
+      WHERE model_id = ?
+      ORDER BY trial
+    `).all(modelId)
+
+    res.json({
+      success: true,
+      data: trials.map(trial => ({ ...trial, parameters: JSON.parse(trial.parameters) }))
+    })
+  } catch (error) {
+    console.error('Error fetching sweep trials:', error)
+    res.status(500).json({ success: false, error: error.message })
+  }
+})
+
+// Get walk-forward validation folds of a model
+router.get('/:id/folds', verifyToken, (req, res) => {
+  try {
+    const modelId = parseInt(req.params.id)
+    const db = getDatabase()
+
+    const folds = db.prepare(`
+      SELECT fold, train_start, train_end, test_start, test_end, train_rows, test_rows,
+             precision, signals, trades, pnl_pct, duration_sec, cached
+      FROM ai_training_folds
+      WHERE model_id = ?
+      ORDER BY fold
+    `).all(modelId)
+
+    res.json({
+      success: true,
+      data: folds
+    })
+  } catch (error) {
+    console.error('Error fetching walk-forward folds:', error)
+    res.status(500).json({ success: false, error: error.message })
+  }
+})
+
+// Get stage timing/throughput stats of a model's last training run
+router.get('/:id/stats', verifyToken, (req, res) => {
+  try {
+    const modelId = parseInt(req.params.id)
+    const db = getDatabase()
+
+    const model = db.prepare(`
+      SELECT training_stats FROM ai_training_models WHERE id = ?
+    `).get(modelId)
+
+    if (!model) {
+      return res.status(404).json({ success: false, error: 'Model not found' })
+    }
+
+    res.json({
+      success: true,
+      data: model.training_stats ? JSON.parse(model.training_stats) : null
+    })
+  } catch (error) {
+    console.error('Error fetching training stats:', error)
+    res.status(500).json({ success: false, error: error.message })
+  }
+})
+
 // Update model configuration
 router.put('/:id', verifyToken, (req, res) => {
   try {
@@ -325,19 +461,24 @@ router.put('/:id', verifyToken, (req, res) => {
       confidence_threshold,
       learning_rate,
       n_estimators,
-      max_depth
+      max_depth,
+      sweep,
+      walk_forward
     } = req.body
 
     // Update parameters
     const existingParams = JSON.parse(model.parameters)
     const newParams = {
+      ...existingParams,
       profit_target_pct: profit_target_pct !== undefined ? profit_target_pct : existingParams.profit_target_pct,
       fill_window: fill_window !== undefined ? fill_window : existingParams.fill_window,
       profit_window: profit_window !== undefined ? profit_window : existingParams.profit_window,
       confidence_threshold: confidence_threshold !== undefined ? confidence_threshold : existingParams.confidence_threshold,
       learning_rate: learning_rate !== undefined ? learning_rate : existingParams.learning_rate,
       n_estimators: n_estimators !== undefined ? n_estimators : existingParams.n_estimators,
-      max_depth: max_depth !== undefined ? max_depth : existingParams.max_depth
+      max_depth: max_depth !== undefined ? max_depth : existingParams.max_depth,
+      sweep: sweep !== undefined ? sweep : existingParams.sweep,
+      walk_forward: walk_forward !== undefined ? walk_forward : existingParams.walk_forward
     }
 
     db.prepare(`
@@ -388,6 +529,12 @@ router.delete('/:id', verifyToken, (req, res) => {
     }
 
     // Delete from database
+    db.prepare(`
+      DELETE FROM ai_training_trials WHERE model_id = ?
+    `).run(modelId)
+    db.prepare(`
+      DELETE FROM ai_training_folds WHERE model_id = ?
+    `).run(modelId)
     const result = db.prepare(`
       DELETE FROM ai_training_models WHERE id = ?
     `).run(modelId)
@@ -229,7 +229,11 @@ router.delete('/:botId', verifyToken, (req, res) => {
     const db = getDatabase()
     const botId = parseInt(req.params.botId)
 
-    const result = db.prepare('DELETE FROM crypto_trades WHERE bot_id = ?').run(botId)
+    // After the compact migration crypto_trades is a view; delete from its table directly
+    // (deleting through the view's trigger works too, but row by row and reports 0 changes)
+    const cryptoTrades = db.prepare(`SELECT type FROM sqlite_master WHERE name = 'crypto_trades'`).get()
+    const table = cryptoTrades?.type === 'view' ? 'crypto_trades_compact' : 'crypto_trades'
+    const result = db.prepare(`DELETE FROM ${table} WHERE bot_id = ?`).run(botId)
 
     res.json({
       success: true,